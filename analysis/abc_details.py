@@ -4,6 +4,7 @@ Provides a function to get mode, max, and count of currents within ±10% of mode
 """
 
 from collections import Counter
+from analysis.utils import MinMaxTracker
 from routes.db_service import get_connection
 
 def get_abc_details(db_path, year_month):
@@ -39,10 +40,22 @@ def get_abc_details(db_path, year_month):
       AND strftime('%Y-%m', substr(dateobserved, 7, 4) || '-' || substr(dateobserved, 4, 2) || '-' || substr(dateobserved, 1, 2)) = ?
     """
     cursor.execute(query, (year_month,))
-    rows = cursor.fetchall()
+
+    # Stream the month's readings into value counts instead of keeping every row
+    morning_counts = Counter()  # 05:00-08:59
+    evening_counts = Counter()  # 18:00-22:00
+    all_counts = Counter()
+    max_reading = MinMaxTracker()
+    for current, date, time in cursor:
+        all_counts[current] += 1
+        max_reading.add(current, (date, time))
+        if '05:00' <= time <= '08:59':
+            morning_counts[current] += 1
+        elif '18:00' <= time <= '22:00':
+            evening_counts[current] += 1
     conn.close()
 
-    if not rows:
+    if not all_counts:
         return {
             'mode_current': None,
             'max_current': None,
@@ -56,17 +69,8 @@ def get_abc_details(db_path, year_month):
         }
 
     # Find mode current for morning (05:00-08:59) and evening (18:00-22:00)
-    morning_currents = [
-        row['current'] for row in rows
-        if ('05:00' <= row['timeobserved'] <= '08:59')
-    ]
-    evening_currents = [
-        row['current'] for row in rows
-        if ('18:00' <= row['timeobserved'] <= '22:00')
-    ]
-
-    mode_morning = Counter(morning_currents).most_common(1)[0][0] if morning_currents else None
-    mode_evening = Counter(evening_currents).most_common(1)[0][0] if evening_currents else None
+    mode_morning = morning_counts.most_common(1)[0][0] if morning_counts else None
+    mode_evening = evening_counts.most_common(1)[0][0] if evening_counts else None
 
     # Select the greater of morning or evening mode as the main mode_current
     if mode_morning is not None and (mode_evening is None or mode_morning >= mode_evening):
@@ -80,15 +84,15 @@ def get_abc_details(db_path, year_month):
         peak_period = None
 
     # Find max current and its date/time
-    max_row = max(rows, key=lambda r: r['current'])
-    max_current, max_date, max_time = max_row['current'], max_row['dateobserved'], max_row['timeobserved']
+    max_current = max_reading.max_value
+    max_date, max_time = max_reading.max_tag
 
     # Calculate ±10% range and count currents within range
     if mode_current is not None:
         lower = mode_current * 0.9
         upper = mode_current * 1.1
-        count_in_range = sum(1 for row in rows if lower <= row['current'] <= upper)
-        total_count = len(rows)
+        count_in_range = sum(count for current, count in all_counts.items() if lower <= current <= upper)
+        total_count = sum(all_counts.values())
         percent_in_range = (count_in_range / total_count * 100) if total_count > 0 else None
     else:
         lower = upper = count_in_range = percent_in_range = None
@@ -0,0 +1,155 @@
+"""
+Module to correlate 110 kV feeder and transformer outages with the 11 kV
+interruptions that follow them.
+
+Upstream (EHT and T/F) outage windows are interval-joined with HT interruption
+starts in one sweep over the events sorted by time: upstream windows enter an
+active set when they open and leave it when they close, so every HT interruption
+is matched against the outages active at its start only.
+"""
+
+from calendar import monthrange
+from datetime import date
+import heapq
+import time
+
+from analysis.reliability import get_outage_events
+from analysis.utils import get_eht_feeder_order, get_tf_order, sort_by_order
+
+# Minutes around an upstream outage within which an HT interruption is attributed to it
+# (times are entered by hand and rarely match to the minute)
+CASCADE_TOLERANCE_MINUTES = 5
+# Upstream outages starting this many days before the period can still cause HT interruptions in it
+UPSTREAM_LOOKBACK_DAYS = 1
+
+UPSTREAM_TYPES = ('EHT', 'T/F')
+# Event kinds in the sweep; at equal times windows open before HT starts are matched
+_OPEN = 0
+_HT = 1
+
+
+def period_bounds(period):
+    """
+    Returns the first and last dates ('YYYY-MM-DD') of a 'YYYY-MM' month or a 'YYYY' year.
+    """
+    if len(period) == 4:
+        return f"{period}-01-01", f"{period}-12-31"
+    year, month = map(int, period.split('-'))
+    return f"{period}-01", f"{period}-{monthrange(year, month)[1]:02d}"
+
+
+def attribute_interruptions(upstream, ht, tolerance=CASCADE_TOLERANCE_MINUTES):
+    """
+    Attributes each HT interruption to the upstream outage active at its start.
+
+    An upstream outage is active from `tolerance` minutes before its start to
+    `tolerance` minutes after its end. When several are active, the most recently
+    started one is the cause.
+
+    Args:
+        upstream (list): Upstream events with 'start_minute' and 'end_minute'.
+        ht (list): HT events with 'start_minute'.
+        tolerance (int): Minutes added on both sides of an upstream outage.
+
+    Returns:
+        list: Index into upstream of the cause of each HT interruption, or None.
+    """
+    points = [(event['start_minute'] - tolerance, _OPEN, i) for i, event in enumerate(upstream)]
+    points += [(event['start_minute'], _HT, i) for i, event in enumerate(ht)]
+    points.sort()
+
+    causes = [None] * len(ht)
+    active = []  # (-start, upstream index): most recently started window on top
+    for minute, kind, i in points:
+        if kind == _OPEN:
+            heapq.heappush(active, (-upstream[i]['start_minute'], i))
+            continue
+        # Closed windows are dropped when they reach the top; time only moves forward,
+        # so a closed window never becomes active again
+        while active and upstream[active[0][1]]['end_minute'] + tolerance < minute:
+            heapq.heappop(active)
+        if active:
+            causes[i] = active[0][1]
+    return causes
+
+
+def get_cascading_outages(db_path, period, tolerance=CASCADE_TOLERANCE_MINUTES):
+    """
+    Returns the HT interruptions of a month or year attributed to the 110 kV feeder
+    and transformer outages active when they started.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        period (str): 'YYYY-MM' month or 'YYYY' year.
+        tolerance (int): Minutes around an upstream outage still attributed to it.
+
+    Returns:
+        dict: {
+            'ht_total': ..., 'ht_attributed': ..., 'ht_unattributed': ...,
+            'sources': [{'code': ..., 'fdrtype': ..., 'outages': ..., 'cascading_outages': ...,
+                         'ht_interruptions': ..., 'ht_minutes': ...}, ...],
+            'cascades': [{'code': ..., 'fdrtype': ..., 'started': ..., 'ended': ..., 'duration_minutes': ...,
+                          'belongsto': ..., 'ht_interruptions': [{'code': ..., 'started': ..., 'ended': ...,
+                          'delay_minutes': ..., 'duration_minutes': ...}, ...], 'ht_minutes': ...}, ...],
+            'elapsed_ms': correlation time in milliseconds
+        }
+    """
+    start_date, end_date = period_bounds(period)
+    lookback = date.fromordinal(date.fromisoformat(start_date).toordinal() - UPSTREAM_LOOKBACK_DAYS).isoformat()
+    upstream = get_outage_events(db_path, lookback, end_date, UPSTREAM_TYPES)
+    ht = get_outage_events(db_path, start_date, end_date, ('HTs',))
+
+    started = time.perf_counter()
+    causes = attribute_interruptions(upstream, ht, tolerance)
+
+    cascades = {}
+    for ht_event, cause in zip(ht, causes):
+        if cause is None:
+            continue
+        cascade = cascades.setdefault(cause, [])
+        cascade.append({
+            'code': ht_event['feedercode'],
+            'started': ht_event['started'],
+            'ended': ht_event['ended'],
+            'delay_minutes': ht_event['start_minute'] - upstream[cause]['start_minute'],
+            'duration_minutes': ht_event['end_minute'] - ht_event['start_minute']
+        })
+
+    sources = {}
+    result = []
+    for i, event in enumerate(upstream):
+        if event['started'] < start_date and i not in cascades:
+            continue
+        source = sources.setdefault((event['fdrtype'], event['feedercode']), {
+            'code': event['feedercode'], 'fdrtype': event['fdrtype'],
+            'outages': 0, 'cascading_outages': 0, 'ht_interruptions': 0, 'ht_minutes': 0
+        })
+        source['outages'] += 1
+        if i not in cascades:
+            continue
+        ht_minutes = sum(entry['duration_minutes'] for entry in cascades[i])
+        source['cascading_outages'] += 1
+        source['ht_interruptions'] += len(cascades[i])
+        source['ht_minutes'] += ht_minutes
+        result.append({
+            'code': event['feedercode'],
+            'fdrtype': event['fdrtype'],
+            'started': event['started'],
+            'ended': event['ended'],
+            'duration_minutes': event['end_minute'] - event['start_minute'],
+            'belongsto': event['belongsto'],
+            'ht_interruptions': cascades[i],
+            'ht_minutes': ht_minutes
+        })
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    attributed = sum(len(entries) for entries in cascades.values())
+    order = get_eht_feeder_order(db_path) + get_tf_order(db_path)
+    return {
+        'ht_total': len(ht),
+        'ht_attributed': attributed,
+        'ht_unattributed': len(ht) - attributed,
+        'sources': sort_by_order(list(sources.values()), 'code', order),
+        'cascades': result,
+        'elapsed_ms': elapsed_ms
+    }
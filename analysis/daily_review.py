@@ -3,9 +3,11 @@ Module to calculate daily min and max current values for feeders, EHT, and trans
 """
 
 from pprint import pprint
-from analysis.utils import get_eht_feeder_order, get_ht_feeder_order, get_tf_order, sort_by_order
+from analysis.utils import MinMaxTracker, get_eht_feeder_order, get_ht_feeder_order, get_tf_order, max_decimal_places, sort_by_order
+from analysis.meter_validation import INTEGRITY_FLAGS, get_daily_reading_flags
+from analysis.station_load import formula_from_codes, get_load_peak_min, incomers_formula, station_formula
 from routes.db_service import get_connection
-from datetime import datetime, timedelta
+from utils.slot_calendar import HOURLY_TIMES, HOUR_INDEX, hourly_slot, previous_date
 
 def get_daily_current_stat(db_path, query_date, db_table="sosht", db_code_column="feedercode"):
     """
@@ -27,41 +29,42 @@ def get_daily_current_stat(db_path, query_date, db_table="sosht", db_code_column
                 'max_time': time of max
             }
     """
+    return get_daily_current_stats(db_path, (query_date,), db_table, db_code_column)[query_date]
+
+def get_daily_current_stats(db_path, query_dates, db_table="sosht", db_code_column="feedercode"):
+    """
+    Returns the min/max current of every code on each of several dates, read in one query.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        query_dates (list of str): Dates in 'DD-MM-YYYY' format.
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for code ('feedercode', 'tfcode').
+
+    Returns:
+        dict: {date: list of dict as returned by get_daily_current_stat}
+    """
     conn = get_connection(db_path)
     cursor = conn.cursor()
     query = f"""
-        SELECT {db_code_column}, current, timeobserved
+        SELECT dateobserved, {db_code_column}, current, timeobserved
         FROM {db_table}
-        WHERE dateobserved = ?
+        WHERE dateobserved IN ({','.join(['?'] * len(query_dates))})
           AND current >= 0
     """
-    cursor.execute(query, (query_date,))
-    rows = cursor.fetchall()
+    cursor.execute(query, tuple(query_dates))
+
+    # Running min/max per (date, code) while streaming from the cursor
+    trackers = {query_date: {} for query_date in query_dates}
+    for query_date, code, current, time in cursor:
+        codes = trackers[query_date]
+        tracker = codes.get(code)
+        if tracker is None:
+            tracker = codes[code] = MinMaxTracker()
+        tracker.add(current, time)
     conn.close()
 
-    # Group by code
-    codes = {}
-    for row in rows:
-        code = row[db_code_column]
-        current = row['current']
-        time = row['timeobserved']
-        if code not in codes:
-            codes[code] = []
-        codes[code].append({'current': current, 'time': time})
-
-    result = []
-    for code, values in codes.items():
-        min_row = min(values, key=lambda x: x['current'])
-        max_row = max(values, key=lambda x: x['current'])
-        result.append({
-            'code': code,
-            'min_value': min_row['current'],
-            'min_time': min_row['time'],
-            'max_value': max_row['current'],
-            'max_time': max_row['time']
-        })
-
-    # Sort result based on feeder/transformer order from master tables
+    # Sort results based on feeder/transformer order from master tables
     code_order = []
     if db_table == "sosht":
         code_order = get_ht_feeder_order(db_path)
@@ -69,13 +72,27 @@ def get_daily_current_stat(db_path, query_date, db_table="sosht", db_code_column
         code_order = get_eht_feeder_order(db_path)
     elif db_table == "sostf":
         code_order = get_tf_order(db_path)
-    result = sort_by_order(result, 'code', code_order)
 
-    return result
+    results = {}
+    for query_date, codes in trackers.items():
+        result = []
+        for code, tracker in codes.items():
+            result.append({
+                'code': code,
+                'min_value': tracker.min_value,
+                'min_time': tracker.min_tag,
+                'max_value': tracker.max_value,
+                'max_time': tracker.max_tag
+            })
+        results[query_date] = sort_by_order(result, 'code', code_order)
+
+    return results
 
 def get_daily_em_diff_stat(db_path, query_date, db_table="sosht", db_code_column="feedercode"):
     """
     Returns a list of dicts with code, min/max Δ EM Import/Export and their times for a given date.
+    Deltas with a register-integrity flag (rollover, reset, mf_change, negative) are excluded
+    from min/max; outliers are kept in min/max and listed in 'flagged' like the other flags.
 
     Args:
         db_path (str): Path to the SQLite database.
@@ -93,16 +110,14 @@ def get_daily_em_diff_stat(db_path, query_date, db_table="sosht", db_code_column
                 'max_delta_emc_export': ...,
                 'time_max_delta_emc_export': ...,
                 'min_delta_emc_export': ...,
-                'time_min_delta_emc_export': ...
+                'time_min_delta_emc_export': ...,
+                'flagged': [{'time': ..., 'channel': 'import'/'export', 'flag': ...}, ...]
             }
     """
 
-    # Prepare all times for the day
-    allowed_times = [f"{h:02d}:00" for h in range(1, 25)]
-
-    # Calculate previous date for 01:00
-    prev_date_dt = datetime.strptime(query_date, "%d-%m-%Y") - timedelta(days=1)
-    prev_date_str = prev_date_dt.strftime("%d-%m-%Y")
+    # Previous date for 01:00 and the day's hourly slot numbers
+    prev_date_str = previous_date(query_date)
+    first_slot = hourly_slot(query_date, HOURLY_TIMES[0])
 
     conn = get_connection(db_path)
     cursor = conn.cursor()
@@ -113,91 +128,63 @@ def get_daily_em_diff_stat(db_path, query_date, db_table="sosht", db_code_column
         FROM {db_table}
         WHERE (dateobserved = ? AND timeobserved IN ({','.join(['?']*24)}))
            OR (dateobserved = ? AND timeobserved = '24:00')
-    """, (query_date, *allowed_times, prev_date_str))
-    rows = cursor.fetchall()
-    conn.close()
+    """, (query_date, *HOURLY_TIMES, prev_date_str))
 
-    # Organize data: {(date, time, code): row}
+    # Organize data as compact tuples: {(slot, code): (current, emc_import, emc_export)};
+    # the previous day's 24:00 is first_slot - 1
     data = {}
-    for row in rows:
-        key = (row['dateobserved'], row['timeobserved'], row[db_code_column])
-        data[key] = row
-
-    # For each hour, calculate delta using current and previous hour
-    all_rows = []
-    for time in allowed_times:
-        if time == "01:00":
-            prev_time = "24:00"
-            prev_date = prev_date_str
+    codes = {}
+    for code, date, time, emc_export, emc_import, current in cursor:
+        if date == query_date:
+            slot = first_slot + HOUR_INDEX[time]
+            codes[code] = None
         else:
-            prev_time = f"{int(time[:2])-1:02d}:00"
-            prev_date = query_date
+            slot = first_slot - 1
+        data[(slot, code)] = (current, emc_import, emc_export)
+    conn.close()
 
-        for code in set(row[db_code_column] for row in rows):
-            curr_key = (query_date, time, code)
-            prev_key = (prev_date, prev_time, code)
-            curr_row = data.get(curr_key)
-            prev_row = data.get(prev_key)
+    reading_flags = get_daily_reading_flags(db_path, query_date, db_table, db_code_column)
 
-            # Only process if both rows exist and currents are >0
-            if curr_row and prev_row and curr_row['current'] > 0 and prev_row['current'] > 0:
-                # Helper for decimal places
-                def max_decimal_places(a, b):
-                    def count_decimals(x):
-                        s = str(x)
-                        if '.' in s:
-                            return len(s.split('.')[-1])
-                        return 0
-                    return max(count_decimals(a), count_decimals(b))
+    # For each code, walk the hours and keep running min/max of the deltas
+    result = []
+    for code in codes:
+        import_stat = MinMaxTracker()
+        export_stat = MinMaxTracker()
+        flagged = []
+        for hour, time in enumerate(HOURLY_TIMES):
+            slot = first_slot + hour
+            curr_row = data.get((slot, code))
+            if not curr_row:
+                continue
+            prev_row = data.get((slot - 1, code))
+            flags = reading_flags.get((code, time), {})
 
+            # Only process if both rows exist and currents are >0
+            if prev_row and curr_row[0] > 0 and prev_row[0] > 0:
                 # Import
-                digits = max_decimal_places(curr_row['emc_import'], prev_row['emc_import'])
-                delta_import = round(curr_row['emc_import'] - prev_row['emc_import'], digits)
+                if flags.get('import') not in INTEGRITY_FLAGS:
+                    digits = max_decimal_places(curr_row[1], prev_row[1])
+                    import_stat.add(round(curr_row[1] - prev_row[1], digits), time)
                 # Export
-                digits = max_decimal_places(curr_row['emc_export'], prev_row['emc_export'])
-                delta_export = round(curr_row['emc_export'] - prev_row['emc_export'], digits)
-            else:
-                delta_import = None
-                delta_export = None
-
-            if curr_row:
-                all_rows.append({
-                    'code': code,
-                    'delta_emc_import': delta_import,
-                    'delta_emc_export': delta_export,
-                    'time': time
-                })
-
-    # Group all_rows by code
-    code_dict = {}
-    for row in all_rows:
-        code = row['code']
-        code_dict.setdefault(code, []).append(row)
+                if flags.get('export') not in INTEGRITY_FLAGS:
+                    digits = max_decimal_places(curr_row[2], prev_row[2])
+                    export_stat.add(round(curr_row[2] - prev_row[2], digits), time)
+
+            for channel in ('import', 'export'):
+                if flags.get(channel):
+                    flagged.append({'time': time, 'channel': channel, 'flag': flags[channel]})
 
-    result = []
-    for code, values in code_dict.items():
-        import_vals = [v for v in values if v['delta_emc_import'] is not None]
-        export_vals = [v for v in values if v['delta_emc_export'] is not None]
-        if import_vals:
-            max_import = max(import_vals, key=lambda x: x['delta_emc_import'])
-            min_import = min(import_vals, key=lambda x: x['delta_emc_import'])
-        else:
-            max_import = min_import = {'delta_emc_import': None, 'time': None}
-        if export_vals:
-            max_export = max(export_vals, key=lambda x: x['delta_emc_export'])
-            min_export = min(export_vals, key=lambda x: x['delta_emc_export'])
-        else:
-            max_export = min_export = {'delta_emc_export': None, 'time': None}
         result.append({
             'code': code,
-            'max_delta_emc_import': max_import['delta_emc_import'],
-            'time_max_delta_emc_import': max_import['time'],
-            'min_delta_emc_import': min_import['delta_emc_import'],
-            'time_min_delta_emc_import': min_import['time'],
-            'max_delta_emc_export': max_export['delta_emc_export'],
-            'time_max_delta_emc_export': max_export['time'],
-            'min_delta_emc_export': min_export['delta_emc_export'],
-            'time_min_delta_emc_export': min_export['time'],
+            'max_delta_emc_import': import_stat.max_value,
+            'time_max_delta_emc_import': import_stat.max_tag,
+            'min_delta_emc_import': import_stat.min_value,
+            'time_min_delta_emc_import': import_stat.min_tag,
+            'max_delta_emc_export': export_stat.max_value,
+            'time_max_delta_emc_export': export_stat.max_tag,
+            'min_delta_emc_export': export_stat.min_value,
+            'time_min_delta_emc_export': export_stat.min_tag,
+            'flagged': flagged,
         })
 
     code_order = []
@@ -211,7 +198,7 @@ def get_daily_em_diff_stat(db_path, query_date, db_table="sosht", db_code_column
 
     return result
 
-def get_station_peak_min(db_path, query_date):
+def get_station_peak_min(db_path, query_date, feeder_in='1PLPM', feeder_out='1PMKJ', formula=None):
     """
     Returns a dict with station peak (max) and min load (PLPM - PMKJ) and their times,
     and min/max voltage (and times) for 1PMKJ or 1PLPM feeders.
@@ -219,6 +206,9 @@ def get_station_peak_min(db_path, query_date):
     Args:
         db_path (str): Path to the SQLite database.
         query_date (str): Date in 'DD-MM-YYYY' format.
+        feeder_in (str): EHT feeder bringing power into the station (default '1PLPM').
+        feeder_out (str): EHT feeder taking power onward (default '1PMKJ').
+        formula (str or None): Station load formula; defaults to feeder_in - feeder_out.
 
     Returns:
         dict: {
@@ -236,55 +226,29 @@ def get_station_peak_min(db_path, query_date):
             "pmkj_max_load_time": time of max PMKJ current
         }
     """
+    formula = station_formula(feeder_in, feeder_out, formula)
+    # Station load and both feeder currents (negative currents excluded) in one scan
+    loads = get_load_peak_min(db_path, [query_date], {
+        'station': formula,
+        'feeder_in': formula_from_codes((feeder_in,)),
+        'feeder_out': formula_from_codes((feeder_out,))
+    })[query_date]
+
     conn = get_connection(db_path)
     cursor = conn.cursor()
-    # Get all PLPM and PMKJ currents by time
-    cursor.execute(f"""
-        SELECT timeobserved, 
-               MAX(CASE WHEN feedercode = :feeder_code_1 THEN current END) AS feeder_1_current,
-               MAX(CASE WHEN feedercode = :feeder_code_2 THEN current END) AS feeder_2_current
-        FROM soseht
-        WHERE dateobserved = :query_date
-          AND (feedercode = :feeder_code_1 OR feedercode = :feeder_code_2)
-          AND current >= 0
-        GROUP BY timeobserved
-    """,  {
-        "feeder_code_1": '1PLPM',
-        "feeder_code_2": '1PMKJ',
-        "query_date": query_date
-    })
-    rows = cursor.fetchall()
-
-    # Calculate station load for each time
-    station_loads = []
-    plpm_rows, pmkj_rows = [], []
-    for row in rows:
-        plpm = row['feeder_1_current']
-        pmkj = row['feeder_2_current']
-        if plpm is not None:
-            plpm_rows.append({'load': plpm, 'time': row['timeobserved']})
-        if pmkj is not None:
-            pmkj_rows.append({'load': pmkj, 'time': row['timeobserved']})
-        if plpm is not None and pmkj is not None:
-            load = plpm - pmkj
-            station_loads.append({'load': load, 'time': row['timeobserved']})
-
     # Get min/max voltage for 1PLPM or 1PMKJ
     cursor.execute("""
         SELECT feedercode, voltage, timeobserved
         FROM soseht
         WHERE dateobserved = ?
-          AND feedercode IN ('1PLPM', '1PMKJ')
+          AND feedercode IN (?, ?)
           AND voltage >= 0
-    """, (query_date,))
-    voltage_rows = cursor.fetchall()
+    """, (query_date, feeder_in, feeder_out))
+    voltage = MinMaxTracker()
+    for _, value, time in cursor:
+        voltage.add(value, time)
     conn.close()
 
-    min_voltage_row = max_voltage_row = None
-    if voltage_rows:
-        min_voltage_row = min(voltage_rows, key=lambda x: x['voltage'])
-        max_voltage_row = max(voltage_rows, key=lambda x: x['voltage'])
-
     result = {
         "peak": None,
         "peak_time": None,
@@ -300,39 +264,33 @@ def get_station_peak_min(db_path, query_date):
         "pmkj_max_load_time": None
     }
 
-    if station_loads:
-        max_row = max(station_loads, key=lambda x: x['load'])
-        min_row = min(station_loads, key=lambda x: x['load'])
-        result["peak"] = max_row['load']
-        result["peak_time"] = max_row['time']
-        result["min"] = min_row['load']
-        result["min_time"] = min_row['time']
-
-    if min_voltage_row:
-        result["min_voltage"] = min_voltage_row['voltage']
-        result["min_voltage_time"] = min_voltage_row['timeobserved']
-    if max_voltage_row:
-        result["max_voltage"] = max_voltage_row['voltage']
-        result["max_voltage_time"] = max_voltage_row['timeobserved']
-    
-    if plpm_rows:
-        max_plpm = max(plpm_rows, key=lambda x: x['load'])
-        result["plpm_max_load"] = max_plpm['load']
-        result["plpm_max_load_time"] = max_plpm['time']
-    if pmkj_rows:
-        max_pmkj = max(pmkj_rows, key=lambda x: x['load'])
-        result["pmkj_max_load"] = max_pmkj['load']
-        result["pmkj_max_load_time"] = max_pmkj['time']
+    result["peak"] = loads['station']['peak']
+    result["peak_time"] = loads['station']['peak_time']
+    result["min"] = loads['station']['min']
+    result["min_time"] = loads['station']['min_time']
+
+    result["min_voltage"] = voltage.min_value
+    result["min_voltage_time"] = voltage.min_tag
+    result["max_voltage"] = voltage.max_value
+    result["max_voltage_time"] = voltage.max_tag
+
+    result["plpm_max_load"] = loads['feeder_in']['peak']
+    result["plpm_max_load_time"] = loads['feeder_in']['peak_time']
+    result["pmkj_max_load"] = loads['feeder_out']['peak']
+    result["pmkj_max_load_time"] = loads['feeder_out']['peak_time']
 
     return result
 
-def get_incomers_peak_min(db_path, query_date):
+def get_incomers_peak_min(db_path, query_date, incomers=('INCOMER I', 'INCOMER II'), formula=None):
     """
     Returns a dict with incomers max and min load (INCOMER I + INCOMER II) and their times for the given table/date.
     
     Args:
         db_path (str): Path to the SQLite database.
         query_date (str): Date in 'DD-MM-YYYY' format.
+        incomers (tuple of str): 11 kV incomer feeder codes to sum.
+        formula (str or None): Incomers load formula; defaults to the sum of the incomers
+            (a missing incomer counts as 0, negative currents are kept).
     Returns:
         dict: {
             "peak": max load,
@@ -345,35 +303,24 @@ def get_incomers_peak_min(db_path, query_date):
             "max_voltage_time": time of max voltage
         }
     """
+    formula = incomers_formula(incomers, formula)
+    load = get_load_peak_min(db_path, [query_date], {'load': formula}, db_table="sosht")[query_date]['load']
+
     conn = get_connection(db_path)
     cursor = conn.cursor()
-    # Get all INCOMER I and INCOMER II total current by time
-    cursor.execute(f"""
-        SELECT timeobserved, SUM(current) as total_load
-        FROM sosht
-        WHERE dateobserved = ?
-          AND feedercode IN ('INCOMER I', 'INCOMER II')
-        GROUP BY timeobserved
-        ORDER BY timeobserved
-    """,  (query_date,))
-    load_rows = cursor.fetchall()
-
     # Get min/max voltage for 1PLPM or 1PMKJ
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT feedercode, voltage, timeobserved
         FROM sosht
         WHERE dateobserved = ?
-          AND feedercode IN ('INCOMER I', 'INCOMER II')
+          AND feedercode IN ({','.join(['?'] * len(incomers))})
           AND voltage >= 0
-    """, (query_date,))
-    voltage_rows = cursor.fetchall()
+    """, (query_date, *incomers))
+    voltage = MinMaxTracker()
+    for _, value, time in cursor:
+        voltage.add(value, time)
     conn.close()
 
-    min_voltage_row = max_voltage_row = None
-    if voltage_rows:
-        min_voltage_row = min(voltage_rows, key=lambda x: x['voltage'])
-        max_voltage_row = max(voltage_rows, key=lambda x: x['voltage'])
-
     result = {
         "peak": None,
         "peak_time": None,
@@ -385,19 +332,14 @@ def get_incomers_peak_min(db_path, query_date):
         "max_voltage_time": None
     }
 
-    if load_rows:
-        max_row = max(load_rows, key=lambda x: x['total_load'])
-        min_row = min(load_rows, key=lambda x: x['total_load'])
-        result["peak"] = max_row['total_load']
-        result["peak_time"] = max_row['timeobserved']
-        result["min"] = min_row['total_load']
-        result["min_time"] = min_row['timeobserved']
-
-    if min_voltage_row:
-        result["min_voltage"] = min_voltage_row['voltage']
-        result["min_voltage_time"] = min_voltage_row['timeobserved']
-    if max_voltage_row:
-        result["max_voltage"] = max_voltage_row['voltage']
-        result["max_voltage_time"] = max_voltage_row['timeobserved']
+    result["peak"] = load['peak']
+    result["peak_time"] = load['peak_time']
+    result["min"] = load['min']
+    result["min_time"] = load['min_time']
+
+    result["min_voltage"] = voltage.min_value
+    result["min_voltage_time"] = voltage.min_tag
+    result["max_voltage"] = voltage.max_value
+    result["max_voltage_time"] = voltage.max_tag
 
     return result
@@ -0,0 +1,176 @@
+"""
+Module to check the readings of a table against the slot calendar.
+
+Every code should have exactly one reading per allowed time slot of a day. The
+readings of the days are grouped per (code, date, time) in one query, giving the
+slots present, the slots entered more than once and the duplicates whose values
+differ. The per-day results are kept in a sidecar database as slot bitmasks and
+rescanned by analysis.utils.stale_days: when a day's number of readings changes,
+or while it is recent and the database has changed.
+"""
+
+import threading
+
+from analysis.utils import CODE_ORDERS, get_db_version, get_row_counts, stale_days
+from routes.db_service import get_connection, get_sidecar_connection
+from utils.slot_calendar import ALLOWED_TIMES, SLOT_INDEX
+
+SIDECAR_NAME = "completeness"
+
+# Bitmask of all slots of a day
+FULL_DAY_MASK = (1 << len(ALLOWED_TIMES)) - 1
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS completeness_days (
+        db_table TEXT, date TEXT, row_count INTEGER, db_version TEXT,
+        PRIMARY KEY (db_table, date)
+    );
+    CREATE TABLE IF NOT EXISTS completeness_day_codes (
+        db_table TEXT, date TEXT, code TEXT,
+        present_mask INTEGER, duplicate_mask INTEGER, conflict_mask INTEGER, extra_rows INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_completeness_day_codes ON completeness_day_codes (db_table, date);
+"""
+
+_scan_lock = threading.Lock()
+
+
+def _slot_times(mask):
+    """
+    Returns the allowed times whose bits are set in a slot bitmask.
+    """
+    return [time for i, time in enumerate(ALLOWED_TIMES) if mask >> i & 1]
+
+
+def _scan_days(db_path, dates, db_table, db_code_column):
+    """
+    Groups the readings of the given dates per (code, date, time) in one query and
+    returns the per-day results: [(date, code, present, duplicate, conflict masks, extra rows)].
+    """
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {db_code_column} AS code, dateobserved, timeobserved, COUNT(*) AS row_count,
+               COUNT(DISTINCT COALESCE(current, '') || ':' || COALESCE(voltage, '') || ':' ||
+                              COALESCE(emc_import, '') || ':' || COALESCE(emc_export, '')) AS variants
+        FROM {db_table}
+        WHERE dateobserved IN ({','.join(['?'] * len(dates))})
+          AND timeobserved IN ({','.join(['?'] * len(ALLOWED_TIMES))})
+        GROUP BY {db_code_column}, dateobserved, timeobserved
+    """, (*dates, *ALLOWED_TIMES))
+
+    days = {}
+    for row in cursor:
+        entry = days.setdefault((row['dateobserved'], row['code']), [0, 0, 0, 0])
+        bit = 1 << SLOT_INDEX[row['timeobserved']]
+        entry[0] |= bit
+        if row['row_count'] > 1:
+            entry[1] |= bit
+            entry[3] += row['row_count'] - 1
+        if row['variants'] > 1:
+            entry[2] |= bit
+    conn.close()
+    return [(d, code, *entry) for (d, code), entry in days.items()]
+
+
+def _day_results(db_path, dates, db_table, db_code_column):
+    """
+    Returns the per-day results of the dates, from the sidecar store where still
+    valid and from one scan of the readings for the rest, and the readings per date.
+
+    Returns:
+        tuple: (list of sqlite3.Row with date, code, present_mask, duplicate_mask,
+                conflict_mask, extra_rows; {date: row count})
+    """
+    db_version = str(get_db_version(db_path))
+    row_counts = get_row_counts(db_path, dates, db_table)
+
+    with _scan_lock:
+        store = get_sidecar_connection(db_path, SIDECAR_NAME)
+        try:
+            store.executescript(_SCHEMA)
+            stored = {row['date']: row for row in store.execute(
+                f"SELECT date, row_count, db_version FROM completeness_days WHERE db_table = ? AND date IN ({','.join(['?'] * len(dates))})",
+                (db_table, *dates))}
+            stale = stale_days(dates, stored, row_counts, db_version)
+
+            if stale:
+                scanned = _scan_days(db_path, stale, db_table, db_code_column)
+                placeholders = ','.join(['?'] * len(stale))
+                store.execute(f"DELETE FROM completeness_day_codes WHERE db_table = ? AND date IN ({placeholders})", (db_table, *stale))
+                store.executemany("INSERT OR REPLACE INTO completeness_days (db_table, date, row_count, db_version) VALUES (?, ?, ?, ?)",
+                                  [(db_table, d, row_counts.get(d, 0), db_version) for d in stale])
+                store.executemany("""
+                    INSERT INTO completeness_day_codes
+                        (db_table, date, code, present_mask, duplicate_mask, conflict_mask, extra_rows)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [(db_table, *result) for result in scanned])
+                store.commit()
+
+            rows = store.execute(
+                f"SELECT * FROM completeness_day_codes WHERE db_table = ? AND date IN ({','.join(['?'] * len(dates))})",
+                (db_table, *dates)).fetchall()
+        finally:
+            store.close()
+
+    return rows, row_counts
+
+
+def get_data_completeness(db_path, query_dates, db_table="sosht", db_code_column="feedercode"):
+    """
+    Returns missing, duplicate and conflicting readings of every code over a range of dates.
+
+    Dates without any reading in the table (not yet entered) are listed separately
+    and not counted as missing. Codes are the table's master list plus any other
+    code with readings in the range.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        query_dates (list of str): Dates in 'DD-MM-YYYY' format.
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for code ('feedercode', 'tfcode').
+
+    Returns:
+        dict: {
+            'empty_dates': [...],
+            'codes': [{'code': ..., 'expected': ..., 'present': ..., 'missing': ..., 'duplicates': ...,
+                       'conflicts': ..., 'extra_rows': ..., 'complete_days': ..., 'completeness_percent': ...}, ...],
+            'issues': [{'code': ..., 'date': ..., 'missing': [times], 'all_missing': no reading that day,
+                        'duplicates': [times], 'conflicts': [times]}, ...]   # by code, then date
+        }
+    """
+    rows, row_counts = _day_results(db_path, query_dates, db_table, db_code_column)
+    entered = [d for d in query_dates if row_counts.get(d)]
+    days = {(row['date'], row['code']): row for row in rows}
+    codes = list(CODE_ORDERS[db_table](db_path))
+    codes += sorted({row['code'] for row in rows} - set(codes))
+
+    summary = []
+    issues = []
+    for code in codes:
+        entry = {'code': code, 'expected': len(entered) * len(ALLOWED_TIMES), 'present': 0, 'missing': 0,
+                 'duplicates': 0, 'conflicts': 0, 'extra_rows': 0, 'complete_days': 0}
+        for d in entered:
+            day = days.get((d, code))
+            present = day['present_mask'] if day else 0
+            duplicate = day['duplicate_mask'] if day else 0
+            conflict = day['conflict_mask'] if day else 0
+            missing = FULL_DAY_MASK & ~present
+            entry['present'] += bin(present).count('1')
+            entry['missing'] += bin(missing).count('1')
+            entry['duplicates'] += bin(duplicate).count('1')
+            entry['conflicts'] += bin(conflict).count('1')
+            entry['extra_rows'] += day['extra_rows'] if day else 0
+            if missing or duplicate:
+                issues.append({'code': code, 'date': d, 'missing': _slot_times(missing), 'all_missing': not present,
+                               'duplicates': _slot_times(duplicate), 'conflicts': _slot_times(conflict)})
+            else:
+                entry['complete_days'] += 1
+        entry['completeness_percent'] = round(entry['present'] / entry['expected'] * 100, 2) if entry['expected'] else None
+        summary.append(entry)
+
+    return {
+        'empty_dates': [d for d in query_dates if not row_counts.get(d)],
+        'codes': summary,
+        'issues': issues
+    }
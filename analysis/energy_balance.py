@@ -0,0 +1,194 @@
+"""
+Module to reconcile substation energy balance between EHT incomers, transformers and 11 kV feeders.
+Computes hourly, daily and monthly balance, transformation losses and percentage loss per period.
+"""
+
+from analysis.meter_validation import INTEGRITY_FLAGS, get_reading_flags
+from routes.db_service import get_connection
+from utils.slot_calendar import hourly_slot, month_boundary_dates, month_dates
+
+# 11 kV incomers are the transformer LV side, not outgoing feeders
+HT_INCOMER_CODES = ('INCOMER I', 'INCOMER II')
+
+# Table and code column behind each side of the balance
+BALANCE_TABLES = {
+    'eht': ('soseht', 'feedercode'),
+    'tf': ('sostf', 'tfcode'),
+    'ht': ('sosht', 'feedercode'),
+}
+BALANCE_COLUMNS = {'eht': 'eht_net', 'tf': 'tf_energy', 'ht': 'ht_outgoing'}
+
+# Periods whose loss exceeds this percentage (in either direction) are flagged
+DEFAULT_LOSS_THRESHOLD = 3.0
+
+
+def _balance(eht_net, tf_energy, ht_outgoing, loss_threshold):
+    """
+    Returns loss figures and a flag for one period.
+    """
+    eht_net, tf_energy, ht_outgoing = (round(v, 2) if v is not None else None for v in (eht_net, tf_energy, ht_outgoing))
+    transformation_loss = None
+    distribution_loss = None
+    total_loss = None
+    loss_percent = None
+    flag = None
+
+    if eht_net is not None and tf_energy is not None:
+        transformation_loss = round(eht_net - tf_energy, 2)
+    if tf_energy is not None and ht_outgoing is not None:
+        distribution_loss = round(tf_energy - ht_outgoing, 2)
+    if eht_net is not None and ht_outgoing is not None:
+        total_loss = round(eht_net - ht_outgoing, 2)
+        if eht_net:
+            loss_percent = round(total_loss / eht_net * 100, 2)
+
+    if loss_percent is not None:
+        if loss_percent > loss_threshold:
+            flag = 'high_loss'
+        elif loss_percent < -loss_threshold:
+            flag = 'negative_loss'
+
+    return {
+        'eht_net': eht_net,
+        'tf_energy': tf_energy,
+        'ht_outgoing': ht_outgoing,
+        'transformation_loss': transformation_loss,
+        'distribution_loss': distribution_loss,
+        'total_loss': total_loss,
+        'loss_percent': loss_percent,
+        'flag': flag
+    }
+
+
+def _sum_periods(rows, key):
+    """
+    Sums hourly balance rows into periods grouped by `key(row)`, preserving order.
+    """
+    periods = {}
+    for row in rows:
+        period = periods.setdefault(key(row), {'eht_net': None, 'tf_energy': None, 'ht_outgoing': None, 'excluded_readings': 0})
+        for column in ('eht_net', 'tf_energy', 'ht_outgoing'):
+            if row[column] is not None:
+                period[column] = (period[column] or 0) + row[column]
+        period['excluded_readings'] += row['excluded_readings']
+    return periods
+
+
+def get_energy_balance(db_path, year_month, loss_threshold=DEFAULT_LOSS_THRESHOLD, incomers=HT_INCOMER_CODES):
+    """
+    Returns the hourly, daily and monthly energy balance of the substation for a month.
+
+    EHT net energy is soseht import minus export, transformer energy is sostf import minus export
+    and 11 kV outgoing energy is sosht export minus import (excluding the 11 kV incomers).
+    Hourly deltas are multiplied by MF; negative deltas, deltas with a register-integrity
+    flag (rollover, reset, MF change) and deltas over a missing hourly reading are excluded
+    from the balance and counted in 'excluded_readings'. Outliers are real energy and stay in the balance.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        year_month (str): Month in 'YYYY-MM' format.
+        loss_threshold (float): Loss percentage above which a period is flagged.
+        incomers (tuple of str): 11 kV incomer codes excluded from outgoing energy.
+
+    Returns:
+        dict: {
+            'hourly': [{'date': ..., 'time': ..., 'eht_net': ..., 'tf_energy': ..., 'ht_outgoing': ...,
+                        'transformation_loss': ..., 'distribution_loss': ..., 'total_loss': ...,
+                        'loss_percent': ..., 'flag': ..., 'excluded_readings': ...}, ...],
+            'daily': [same keys without 'time', ...],
+            'monthly': same keys without 'date'/'time'
+        }
+    """
+    # Previous month's last date supplies the reading before 01:00 of day one
+    dates = [month_boundary_dates(year_month)[0]] + month_dates(year_month)
+    date_params = ','.join(['?'] * len(dates))
+    incomer_params = ','.join(['?'] * len(incomers))
+
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    # One statement over all three tables: hourly readings keyed by (date, time),
+    # per-code deltas (x MF) computed by LAG in SQLite
+    cursor.execute(f"""
+        WITH readings AS (
+            SELECT 'eht' AS grp, feedercode AS code, dateobserved, timeobserved,
+                   emc_import, emc_export, mf_import, mf_export
+            FROM soseht
+            WHERE dateobserved IN ({date_params}) AND timeobserved LIKE '%:00'
+            UNION ALL
+            SELECT 'tf', tfcode, dateobserved, timeobserved,
+                   emc_import, emc_export, mf_import, mf_export
+            FROM sostf
+            WHERE dateobserved IN ({date_params}) AND timeobserved LIKE '%:00'
+            UNION ALL
+            SELECT 'ht', feedercode, dateobserved, timeobserved,
+                   emc_import, emc_export, mf_import, mf_export
+            FROM sosht
+            WHERE dateobserved IN ({date_params}) AND timeobserved LIKE '%:00'
+              AND feedercode NOT IN ({incomer_params})
+        ),
+        deltas AS (
+            SELECT grp, code, dateobserved, timeobserved,
+                   (emc_import - LAG(emc_import) OVER w) * mf_import AS d_import,
+                   (emc_export - LAG(emc_export) OVER w) * mf_export AS d_export,
+                   LAG(dateobserved) OVER w AS prev_date,
+                   LAG(timeobserved) OVER w AS prev_time
+            FROM readings
+            WINDOW w AS (
+                PARTITION BY grp, code
+                ORDER BY substr(dateobserved, 7, 4) || substr(dateobserved, 4, 2) || substr(dateobserved, 1, 2) || timeobserved
+            )
+        )
+        SELECT grp, code, dateobserved, timeobserved, d_import, d_export, prev_date, prev_time
+        FROM deltas
+        WHERE prev_time IS NOT NULL AND dateobserved != ?
+    """, (*dates, *dates, *dates, *incomers, dates[0]))
+
+    # Rollover/reset/MF change flags from meter validation, one cached query per table
+    reading_flags = {
+        grp: get_reading_flags(db_path, dates[1:], db_table, db_code_column)
+        for grp, (db_table, db_code_column) in BALANCE_TABLES.items()
+    }
+
+    # Net energy per (date, time): EHT and T/F import - export, HT outgoing export - import
+    periods = {}
+    for grp, code, date, time, d_import, d_export, prev_date, prev_time in cursor:
+        period = periods.setdefault((date, time), {'eht_net': None, 'tf_energy': None, 'ht_outgoing': None, 'excluded_readings': 0})
+        if d_import is None or d_export is None:
+            continue
+        # A delta after a missing reading spans several hours and cannot be booked to this one
+        consecutive = hourly_slot(prev_date, prev_time) == hourly_slot(date, time) - 1
+        flags = reading_flags[grp][date].get((code, time), {})
+        if not consecutive or d_import < 0 or d_export < 0 or not INTEGRITY_FLAGS.isdisjoint(flags.values()):
+            period['excluded_readings'] += 1
+            continue
+        column = BALANCE_COLUMNS[grp]
+        net = d_export - d_import if grp == 'ht' else d_import - d_export
+        period[column] = (period[column] or 0) + net
+    conn.close()
+
+    # Order by date (as listed) then time
+    date_order = {date: i for i, date in enumerate(dates)}
+    hourly = []
+    for (date, time) in sorted(periods, key=lambda k: (date_order[k[0]], k[1])):
+        period = periods[(date, time)]
+        balance = _balance(period['eht_net'], period['tf_energy'], period['ht_outgoing'], loss_threshold)
+        balance.update({'date': date, 'time': time, 'excluded_readings': period['excluded_readings']})
+        hourly.append(balance)
+
+    daily = []
+    for date, period in _sum_periods(hourly, lambda r: r['date']).items():
+        balance = _balance(period['eht_net'], period['tf_energy'], period['ht_outgoing'], loss_threshold)
+        balance.update({'date': date, 'excluded_readings': period['excluded_readings']})
+        daily.append(balance)
+
+    monthly = None
+    month_period = _sum_periods(hourly, lambda r: year_month).get(year_month)
+    if month_period:
+        monthly = _balance(month_period['eht_net'], month_period['tf_energy'], month_period['ht_outgoing'], loss_threshold)
+        monthly['excluded_readings'] = month_period['excluded_readings']
+
+    return {
+        'hourly': hourly,
+        'daily': daily,
+        'monthly': monthly
+    }
@@ -2,9 +2,12 @@
 Module to calculate hourly EMC export/import differences and station load.
 """
 
-from datetime import datetime, timedelta
+import numpy as np
 from analysis.utils import get_eht_feeder_order, get_tf_order, max_decimal_places, get_ht_feeder_order, sort_by_order
+from analysis.meter_validation import get_daily_reading_flags, get_reading_flags
+from analysis.station_load import get_load_at, get_load_series, station_formula
 from routes.db_service import get_connection
+from utils.slot_calendar import ALLOWED_TIMES, HOURLY_TIMES, SLOT_INDEX, previous_date, previous_hourly_slot
 
 
 def get_em_diff(date_str, time_str, db_path, db_table, db_code_column="feedercode"):
@@ -27,93 +30,61 @@ def get_em_diff(date_str, time_str, db_path, db_table, db_code_column="feedercod
                 emc_export: ...,
                 emc_import: ...,
                 delta_emc_export: ...,
-                delta_emc_import: ...
+                delta_emc_import: ...,
+                export_flag: ...,  # validation flag of delta_emc_export or None
+                import_flag: ...   # validation flag of delta_emc_import or None
             }
     """
+    return get_em_diff_range([(date_str, time_str)], db_path, db_table, db_code_column)[(date_str, time_str)]
+
+def get_em_diff_range(slots, db_path, db_table, db_code_column="feedercode"):
+    """
+    Same as get_em_diff for several slots, with the readings of all slots (and of the
+    hour before each hourly slot) fetched in a single query.
+
+    Args:
+        slots (list of tuple): (date 'dd-mm-yyyy', time 'HH:MM') pairs.
+        db_path (str): Path to the SQLite database.
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for feeder/transformer code ('feedercode', 'tfcode').
+
+    Returns:
+        dict: {(date, time): list of dict as returned by get_em_diff}
+    """
+    # Previous hour of each slot (previous hour for 01:00 is previous day 24:00; half-hourly slots have none)
+    previous_slots = {slot: previous_hourly_slot(*slot) for slot in slots}
+    wanted = list(dict.fromkeys(list(slots) + [prev for prev in previous_slots.values() if prev[1]]))
+
     # Connect to the database using shared service
     conn = get_connection(db_path)
     cursor = conn.cursor()
 
-    # Prepare query for current data
-    query = f"""
+    # Fetch the readings of all wanted slots: {(date, time): rows}
+    cursor.execute(f"""
+    WITH slots(slot_date, slot_time) AS (
+        VALUES {', '.join(['(?, ?)'] * len(wanted))}
+    )
     SELECT 
+        dateobserved,
+        timeobserved,
         {db_code_column},
         current,
         emc_export,
         emc_import
-    FROM {db_table}
-    WHERE dateobserved = ?
-      AND timeobserved = ?
-    """
-
-    # Fetch current rows
-    cursor.execute(query, (date_str, time_str))
-    current_rows = cursor.fetchall()
-
-    # Determine previous time and date for difference calculation
-    previous_time = None
-    previous_date = date_str
-    if str(time_str).endswith(":00"):
-        hour = int(time_str[:2]) - 1
-        if hour < 1:
-            # Previous hour for 01:00 is previous day 24:00
-            previous_time = "24:00"
-            # Convert date_str from dd-mm-yyyy to datetime and subtract one day
-            previous_date = (datetime.strptime(
-                date_str, "%d-%m-%Y") - timedelta(days=1)).strftime("%d-%m-%Y")
-        else:
-            previous_time = f"{hour:02d}:00"
-
-    # Fetch previous rows if applicable
-    previous_export_data = {}
-    previous_import_data = {}
-    previous_current_data = {}
-    if previous_time:
-        cursor.execute(query, (previous_date, previous_time))
-        for row in cursor.fetchall():
-            previous_export_data[row[db_code_column]] = row['emc_export']
-            previous_import_data[row[db_code_column]] = row['emc_import']
-            previous_current_data[row[db_code_column]] = row['current']
+    FROM slots
+    JOIN {db_table} ON dateobserved = slot_date AND timeobserved = slot_time
+    """, [value for slot in wanted for value in slot])
+    rows_by_slot = {}
+    for row in cursor:
+        rows_by_slot.setdefault((row['dateobserved'], row['timeobserved']), []).append(row)
 
     # Close the database connection
     conn.close()
 
-    result = []
-    for row in current_rows:
-        feeder = row[db_code_column]
-        current_export = row['emc_export']
-        current_import = row['emc_import']
-        current_current = row['current']
-        prev_export = previous_export_data.get(feeder)
-        prev_import = previous_import_data.get(feeder)
-        prev_current = previous_current_data.get(feeder)
-
-        # Calculate export difference if hourly and both current and previous values are available (>0)
-        if (str(time_str).endswith(":00")
-            and current_current > 0 and prev_current > 0):
-            digits = max_decimal_places(current_export, prev_export)
-            delta_export = round(current_export - prev_export, digits)
-        else:
-            delta_export = None
-
-        # Calculate import difference if hourly and both current and previous values are available (>0)
-        if (str(time_str).endswith(":00") 
-            and current_current > 0 and prev_current > 0):
-            digits = max_decimal_places(current_import, prev_import)
-            delta_import = round(current_import - prev_import, digits)
-        else:
-            delta_import = None
-
-        # Append result for this feeder/transformer
-        result.append({
-            'code': feeder,
-            'current': row['current'],
-            'emc_export': current_export,
-            'emc_import': current_import,
-            'delta_emc_export': delta_export,
-            'delta_emc_import': delta_import
-        })
-    
+    # Rollover/reset/outlier flags for the days' hourly deltas
+    flag_dates = list(dict.fromkeys(date for (date, _), prev in previous_slots.items() if prev[1]))
+    flags_by_date = get_reading_flags(db_path, flag_dates, db_table, db_code_column) if flag_dates else {}
+
     # Sort result based on feeder/transformer order from master tables
     code_order = []
     if db_table == "sosht":
@@ -122,40 +93,199 @@ def get_em_diff(date_str, time_str, db_path, db_table, db_code_column="feedercod
         code_order = get_eht_feeder_order(db_path)
     elif db_table == "sostf":
         code_order = get_tf_order(db_path)
-    result = sort_by_order(result, 'code', code_order)
 
-    return result
+    results = {}
+    for (date_str, time_str) in slots:
+        previous_date, previous_time = previous_slots[(date_str, time_str)]
+
+        # Previous readings if applicable: {code: (current, emc_export, emc_import)}
+        previous_data = {}
+        if previous_time:
+            for row in rows_by_slot.get((previous_date, previous_time), []):
+                previous_data[row[db_code_column]] = (row['current'], row['emc_export'], row['emc_import'])
+        reading_flags = flags_by_date.get(date_str, {}) if previous_time else {}
 
-def get_station_load(date_str, time_str, db_path):
+        result = []
+        for row in rows_by_slot.get((date_str, time_str), []):
+            feeder = row[db_code_column]
+            current_export = row['emc_export']
+            current_import = row['emc_import']
+            current_current = row['current']
+            prev_current, prev_export, prev_import = previous_data.get(feeder, (None, None, None))
+
+            # Calculate export difference if hourly and both current and previous values are available (>0)
+            if (previous_time
+                and current_current > 0 and prev_current is not None and prev_current > 0):
+                digits = max_decimal_places(current_export, prev_export)
+                delta_export = round(current_export - prev_export, digits)
+            else:
+                delta_export = None
+
+            # Calculate import difference if hourly and both current and previous values are available (>0)
+            if (previous_time
+                and current_current > 0 and prev_current is not None and prev_current > 0):
+                digits = max_decimal_places(current_import, prev_import)
+                delta_import = round(current_import - prev_import, digits)
+            else:
+                delta_import = None
+
+            flags = reading_flags.get((feeder, time_str), {})
+
+            # Append result for this feeder/transformer
+            result.append({
+                'code': feeder,
+                'current': row['current'],
+                'emc_export': current_export,
+                'emc_import': current_import,
+                'delta_emc_export': delta_export,
+                'delta_emc_import': delta_import,
+                'export_flag': flags.get('export'),
+                'import_flag': flags.get('import')
+            })
+
+        results[(date_str, time_str)] = sort_by_order(result, 'code', code_order)
+
+    return results
+
+def get_day_matrix(date_str, db_path, db_table, db_code_column="feedercode"):
     """
-    Calculates station load on 110 kV side as the difference in 'current' between '1PLPM' and '1PMKJ'
+    Returns current and Δ EM Import/Export of every feeder/transformer at every allowed
+    time slot of a day (codes x slots), as get_em_diff would return them slot by slot.
+    The day's readings and the previous day's 24:00 are fetched in one query and the
+    hourly deltas are computed by shifting the hourly columns by one.
 
     Args:
         date_str (str): Date in 'dd-mm-yyyy' format.
-        time_str (str): Time in 'HH:MM' format.
         db_path (str): Path to the SQLite database.
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for feeder/transformer code ('feedercode', 'tfcode').
 
     Returns:
-        float or None: The station load (1PLPM - 1PMKJ) or None if data is missing.
+        list of dict: One dict per code, each list holding one value per ALLOWED_TIMES slot:
+            {
+                code: ...,
+                current: [...],
+                delta_emc_export: [...],  # None for half-hourly slots and missing readings
+                delta_emc_import: [...],
+                export_flag: [...],       # validation flag of delta_emc_export or None
+                import_flag: [...]
+            }
     """
     conn = get_connection(db_path)
     cursor = conn.cursor()
-    query = """
-        SELECT feedercode, current
-        FROM soseht
-        WHERE dateobserved = ?
-          AND timeobserved = ?
-          AND feedercode IN ('1PLPM', '1PMKJ')
-    """
-    cursor.execute(query, (date_str, time_str))
-    rows = {row['feedercode']: row['current'] for row in cursor.fetchall()}
+    cursor.execute(f"""
+        SELECT {db_code_column}, dateobserved, timeobserved, current, emc_export, emc_import
+        FROM {db_table}
+        WHERE (dateobserved = ? AND timeobserved IN ({','.join(['?'] * len(ALLOWED_TIMES))}))
+           OR (dateobserved = ? AND timeobserved = '24:00')
+    """, (date_str, *ALLOWED_TIMES, previous_date(date_str)))
+    rows = cursor.fetchall()
     conn.close()
 
-    if '1PLPM' in rows and '1PMKJ' in rows:
-        if rows['1PLPM'] < 0:
-            return rows['1PMKJ']
-        elif rows['1PMKJ'] < 0:
-            return rows['1PLPM']
-        return rows['1PLPM'] - rows['1PMKJ']
-    
-    return None
\ No newline at end of file
+    # Column 0 is the previous day's 24:00, column i + 1 is ALLOWED_TIMES[i]
+    codes = list(dict.fromkeys(row[db_code_column] for row in rows if row['dateobserved'] == date_str))
+    code_index = {code: i for i, code in enumerate(codes)}
+    shape = (len(codes), len(ALLOWED_TIMES) + 1)
+    current = np.full(shape, np.nan)
+    emc = {channel: np.full(shape, np.nan) for channel in ('export', 'import')}
+    # Decimal places of each reading, for rounding deltas like get_em_diff
+    digits = {channel: np.zeros(shape, dtype=int) for channel in ('export', 'import')}
+    current_values = [[None] * len(ALLOWED_TIMES) for _ in codes]
+
+    for row in rows:
+        i = code_index.get(row[db_code_column])
+        if i is None:
+            continue
+        column = 0 if row['dateobserved'] != date_str else SLOT_INDEX[row['timeobserved']] + 1
+        if column:
+            current_values[i][column - 1] = row['current']
+        if row['current'] is not None:
+            current[i, column] = row['current']
+        for channel in ('export', 'import'):
+            value = row[f'emc_{channel}']
+            if value is not None:
+                emc[channel][i, column] = value
+            digits[channel][i, column] = max_decimal_places(value, 0)
+
+    # Hourly columns in order (previous day's 24:00 first); deltas need a positive current on both readings
+    hourly = [0] + [SLOT_INDEX[time] + 1 for time in HOURLY_TIMES]
+    hourly_current = current[:, hourly]
+    with np.errstate(invalid='ignore'):
+        valid = (hourly_current[:, 1:] > 0) & (hourly_current[:, :-1] > 0)
+    deltas = {}
+    delta_digits = {}
+    for channel in ('export', 'import'):
+        series = emc[channel][:, hourly]
+        deltas[channel] = np.where(valid, series[:, 1:] - series[:, :-1], np.nan)
+        delta_digits[channel] = np.maximum(digits[channel][:, hourly][:, 1:], digits[channel][:, hourly][:, :-1])
+
+    reading_flags = get_daily_reading_flags(db_path, date_str, db_table, db_code_column)
+
+    result = []
+    for i, code in enumerate(codes):
+        entry = {
+            'code': code,
+            'current': current_values[i],
+            'delta_emc_export': [None] * len(ALLOWED_TIMES),
+            'delta_emc_import': [None] * len(ALLOWED_TIMES),
+            'export_flag': [None] * len(ALLOWED_TIMES),
+            'import_flag': [None] * len(ALLOWED_TIMES)
+        }
+        for hour, time in enumerate(HOURLY_TIMES):
+            slot = SLOT_INDEX[time]
+            for channel in ('export', 'import'):
+                delta = deltas[channel][i, hour]
+                if not np.isnan(delta):
+                    places = int(delta_digits[channel][i, hour])
+                    entry[f'delta_emc_{channel}'][slot] = round(float(delta), places) if places else int(round(delta))
+            flags = reading_flags.get((code, time), {})
+            entry['export_flag'][slot] = flags.get('export')
+            entry['import_flag'][slot] = flags.get('import')
+        result.append(entry)
+
+    code_order = []
+    if db_table == "sosht":
+        code_order = get_ht_feeder_order(db_path)
+    elif db_table == "soseht":
+        code_order = get_eht_feeder_order(db_path)
+    elif db_table == "sostf":
+        code_order = get_tf_order(db_path)
+    return sort_by_order(result, 'code', code_order)
+
+def get_station_load(date_str, time_str, db_path, feeder_in='1PLPM', feeder_out='1PMKJ', formula=None):
+    """
+    Calculates station load on 110 kV side as the difference in 'current' between feeder_in and feeder_out,
+    or with a configured station load formula (see analysis.station_load).
+
+    Args:
+        date_str (str): Date in 'dd-mm-yyyy' format.
+        time_str (str): Time in 'HH:MM' format.
+        db_path (str): Path to the SQLite database.
+        feeder_in (str): EHT feeder bringing power into the station (default '1PLPM').
+        feeder_out (str): EHT feeder taking power onward (default '1PMKJ').
+        formula (str or None): Station load formula; defaults to feeder_in - feeder_out.
+
+    Returns:
+        float or None: The station load or None if data is missing (negative currents count as missing).
+    """
+    formula = station_formula(feeder_in, feeder_out, formula)
+    return get_load_at(db_path, date_str, time_str, formula)
+
+def get_station_load_range(slots, db_path, feeder_in='1PLPM', feeder_out='1PMKJ', formula=None):
+    """
+    Same as get_station_load for several slots, computed in a single query.
+
+    Args:
+        slots (list of tuple): (date 'dd-mm-yyyy', time 'HH:MM') pairs.
+        db_path (str): Path to the SQLite database.
+        feeder_in (str): EHT feeder bringing power into the station (default '1PLPM').
+        feeder_out (str): EHT feeder taking power onward (default '1PMKJ').
+        formula (str or None): Station load formula; defaults to feeder_in - feeder_out.
+
+    Returns:
+        dict: {(date, time): station load or None}
+    """
+    formula = station_formula(feeder_in, feeder_out, formula)
+    dates = list(dict.fromkeys(date for date, _ in slots))
+    loads = {(date, time): value for date, time, value in get_load_series(db_path, dates, formula)}
+    return {slot: loads.get(slot) for slot in slots}
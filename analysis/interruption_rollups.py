@@ -0,0 +1,298 @@
+"""
+Module to keep per-month interruption rollups in a sidecar database.
+
+The sidecar holds every interruption with its duration computed once, and
+counts/durations per (month, fdrtype, feeder, belongsto, responsibleby).
+It is refreshed only for months whose rows in `intrpns` changed, detected by
+a per-month signature (a hash of the month's rows).
+"""
+
+import hashlib
+import threading
+
+from analysis.utils import get_db_version
+from routes.db_service import get_connection, get_sidecar_connection
+
+SIDECAR_NAME = "rollups"
+# Layout of the store; stores of another layout are rebuilt from scratch
+SCHEMA_VERSION = "2"
+
+# Changes to these columns are picked up by the month signature
+SIGNATURE_COLUMNS = ('slno', 'fdrtype', 'feedercode', 'started', 'ended', 'dateto', 'duration', 'grpslno',
+                     'responsibleby', 'belongsto', 'remarks', 'relays')
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rollup_state (key TEXT PRIMARY KEY, value TEXT);
+    CREATE TABLE IF NOT EXISTS rollup_months (month TEXT PRIMARY KEY, signature TEXT);
+    CREATE TABLE IF NOT EXISTS interruption_events (
+        month TEXT, slno INTEGER, fdrtype TEXT, feedercode TEXT, started TEXT, ended TEXT,
+        duration_minutes INTEGER, responsibleby TEXT, belongsto TEXT, remarks TEXT, relays TEXT,
+        closed INTEGER, grpslno INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_events_month ON interruption_events (month, fdrtype, started);
+    CREATE TABLE IF NOT EXISTS interruption_rollup (
+        month TEXT, fdrtype TEXT, feedercode TEXT, belongsto TEXT, responsibleby TEXT,
+        interruption_count INTEGER, group_count INTEGER, duration INTEGER,
+        closed_count INTEGER, closed_minutes INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_rollup_month ON interruption_rollup (month, fdrtype);
+"""
+
+_DROP_SCHEMA = """
+    DROP TABLE IF EXISTS rollup_state;
+    DROP TABLE IF EXISTS rollup_months;
+    DROP TABLE IF EXISTS interruption_events;
+    DROP TABLE IF EXISTS interruption_rollup;
+"""
+
+# One refresh at a time per database and store
+_refresh_locks = {}
+_refresh_locks_guard = threading.Lock()
+# Month signatures of the last database version seen: {db_path: (db_version, signatures)}
+_signatures = {}
+
+
+def refresh_lock(db_path, store_name):
+    """
+    Returns the lock that allows one refresh at a time of the sidecar store store_name of db_path.
+    """
+    with _refresh_locks_guard:
+        return _refresh_locks.setdefault((db_path, store_name), threading.Lock())
+
+
+def next_month(year_month):
+    year, month = map(int, year_month.split('-'))
+    return f"{year + month // 12:04d}-{month % 12 + 1:02d}"
+
+
+def month_signatures(conn):
+    """
+    Returns {month ('YYYY-MM'): signature} of the interruptions in intrpns (conn).
+    The signature is a SHA-1 of the month's rows (SIGNATURE_COLUMNS, in slno order),
+    so any edit to a row changes the signature of its month.
+    """
+    digests = {}
+    for row in conn.execute(f"""
+        SELECT substr(started, 1, 7) AS month, {', '.join(SIGNATURE_COLUMNS)}
+        FROM intrpns
+        WHERE started IS NOT NULL
+        ORDER BY month, slno, rowid
+    """):
+        digest = digests.get(row[0])
+        if digest is None:
+            digest = digests[row[0]] = hashlib.sha1()
+        digest.update(repr(tuple(row)[1:]).encode('utf-8'))
+    return {month: digest.hexdigest() for month, digest in digests.items()}
+
+
+def get_month_signatures(db_path, conn):
+    """
+    Returns month_signatures(conn) of db_path, hashed once per database version and
+    shared by the rollup, search and reliability stores.
+    """
+    db_version = get_db_version(db_path)
+    cached = _signatures.get(db_path)
+    if cached and cached[0] == db_version:
+        return cached[1]
+    signatures = month_signatures(conn)
+    _signatures[db_path] = (db_version, signatures)
+    return signatures
+
+
+def stale_months(db_path, conn, stored):
+    """
+    Compares the month signatures of db_path with those a sidecar store was built from.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        conn (sqlite3.Connection): Connection to db_path.
+        stored (dict): {month: signature} of the store.
+
+    Returns:
+        tuple: (signatures of db_path, months changed or added, months removed), months sorted.
+    """
+    source = get_month_signatures(db_path, conn)
+    changed = sorted(month for month, signature in source.items() if stored.get(month) != signature)
+    removed = sorted(set(stored) - set(source))
+    return source, changed, removed
+
+
+def refresh_interruption_rollups(db_path):
+    """
+    Brings the sidecar rollups of db_path up to date. Does nothing while the database
+    file is unchanged; otherwise rebuilds only the months whose interruption rows changed.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+
+    Returns:
+        list of str: Months ('YYYY-MM') that were rebuilt or removed.
+    """
+    db_version = str(get_db_version(db_path))
+    with refresh_lock(db_path, SIDECAR_NAME):
+        store = get_sidecar_connection(db_path, SIDECAR_NAME)
+        try:
+            store.executescript(_SCHEMA)
+            state = dict(store.execute("SELECT key, value FROM rollup_state").fetchall())
+            if state.get('schema') != SCHEMA_VERSION:
+                store.executescript(_DROP_SCHEMA)
+                store.executescript(_SCHEMA)
+                state = {}
+            if state.get('db_version') == db_version:
+                return []
+
+            conn = get_connection(db_path)
+            try:
+                months = _refresh_months(db_path, conn, store)
+            finally:
+                conn.close()
+
+            store.executemany("INSERT OR REPLACE INTO rollup_state (key, value) VALUES (?, ?)",
+                              (('db_version', db_version), ('schema', SCHEMA_VERSION)))
+            store.commit()
+            return months
+        finally:
+            store.close()
+
+
+def _refresh_months(db_path, conn, store):
+    """
+    Rebuilds the months whose signature differs between intrpns (conn) and the store.
+    Returns the rebuilt and removed months.
+    """
+    stored = {row[0]: row[1] for row in store.execute("SELECT month, signature FROM rollup_months")}
+    source, changed, removed = stale_months(db_path, conn, stored)
+
+    for month in changed + removed:
+        store.execute("DELETE FROM interruption_events WHERE month = ?", (month,))
+        store.execute("DELETE FROM interruption_rollup WHERE month = ?", (month,))
+        store.execute("DELETE FROM rollup_months WHERE month = ?", (month,))
+
+    for month in changed:
+        # Range on started; durations computed once here instead of per request
+        rows = conn.execute("""
+            SELECT slno, fdrtype, feedercode, started, ended, responsibleby, belongsto, remarks, relays,
+                   grpslno, duration,
+                   CASE WHEN dateto IS ended THEN 1 ELSE 0 END AS closed,
+                   strftime('%s', ended) - strftime('%s', started) AS seconds
+            FROM intrpns
+            WHERE started >= ? AND started < ?
+            ORDER BY started, slno
+        """, (month, next_month(month))).fetchall()
+
+        events = []
+        rollup = {}
+        for row in rows:
+            minutes = row['seconds'] // 60 if row['seconds'] is not None else None
+            events.append((month, row['slno'], row['fdrtype'], row['feedercode'], row['started'], row['ended'],
+                           minutes, row['responsibleby'], row['belongsto'], row['remarks'], row['relays'], row['closed'],
+                           row['grpslno']))
+
+            key = (row['fdrtype'], row['feedercode'], row['belongsto'], row['responsibleby'])
+            entry = rollup.setdefault(key, {'count': 0, 'groups': set(), 'duration': None,
+                                            'closed_count': 0, 'closed_minutes': None})
+            entry['count'] += 1
+            entry['groups'].add(row['grpslno'])
+            if row['duration'] is not None:
+                entry['duration'] = (entry['duration'] or 0) + row['duration']
+            if row['closed']:
+                entry['closed_count'] += 1
+                if minutes is not None:
+                    entry['closed_minutes'] = (entry['closed_minutes'] or 0) + minutes
+
+        store.executemany("""
+            INSERT INTO interruption_events
+                (month, slno, fdrtype, feedercode, started, ended, duration_minutes,
+                 responsibleby, belongsto, remarks, relays, closed, grpslno)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, events)
+        store.executemany("""
+            INSERT INTO interruption_rollup
+                (month, fdrtype, feedercode, belongsto, responsibleby, interruption_count,
+                 group_count, duration, closed_count, closed_minutes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(month, *key, entry['count'], len(entry['groups']), entry['duration'],
+               entry['closed_count'], entry['closed_minutes']) for key, entry in rollup.items()])
+        store.execute("INSERT INTO rollup_months (month, signature) VALUES (?, ?)", (month, source[month]))
+
+    return changed + removed
+
+
+def get_interruption_events(db_path, year_month, fdrtype, closed_only=True):
+    """
+    Returns the interruptions of a month from the rollup store, ordered by start time.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        year_month (str): Month in 'YYYY-MM' format.
+        fdrtype (str): 'EHT', 'T/F' or 'HTs'.
+        closed_only (bool): Only interruptions whose dateto equals ended.
+
+    Returns:
+        list of sqlite3.Row: feedercode, started, ended, duration_minutes, responsibleby,
+                             belongsto, remarks, relays.
+    """
+    refresh_interruption_rollups(db_path)
+    store = get_sidecar_connection(db_path, SIDECAR_NAME)
+    rows = store.execute(f"""
+        SELECT feedercode, started, ended, duration_minutes, responsibleby, belongsto, remarks, relays
+        FROM interruption_events
+        WHERE month = ? AND fdrtype = ? {'AND closed = 1' if closed_only else ''}
+        ORDER BY started, slno
+    """, (year_month, fdrtype)).fetchall()
+    store.close()
+    return rows
+
+
+def get_interruption_rollup(db_path, year_month, fdrtype):
+    """
+    Returns the rollup rows of a month for one feeder type.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        year_month (str): Month in 'YYYY-MM' format.
+        fdrtype (str): 'EHT', 'T/F' or 'HTs'.
+
+    Returns:
+        list of sqlite3.Row: feedercode, belongsto, responsibleby, interruption_count,
+                             group_count (distinct grpslno), duration (sum of the recorded
+                             duration), closed_count and closed_minutes (from started/ended
+                             of interruptions whose dateto equals ended).
+    """
+    refresh_interruption_rollups(db_path)
+    store = get_sidecar_connection(db_path, SIDECAR_NAME)
+    rows = store.execute("""
+        SELECT feedercode, belongsto, responsibleby, interruption_count, group_count,
+               duration, closed_count, closed_minutes
+        FROM interruption_rollup
+        WHERE month = ? AND fdrtype = ?
+        ORDER BY feedercode, belongsto, responsibleby
+    """, (year_month, fdrtype)).fetchall()
+    store.close()
+    return rows
+
+
+def get_interruption_group_counts(db_path, year_month, fdrtype):
+    """
+    Returns the number of distinct interruption groups (grpslno) of a month per
+    feeder and belongsto, whatever the responsibleby of the group's rows.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        year_month (str): Month in 'YYYY-MM' format.
+        fdrtype (str): 'EHT', 'T/F' or 'HTs'.
+
+    Returns:
+        dict: {(feedercode, belongsto): group count}
+    """
+    refresh_interruption_rollups(db_path)
+    store = get_sidecar_connection(db_path, SIDECAR_NAME)
+    # Rows without a grpslno count as one group, as in GROUP BY grpslno
+    rows = store.execute("""
+        SELECT feedercode, belongsto, COUNT(DISTINCT grpslno) + MAX(grpslno IS NULL) AS group_count
+        FROM interruption_events
+        WHERE month = ? AND fdrtype = ?
+        GROUP BY feedercode, belongsto
+    """, (year_month, fdrtype)).fetchall()
+    store.close()
+    return {(row['feedercode'], row['belongsto']): row['group_count'] for row in rows}
@@ -0,0 +1,145 @@
+"""
+Module to search interruption remarks and relay operations with SQLite FTS5.
+
+The full-text index lives in a sidecar database. It is brought up to date when
+the SOS Offline database changes, re-indexing only the months whose interruption
+rows changed (the month signature of analysis.interruption_rollups), so new and
+edited interruptions are searchable without rebuilding the whole history.
+"""
+
+import re
+import time
+
+from analysis.interruption_rollups import next_month, refresh_lock, stale_months
+from analysis.utils import get_db_version
+from routes.db_service import get_connection, get_sidecar_connection
+
+SIDECAR_NAME = "search"
+# Hits returned by default
+DEFAULT_SEARCH_LIMIT = 50
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS search_state (key TEXT PRIMARY KEY, value TEXT);
+    CREATE TABLE IF NOT EXISTS search_months (month TEXT PRIMARY KEY, signature TEXT);
+    CREATE VIRTUAL TABLE IF NOT EXISTS interruption_fts USING fts5(
+        remarks, relays, feedercode,
+        fdrtype UNINDEXED, started UNINDEXED, ended UNINDEXED, duration_minutes UNINDEXED, month UNINDEXED,
+        tokenize = 'porter unicode61'
+    );
+"""
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def refresh_search_index(db_path):
+    """
+    Brings the search index of db_path up to date. Does nothing while the database
+    file is unchanged; otherwise re-indexes only the months whose interruptions changed.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+
+    Returns:
+        list of str: Months ('YYYY-MM') that were re-indexed or removed.
+    """
+    db_version = str(get_db_version(db_path))
+    with refresh_lock(db_path, SIDECAR_NAME):
+        store = get_sidecar_connection(db_path, SIDECAR_NAME)
+        try:
+            store.executescript(_SCHEMA)
+            state = store.execute("SELECT value FROM search_state WHERE key = 'db_version'").fetchone()
+            if state and state[0] == db_version:
+                return []
+
+            conn = get_connection(db_path)
+            try:
+                stored = {row[0]: row[1] for row in store.execute("SELECT month, signature FROM search_months")}
+                source, changed, removed = stale_months(db_path, conn, stored)
+
+                for month in changed + removed:
+                    store.execute("DELETE FROM interruption_fts WHERE month = ?", (month,))
+                    store.execute("DELETE FROM search_months WHERE month = ?", (month,))
+                for month in changed:
+                    rows = conn.execute("""
+                        SELECT slno, remarks, relays, feedercode, fdrtype, started, ended,
+                               (strftime('%s', ended) - strftime('%s', started)) / 60 AS duration_minutes
+                        FROM intrpns
+                        WHERE started >= ? AND started < ?
+                    """, (month, next_month(month))).fetchall()
+                    store.executemany("""
+                        INSERT INTO interruption_fts
+                            (rowid, remarks, relays, feedercode, fdrtype, started, ended, duration_minutes, month)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, [(*row, month) for row in rows])
+                    store.execute("INSERT INTO search_months (month, signature) VALUES (?, ?)", (month, source[month]))
+            finally:
+                conn.close()
+
+            store.execute("INSERT OR REPLACE INTO search_state (key, value) VALUES ('db_version', ?)", (db_version,))
+            store.commit()
+            return changed + removed
+        finally:
+            store.close()
+
+
+def match_query(text):
+    """
+    Turns free text into an FTS5 query: every word must match, as a prefix
+    ('buchh trip' -> '"buchh"* "trip"*'). Returns None if there are no words.
+    """
+    words = _WORD_RE.findall(text or "")
+    return " ".join(f'"{word}"*' for word in words) or None
+
+
+def search_interruptions(db_path, text, fdrtype=None, limit=DEFAULT_SEARCH_LIMIT, highlight=None):
+    """
+    Searches interruption remarks, relays and feeder codes across the whole history,
+    best matches first (BM25).
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        text (str): Words to search for; all must match (as prefixes).
+        fdrtype (str or None): Only 'EHT', 'T/F' or 'HTs' interruptions if given.
+        limit (int): Maximum number of hits.
+        highlight (tuple or None): (before, after) markers put around matched words
+                                   in remarks and relays.
+
+    Returns:
+        dict: {
+            'total': number of matching interruptions,
+            'hits': [{'slno': ..., 'feedercode': ..., 'fdrtype': ..., 'started': ..., 'ended': ...,
+                      'duration_minutes': ..., 'remarks': ..., 'relays': ..., 'rank': ...}, ...],
+            'elapsed_ms': search time in milliseconds (excluding index refresh)
+        }
+    """
+    refresh_search_index(db_path)
+    query = match_query(text)
+    if query is None:
+        return {'total': 0, 'hits': [], 'elapsed_ms': 0.0}
+
+    before, after = highlight or ('', '')
+    type_filter = "AND fdrtype = ?" if fdrtype else ""
+    params = (query, *([fdrtype] if fdrtype else []))
+
+    started = time.perf_counter()
+    store = get_sidecar_connection(db_path, SIDECAR_NAME)
+    try:
+        total = store.execute(f"SELECT COUNT(*) FROM interruption_fts WHERE interruption_fts MATCH ? {type_filter}",
+                              params).fetchone()[0]
+        rows = store.execute(f"""
+            SELECT rowid AS slno, feedercode, fdrtype, started, ended, duration_minutes,
+                   highlight(interruption_fts, 0, ?, ?) AS remarks,
+                   highlight(interruption_fts, 1, ?, ?) AS relays,
+                   bm25(interruption_fts) AS rank
+            FROM interruption_fts
+            WHERE interruption_fts MATCH ? {type_filter}
+            ORDER BY rank, started DESC
+            LIMIT ?
+        """, (before, after, before, after, *params, limit)).fetchall()
+    finally:
+        store.close()
+
+    return {
+        'total': total,
+        'hits': [dict(row, rank=round(row['rank'], 3)) for row in rows],
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
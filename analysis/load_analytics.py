@@ -0,0 +1,207 @@
+"""
+Module to analyse station load over a range of days: ramp rates, time near the
+peak and the morning/evening peak windows.
+
+The load series of a formula (analysis.station_load) is kept per day in a sidecar
+database, rescanned by analysis.utils.stale_days: when a day's number of readings
+of the formula's codes changes, or while it is recent and the database has
+changed. Stale days are fetched in one pivoted query; the days are arranged as a
+(day x slot) array so ramps and durations are array differences and reductions.
+"""
+
+import threading
+import warnings
+
+import numpy as np
+from analysis.station_load import get_load_series, parse_formula
+from analysis.utils import get_db_version, get_row_counts, stale_days
+from routes.db_service import get_sidecar_connection
+from utils.slot_calendar import ALLOWED_TIMES, HOUR_INDEX, SLOT_INDEX, SLOT_MINUTES
+
+SIDECAR_NAME = "load"
+
+# Load (% of the peak) counted as time near the peak
+DEFAULT_PEAK_PERCENT = 90.0
+# Peak windows of a day: first and last slot (inclusive)
+PEAK_WINDOWS = {
+    'morning': ('05:00', '11:00'),
+    'evening': ('18:00', '23:00'),
+}
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS load_days (
+        series TEXT, date TEXT, row_count INTEGER, db_version TEXT, loads BLOB,
+        PRIMARY KEY (series, date)
+    );
+"""
+
+_scan_lock = threading.Lock()
+# Hourly slots of a day (each hourly reading stands for one hour)
+_HOURLY = np.array([time in HOUR_INDEX for time in ALLOWED_TIMES])
+
+
+def get_day_loads(db_path, query_dates, formula, db_table="soseht", db_code_column="feedercode"):
+    """
+    Returns the load of a formula at every allowed slot of the dates, from the
+    sidecar store where still valid and from one pivoted query for the rest.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        query_dates (list of str): Dates in 'DD-MM-YYYY' format.
+        formula (str): Formula spec (see analysis.station_load).
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for code ('feedercode', 'tfcode').
+
+    Returns:
+        numpy.ndarray: (date x slot) loads in the order of query_dates and ALLOWED_TIMES, NaN where missing.
+    """
+    series = f"{db_table}:{formula}"
+    codes = parse_formula(formula).codes
+    db_version = str(get_db_version(db_path))
+    row_counts = get_row_counts(db_path, query_dates, db_table, db_code_column, codes)
+
+    with _scan_lock:
+        store = get_sidecar_connection(db_path, SIDECAR_NAME)
+        try:
+            store.executescript(_SCHEMA)
+            stored = {row['date']: row for row in store.execute(
+                f"SELECT date, row_count, db_version, loads FROM load_days WHERE series = ? AND date IN ({','.join(['?'] * len(query_dates))})",
+                (series, *query_dates))}
+            stale = stale_days(query_dates, stored, row_counts, db_version)
+
+            loads = {d: np.frombuffer(row['loads'], dtype=np.float64) for d, row in stored.items() if d not in stale}
+            if stale:
+                fetched = {d: np.full(len(ALLOWED_TIMES), np.nan) for d in stale}
+                for d, time, value in get_load_series(db_path, stale, formula, db_table, db_code_column):
+                    if time in SLOT_INDEX and value is not None:
+                        fetched[d][SLOT_INDEX[time]] = value
+                store.executemany("INSERT OR REPLACE INTO load_days (series, date, row_count, db_version, loads) VALUES (?, ?, ?, ?, ?)",
+                                  [(series, d, row_counts.get(d, 0), db_version, values.tobytes()) for d, values in fetched.items()])
+                store.commit()
+                loads.update(fetched)
+        finally:
+            store.close()
+
+    return np.array([loads[d] for d in query_dates]).reshape(len(query_dates), len(ALLOWED_TIMES))
+
+
+def get_load_analytics(db_path, query_dates, formula, db_table="soseht", db_code_column="feedercode",
+                       peak_percent=DEFAULT_PEAK_PERCENT):
+    """
+    Returns ramp rates, time near the peak and morning/evening peaks of a load,
+    per day and over the whole range.
+
+    Ramps are changes between consecutive readings (across midnight too) divided
+    by the hours between them, so half-hourly readings give per-hour rates as well.
+    Hours near the peak count hourly readings at or above peak_percent of the
+    peak (of the day for daily rows, of the range for the summary).
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        query_dates (list of str): Consecutive dates in 'DD-MM-YYYY' format.
+        formula (str): Load formula spec (see analysis.station_load).
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for code ('feedercode', 'tfcode').
+        peak_percent (float): Load (% of the peak) counted as near the peak.
+
+    Returns:
+        dict: {
+            'times': [...], 'profile': [average load per time],
+            'days': [{'date': ..., 'peak': ..., 'peak_time': ..., 'min': ..., 'min_time': ...,
+                      'average': ..., 'load_factor': average / peak (%),
+                      'ramp_up': per hour, 'ramp_up_time': ..., 'ramp_down': ..., 'ramp_down_time': ...,
+                      'hours_near_peak': ..., 'morning_peak': ..., 'morning_peak_time': ...,
+                      'evening_peak': ..., 'evening_peak_time': ...}, ...],
+            'summary': {'peak': ..., 'peak_date': ..., 'peak_time': ..., 'ramp_up': ..., 'ramp_up_date': ...,
+                        'ramp_up_time': ..., 'ramp_down': ..., 'ramp_down_date': ..., 'ramp_down_time': ...,
+                        'hours_near_peak': ..., 'average_morning_peak': ..., 'average_evening_peak': ...,
+                        'usual_morning_peak_time': ..., 'usual_evening_peak_time': ...}
+        }
+    """
+    loads = get_day_loads(db_path, query_dates, formula, db_table, db_code_column)
+    slots = len(ALLOWED_TIMES)
+    days = len(query_dates)
+
+    # Ramps over the readings in time order; a gap (missing reading) spans to the next reading
+    flat = loads.ravel()
+    minutes = (np.arange(days)[:, None] * 1440 + np.array(SLOT_MINUTES)[None, :]).ravel()
+    present = np.flatnonzero(np.isfinite(flat))
+    ramps = np.full(flat.shape, np.nan)
+    ramps[present[1:]] = np.diff(flat[present]) / (np.diff(minutes[present]) / 60)
+    ramps = ramps.reshape(days, slots)
+
+    def masked_arg(values, mask, maximum=True):
+        # Index of the max (or min) of values where mask, earliest on ties; -1 if none
+        filled = np.where(mask & np.isfinite(values), values if maximum else -values, -np.inf)
+        index = np.argmax(filled, axis=-1)
+        return np.where(np.take_along_axis(filled, index[..., None], axis=-1)[..., 0] > -np.inf, index, -1)
+
+    everywhere = np.ones(slots, dtype=bool)
+    windows = {name: np.array([SLOT_INDEX[first] <= i <= SLOT_INDEX[last] for i in range(slots)])
+               for name, (first, last) in PEAK_WINDOWS.items()}
+    peak_at = masked_arg(loads, everywhere)
+    min_at = masked_arg(loads, everywhere, maximum=False)
+    up_at = masked_arg(ramps, everywhere)
+    down_at = masked_arg(ramps, everywhere, maximum=False)
+    window_at = {name: masked_arg(loads, mask) for name, mask in windows.items()}
+
+    day_peaks = np.where(peak_at >= 0, loads[np.arange(days), np.maximum(peak_at, 0)], np.nan)
+    range_peak = day_peaks[np.isfinite(day_peaks)].max() if np.any(np.isfinite(day_peaks)) else np.nan
+    with np.errstate(invalid='ignore'):
+        near_day_peak = (loads >= day_peaks[:, None] * peak_percent / 100) & _HOURLY
+        near_range_peak = (loads >= range_peak * peak_percent / 100) & _HOURLY
+
+    def value_time(row, values, index):
+        if index < 0:
+            return None, None
+        return round(float(values[row, index]), 2), ALLOWED_TIMES[index]
+
+    result = []
+    for row, query_date in enumerate(query_dates):
+        peak, peak_time = value_time(row, loads, peak_at[row])
+        minimum, min_time = value_time(row, loads, min_at[row])
+        ramp_up, ramp_up_time = value_time(row, ramps, up_at[row])
+        ramp_down, ramp_down_time = value_time(row, ramps, down_at[row])
+        average = float(np.nanmean(loads[row])) if peak is not None else None
+        entry = {
+            'date': query_date,
+            'peak': peak, 'peak_time': peak_time, 'min': minimum, 'min_time': min_time,
+            'average': round(average, 2) if average is not None else None,
+            'load_factor': round(average / peak * 100, 1) if peak else None,
+            'ramp_up': ramp_up, 'ramp_up_time': ramp_up_time,
+            'ramp_down': ramp_down, 'ramp_down_time': ramp_down_time,
+            'hours_near_peak': int(np.sum(near_day_peak[row]))
+        }
+        for name in PEAK_WINDOWS:
+            entry[f'{name}_peak'], entry[f'{name}_peak_time'] = value_time(row, loads, window_at[name][row])
+        result.append(entry)
+
+    def extreme(key, maximum=True):
+        # Day row holding the largest (or smallest) value of key, earliest on ties
+        rows = [entry for entry in result if entry[key] is not None]
+        if not rows:
+            return {}
+        best = max(rows, key=lambda e: e[key]) if maximum else min(rows, key=lambda e: e[key])
+        return {key: best[key], f'{key}_date': best['date'], f'{key}_time': best[f'{key}_time']}
+
+    summary = {'hours_near_peak': int(np.sum(near_range_peak))}
+    summary.update(extreme('peak'))
+    summary.update(extreme('ramp_up'))
+    summary.update(extreme('ramp_down', maximum=False))
+    for name in PEAK_WINDOWS:
+        peaks = [entry[f'{name}_peak'] for entry in result if entry[f'{name}_peak'] is not None]
+        times = [entry[f'{name}_peak_time'] for entry in result if entry[f'{name}_peak_time']]
+        summary[f'average_{name}_peak'] = round(sum(peaks) / len(peaks), 2) if peaks else None
+        summary[f'usual_{name}_peak_time'] = max(set(times), key=lambda t: (times.count(t), -SLOT_INDEX[t])) if times else None
+
+    with warnings.catch_warnings():
+        # Slots without any reading average to NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        profile = np.nanmean(loads, axis=0) if days else np.full(slots, np.nan)
+
+    return {
+        'times': list(ALLOWED_TIMES),
+        'profile': [None if np.isnan(value) else round(float(value), 2) for value in profile],
+        'days': result,
+        'summary': summary
+    }
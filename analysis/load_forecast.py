@@ -0,0 +1,115 @@
+"""
+Module to forecast the next day's peak load and its time from historical daily profiles.
+
+The load at each time slot of a day is predicted from the same slot on the day
+before and a week before (same weekday) and the recent trend, with one linear
+model per slot fitted by NumPy least squares over the last HISTORY_DAYS days.
+The predicted profile gives the peak and its time. Profiles come from the
+per-day load cache of analysis.load_analytics, so each day only new or changed
+days are read from the database.
+"""
+
+from datetime import date
+
+import numpy as np
+from analysis.load_analytics import get_day_loads
+from utils.slot_calendar import ALLOWED_TIMES, date_from_day_number, day_number
+
+# Days of history the models are fitted on
+HISTORY_DAYS = 56
+# Lags (days) used as predictors: the day before and the same weekday a week before
+LAGS = (1, 7)
+# Fewest complete training days a slot model needs; slots with fewer use the mean of the lags
+MIN_TRAINING_DAYS = 10
+
+
+def _design(loads, days):
+    """
+    Returns the predictors of the given day rows of a (day x slot) load array:
+    (slot x day x feature) with features [1, lagged loads..., day index].
+    """
+    features = [np.ones((len(days), loads.shape[1]))]
+    features += [loads[days - lag] for lag in LAGS]
+    features.append(np.broadcast_to(days[:, None].astype(float), (len(days), loads.shape[1])))
+    return np.stack(features, axis=-1).transpose(1, 0, 2)
+
+
+def get_peak_forecast(db_path, target_date, formula, db_table="soseht", db_code_column="feedercode"):
+    """
+    Forecasts the load profile of a day and its peak from the days before it.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        target_date (str): Day to forecast, 'DD-MM-YYYY'.
+        formula (str): Load formula spec (see analysis.station_load).
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for code ('feedercode', 'tfcode').
+
+    Returns:
+        dict: {
+            'date': ..., 'weekday': ..., 'peak': ..., 'peak_time': ...,
+            'profile': [predicted load per time], 'times': [...],
+            'training_days': days with a complete profile used for fitting,
+            'peak_error': mean absolute error (%) of the fitted peaks over the training days,
+            'previous_peak': ..., 'previous_peak_time': ... (day before),
+            'week_ago_peak': ..., 'week_ago_peak_time': ... (same weekday a week before)
+        }
+        Peaks and times are None when there is not enough history.
+    """
+    target = day_number(target_date)
+    first = target - HISTORY_DAYS - max(LAGS)
+    dates = [date_from_day_number(day) for day in range(first, target)]
+    loads = get_day_loads(db_path, tuple(dates), formula, db_table, db_code_column)
+    # Row for the target day, predicted from its lags
+    loads = np.vstack([loads, np.full((1, len(ALLOWED_TIMES)), np.nan)])
+    target_row = len(dates)
+
+    training = np.arange(max(LAGS), target_row)
+    X = _design(loads, training)
+    y = loads[training].T
+    x_target = _design(loads, np.array([target_row]))[:, 0, :]
+
+    profile = np.full(len(ALLOWED_TIMES), np.nan)
+    fitted = np.full((len(ALLOWED_TIMES), len(training)), np.nan)
+    for slot in range(len(ALLOWED_TIMES)):
+        usable = np.isfinite(y[slot]) & np.all(np.isfinite(X[slot]), axis=1)
+        if usable.sum() >= MIN_TRAINING_DAYS and np.all(np.isfinite(x_target[slot])):
+            coefficients = np.linalg.lstsq(X[slot][usable], y[slot][usable], rcond=None)[0]
+            profile[slot] = x_target[slot] @ coefficients
+            fitted[slot, usable] = X[slot][usable] @ coefficients
+        else:
+            lags = x_target[slot][1:1 + len(LAGS)]
+            if np.any(np.isfinite(lags)):
+                profile[slot] = np.nanmean(lags)
+
+    # Peak error of the fit on training days with a complete actual and fitted profile
+    complete = np.all(np.isfinite(fitted), axis=0) & np.all(np.isfinite(y), axis=0)
+    peak_error = None
+    if complete.any():
+        actual = y[:, complete].max(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            errors = np.abs(fitted[:, complete].max(axis=0) - actual) / np.abs(actual) * 100
+        if np.any(np.isfinite(errors)):
+            peak_error = round(float(np.nanmean(errors[np.isfinite(errors)])), 1)
+
+    def peak_of(values):
+        if not np.any(np.isfinite(values)):
+            return None, None
+        index = int(np.nanargmax(values))
+        return round(float(values[index]), 2), ALLOWED_TIMES[index]
+
+    peak, peak_time = peak_of(profile)
+    previous_peak, previous_peak_time = peak_of(loads[target_row - 1])
+    week_ago_peak, week_ago_peak_time = peak_of(loads[target_row - 7])
+    return {
+        'date': target_date,
+        'weekday': date.fromordinal(target).strftime("%A"),
+        'peak': peak,
+        'peak_time': peak_time,
+        'times': list(ALLOWED_TIMES),
+        'profile': [None if np.isnan(value) else round(float(value), 2) for value in profile],
+        'training_days': int(complete.sum()),
+        'peak_error': peak_error,
+        'previous_peak': previous_peak, 'previous_peak_time': previous_peak_time,
+        'week_ago_peak': week_ago_peak, 'week_ago_peak_time': week_ago_peak_time
+    }
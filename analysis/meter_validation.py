@@ -0,0 +1,223 @@
+"""
+Module to validate energy meter readings before their deltas are reported.
+
+Flags meter rollovers, resets, MF (multiplying factor) changes, negative deltas
+and statistical outliers (rolling median/MAD) over the hourly reading series of a day.
+"""
+
+from collections import OrderedDict
+import warnings
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from analysis.utils import get_db_version
+from routes.db_service import get_connection
+from utils.slot_calendar import HOURLY_TIMES, HOUR_INDEX, previous_date
+
+# A falling reading whose previous value is within the top 10% of its register is a rollover
+ROLLOVER_FRACTION = 0.9
+# A falling reading that drops below 1% of its previous value is a meter reset
+RESET_FRACTION = 0.01
+# Rolling window (in hours) and robust z-score threshold for outlier detection
+OUTLIER_WINDOW = 5
+OUTLIER_THRESHOLD = 6.0
+# Lower bound for MAD as a fraction of the rolling median, so flat profiles don't flag noise
+MIN_MAD_FRACTION = 0.1
+
+# Number of (database, table, date) flag sets kept in memory
+FLAGS_CACHE_SIZE = 1024
+
+FLAG_ROLLOVER = 'rollover'
+FLAG_RESET = 'reset'
+FLAG_MF_CHANGE = 'mf_change'
+FLAG_NEGATIVE = 'negative'
+FLAG_OUTLIER = 'outlier'
+# Flags of deltas that are not energy (broken register sequence), left out of statistics;
+# outliers are real readings and are only annotated
+INTEGRITY_FLAGS = frozenset({FLAG_ROLLOVER, FLAG_RESET, FLAG_MF_CHANGE, FLAG_NEGATIVE})
+
+
+def classify_deltas(prev, curr, prev_mf, curr_mf):
+    """
+    Classifies reading deltas (curr - prev) as rollover, reset, MF change or negative.
+
+    All arguments are array-likes of the same shape; missing values are NaN.
+
+    Args:
+        prev (array-like): Previous meter readings.
+        curr (array-like): Current meter readings.
+        prev_mf (array-like): Multiplying factor of the previous readings.
+        curr_mf (array-like): Multiplying factor of the current readings.
+
+    Returns:
+        numpy.ndarray: Object array of the same shape with a flag name or None.
+    """
+    prev = np.asarray(prev, dtype=float)
+    curr = np.asarray(curr, dtype=float)
+    prev_mf = np.asarray(prev_mf, dtype=float)
+    curr_mf = np.asarray(curr_mf, dtype=float)
+
+    with np.errstate(invalid='ignore'):
+        delta = curr - prev
+        negative = delta < 0
+        # Register capacity is the next power of ten above the previous reading
+        register_max = 10 ** np.ceil(np.log10(np.where(prev > 0, prev, 1) + 1))
+        rollover = negative & (prev >= ROLLOVER_FRACTION * register_max)
+        reset = negative & ~rollover & (curr <= RESET_FRACTION * prev)
+        mf_change = np.isfinite(prev_mf) & np.isfinite(curr_mf) & (prev_mf != curr_mf)
+
+    flags = np.full(delta.shape, None, dtype=object)
+    flags[negative] = FLAG_NEGATIVE
+    flags[reset] = FLAG_RESET
+    flags[rollover] = FLAG_ROLLOVER
+    flags[mf_change] = FLAG_MF_CHANGE
+    return flags
+
+
+def flag_outliers(deltas):
+    """
+    Flags deltas that deviate from their rolling median by more than
+    OUTLIER_THRESHOLD robust standard deviations (scaled MAD).
+
+    Args:
+        deltas (numpy.ndarray): 2-D array (codes x hours); NaN marks missing deltas.
+
+    Returns:
+        numpy.ndarray: Boolean array of the same shape, True for outliers.
+    """
+    half = OUTLIER_WINDOW // 2
+    padded = np.pad(deltas, ((0, 0), (half, half)), constant_values=np.nan)
+    windows = sliding_window_view(padded, OUTLIER_WINDOW, axis=1)
+
+    # All-NaN windows (missing readings) legitimately produce NaN medians
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(windows, axis=2)
+        mad = np.nanmedian(np.abs(windows - median[..., None]), axis=2)
+        mad = np.maximum(mad, MIN_MAD_FRACTION * np.abs(median))
+        score = 0.6745 * np.abs(deltas - median) / mad
+
+    return np.isfinite(score) & (score > OUTLIER_THRESHOLD)
+
+
+# {(db_path, db_version, db_table, db_code_column, date): flags}, least recently used first
+_flags_cache = OrderedDict()
+
+
+def get_daily_reading_flags(db_path, query_date, db_table="sosht", db_code_column="feedercode"):
+    """
+    Returns validation flags for the hourly Δ EM Import/Export of every code on a date.
+    Flags are computed once per day of data and cached until the database changes.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        query_date (str): Date in 'DD-MM-YYYY' format.
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for code ('feedercode', 'tfcode').
+
+    Returns:
+        dict: {(code, time): {'import': flag or None, 'export': flag or None}}
+              containing only flagged deltas.
+    """
+    return get_reading_flags(db_path, [query_date], db_table, db_code_column)[query_date]
+
+
+def get_reading_flags(db_path, query_dates, db_table="sosht", db_code_column="feedercode"):
+    """
+    Returns validation flags for several dates. Days not in the cache are
+    fetched together in a single query and validated day by day.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        query_dates (list of str): Dates in 'DD-MM-YYYY' format.
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for code ('feedercode', 'tfcode').
+
+    Returns:
+        dict: {date: flags} with flags as returned by get_daily_reading_flags.
+    """
+    db_version = get_db_version(db_path)
+    result = {}
+    missing = []
+    for query_date in query_dates:
+        key = (db_path, db_version, db_table, db_code_column, query_date)
+        if key in _flags_cache:
+            _flags_cache.move_to_end(key)
+            result[query_date] = _flags_cache[key]
+        else:
+            missing.append(query_date)
+
+    if missing:
+        prev_dates = {query_date: previous_date(query_date) for query_date in missing}
+        fetch_dates = sorted(set(missing) | set(prev_dates.values()))
+
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {db_code_column}, dateobserved, timeobserved, current,
+                   emc_export, emc_import, mf_export, mf_import
+            FROM {db_table}
+            WHERE dateobserved IN ({','.join(['?']*len(fetch_dates))})
+              AND timeobserved IN ({','.join(['?']*24)})
+        """, (*fetch_dates, *HOURLY_TIMES))
+        rows_by_date = {}
+        for row in cursor.fetchall():
+            rows_by_date.setdefault(row['dateobserved'], []).append(row)
+        conn.close()
+
+        for query_date in missing:
+            prev_day_rows = [row for row in rows_by_date.get(prev_dates[query_date], []) if row['timeobserved'] == '24:00']
+            flags = _validate_day(rows_by_date.get(query_date, []), prev_day_rows, db_code_column)
+            _flags_cache[(db_path, db_version, db_table, db_code_column, query_date)] = flags
+            result[query_date] = flags
+
+        while len(_flags_cache) > FLAGS_CACHE_SIZE:
+            _flags_cache.popitem(last=False)
+
+    return result
+
+
+def _validate_day(day_rows, prev_day_rows, db_code_column):
+    """
+    Validates one day's hourly readings (plus the previous day's 24:00 readings).
+    Returns {(code, time): {'import': flag, 'export': flag}} for flagged deltas.
+    """
+    if not day_rows:
+        return {}
+
+    # Slot 0 is the previous day's 24:00, slots 1..24 are 01:00..24:00 of the date
+    codes = sorted(set(row[db_code_column] for row in day_rows))
+    code_index = {code: i for i, code in enumerate(codes)}
+    columns = ('current', 'emc_import', 'emc_export', 'mf_import', 'mf_export')
+    series = {column: np.full((len(codes), 25), np.nan) for column in columns}
+
+    for rows, is_prev_day in ((day_rows, False), (prev_day_rows, True)):
+        for row in rows:
+            i = code_index.get(row[db_code_column])
+            if i is None:
+                continue
+            slot = 0 if is_prev_day else HOUR_INDEX[row['timeobserved']] + 1
+            for column in columns:
+                if row[column] is not None:
+                    series[column][i, slot] = row[column]
+
+    # Deltas are only reported where both readings have a positive current
+    current = series['current']
+    with np.errstate(invalid='ignore'):
+        valid = (current[:, 1:] > 0) & (current[:, :-1] > 0)
+
+    flags = {}
+    for channel in ('import', 'export'):
+        readings = series[f'emc_{channel}']
+        mf = series[f'mf_{channel}']
+        channel_flags = classify_deltas(readings[:, :-1], readings[:, 1:], mf[:, :-1], mf[:, 1:])
+        channel_flags[~valid] = None
+
+        # Outliers are judged only against deltas that passed the register checks
+        deltas = np.where(valid & ~channel_flags.astype(bool), readings[:, 1:] - readings[:, :-1], np.nan)
+        channel_flags[flag_outliers(deltas)] = FLAG_OUTLIER
+
+        for i, j in zip(*np.nonzero(channel_flags.astype(bool))):
+            key = (codes[i], HOURLY_TIMES[j])
+            flags.setdefault(key, {'import': None, 'export': None})[channel] = channel_flags[i, j]
+
+    return flags
@@ -1,7 +1,58 @@
 from analysis.utils import get_eht_feeder_order, get_ht_feeder_order, get_tf_order, max_decimal_places, sort_by_order
+from analysis.meter_validation import classify_deltas
+from analysis.interruption_rollups import get_interruption_events, get_interruption_group_counts, get_interruption_rollup
 from routes.db_service import get_connection
-from datetime import datetime, timedelta
 from calendar import monthrange
+from utils.slot_calendar import date_from_day_number, day_number, period_boundary_dates
+
+# Days before a month boundary searched for a reading when the boundary day has none
+BOUNDARY_LOOKBACK_DAYS = 7
+
+def get_boundary_readings(db_path, boundary_dates, db_table="sosht", db_code_column="feedercode", lookback_days=BOUNDARY_LOOKBACK_DAYS):
+    """
+    Returns each code's latest valid reading at or before 24:00 of each boundary date.
+    The boundary day and the days before it (up to lookback_days) are probed by
+    dateobserved in a single query; the latest slot with both energy readings wins.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        boundary_dates (list of str): Boundary dates in 'DD-MM-YYYY' format.
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for code ('feedercode', 'tfcode').
+        lookback_days (int): Number of earlier days searched when the boundary day has no reading.
+
+    Returns:
+        dict: {(code, boundary_date): row} where row has dateobserved, timeobserved,
+              emc_export, emc_import, mf_export and mf_import.
+    """
+    probes = []
+    for boundary in boundary_dates:
+        first = day_number(boundary)
+        probes.extend((date_from_day_number(first - offset), boundary, offset) for offset in range(lookback_days + 1))
+
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        WITH probes(probe_date, boundary, day_offset) AS (
+            VALUES {', '.join(['(?, ?, ?)'] * len(probes))}
+        )
+        SELECT {db_code_column}, boundary, dateobserved, timeobserved, emc_export, emc_import, mf_export, mf_import
+        FROM (
+            SELECT r.{db_code_column}, p.boundary, r.dateobserved, r.timeobserved,
+                   r.emc_export, r.emc_import, r.mf_export, r.mf_import,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY r.{db_code_column}, p.boundary
+                       ORDER BY p.day_offset, r.timeobserved DESC
+                   ) AS rank
+            FROM probes p
+            JOIN {db_table} r ON r.dateobserved = p.probe_date
+            WHERE r.emc_export IS NOT NULL AND r.emc_import IS NOT NULL
+        )
+        WHERE rank = 1
+    """, [value for probe in probes for value in probe])
+    readings = {(row[db_code_column], row['boundary']): row for row in cursor.fetchall()}
+    conn.close()
+    return readings
 
 def get_monthly_energy(db_path, year_month, db_table="sosht", db_code_column="feedercode"):
     """
@@ -25,44 +76,78 @@ def get_monthly_energy(db_path, year_month, db_table="sosht", db_code_column="fe
                 'mf_export': ...,
                 'mf_import': ...,
                 'actual_export_energy': ...,
-                'actual_import_energy': ...
+                'actual_import_energy': ...,
+                'export_flag': ...,  # rollover/reset/mf_change/negative or None
+                'import_flag': ...,
+                'initial_fallback': ...,  # 'DD-MM-YYYY HH:MM' of the reading used if not 24:00 of the boundary day
+                'final_fallback': ...
             }
     """
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
+    return get_period_energies(db_path, (year_month,), db_table, db_code_column)[year_month]
 
-    # Parse year and month
-    year, month = map(int, year_month.split('-'))
-    first_day = datetime(year, month, 1)
-    last_day = (first_day.replace(month=month % 12 + 1, day=1) - timedelta(days=1)) if month < 12 else datetime(year, 12, 31)
-    prev_month_last_day = first_day - timedelta(days=1)
-    prev_month_last_day_str = prev_month_last_day.strftime("%d-%m-%Y")
-    last_day_str = last_day.strftime("%d-%m-%Y")
-
-    # Fetch all relevant readings in one query
-    query = f"""
-        SELECT {db_code_column}, dateobserved, emc_export, emc_import, mf_export, mf_import
-        FROM {db_table}
-        WHERE timeobserved = '24:00'
-          AND dateobserved IN (?, ?)
+def get_period_energies(db_path, periods, db_table="sosht", db_code_column="feedercode"):
     """
-    cursor.execute(query, (prev_month_last_day_str, last_day_str))
-    readings = cursor.fetchall()
-    conn.close()
+    Returns the energy of all feeders/transformers in each of several months or years,
+    with the boundary readings of all periods read in one query.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        periods (list of str): 'YYYY-MM' months or 'YYYY' years.
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for code ('feedercode', 'tfcode').
+
+    Returns:
+        dict: {period: list of dict as returned by get_monthly_energy}
+    """
+    # Readings at 24:00 on the last day before each period and the period's last day,
+    # or the nearest earlier valid reading when those are missing
+    boundaries = {period: period_boundary_dates(period) for period in periods}
+    boundary_dates = sorted({d for pair in boundaries.values() for d in pair}, key=day_number)
+    readings_dict = get_boundary_readings(db_path, boundary_dates, db_table, db_code_column)
+
+    code_order = []
+    if db_table == "sosht":
+        code_order = get_ht_feeder_order(db_path)
+    elif db_table == "soseht":
+        code_order = get_eht_feeder_order(db_path)
+    elif db_table == "sostf":
+        code_order = get_tf_order(db_path)
 
-    # Organize readings by (code, dateobserved)
-    readings_dict = {}
-    for row in readings:
-        key = (row[db_code_column], row['dateobserved'])
-        readings_dict[key] = row
+    return {period: _period_energy(readings_dict, *boundaries[period], code_order) for period in periods}
 
-    # Get all unique codes present in readings
-    codes = set(row[db_code_column] for row in readings)
+def _period_energy(readings_dict, initial_date_str, final_date_str, code_order):
+    """
+    Returns the energy rows of one period from the boundary readings of get_boundary_readings.
+    """
+    # Codes with a reading at either boundary of this period
+    codes = list(set(code for code, date_str in readings_dict if date_str in (initial_date_str, final_date_str)))
+
+    # Validate initial -> final readings of all codes at once
+    def boundary_values(date_str, column):
+        values = []
+        for code in codes:
+            row = readings_dict.get((code, date_str))
+            values.append(row[column] if row and row[column] is not None else float('nan'))
+        return values
+
+    boundary_flags = {}
+    for channel in ('export', 'import'):
+        boundary_flags[channel] = classify_deltas(
+            boundary_values(initial_date_str, f'emc_{channel}'),
+            boundary_values(final_date_str, f'emc_{channel}'),
+            boundary_values(initial_date_str, f'mf_{channel}'),
+            boundary_values(final_date_str, f'mf_{channel}')
+        )
+
+    def fallback(row, boundary):
+        if row is None or (row['dateobserved'], row['timeobserved']) == (boundary, '24:00'):
+            return None
+        return f"{row['dateobserved']} {row['timeobserved']}"
 
     result = []
-    for code in codes:
-        ir_row = readings_dict.get((code, prev_month_last_day_str))
-        fr_row = readings_dict.get((code, last_day_str))
+    for i, code in enumerate(codes):
+        ir_row = readings_dict.get((code, initial_date_str))
+        fr_row = readings_dict.get((code, final_date_str))
 
         ir_export = ir_row['emc_export'] if ir_row else None
         ir_import = ir_row['emc_import'] if ir_row else None
@@ -96,19 +181,14 @@ def get_monthly_energy(db_path, year_month, db_table="sosht", db_code_column="fe
             'mf_export': mf_export,
             'mf_import': mf_import,
             'actual_export_energy': actual_export_energy,
-            'actual_import_energy': actual_import_energy
+            'actual_import_energy': actual_import_energy,
+            'export_flag': boundary_flags['export'][i],
+            'import_flag': boundary_flags['import'][i],
+            'initial_fallback': fallback(ir_row, initial_date_str),
+            'final_fallback': fallback(fr_row, final_date_str)
         })
 
-    code_order = []
-    if db_table == "sosht":
-        code_order = get_ht_feeder_order(db_path)
-    elif db_table == "soseht":
-        code_order = get_eht_feeder_order(db_path)
-    elif db_table == "sostf":
-        code_order = get_tf_order(db_path)
-    result = sort_by_order(result, 'code', code_order)
-    
-    return result
+    return sort_by_order(result, 'code', code_order)
 
 def get_eht_tf_monthly_interruptions(db_path, year_month, fdrtype):
     """
@@ -132,49 +212,15 @@ def get_eht_tf_monthly_interruptions(db_path, year_month, fdrtype):
                 'type': ...,
             }
     """
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-
-    # Calculate the first day of the month and the next month
-    year, month = map(int, year_month.split('-'))
-    first_day = datetime(year, month, 1)
-    if month == 12:
-        next_month = datetime(year + 1, 1, 1)
-    else:
-        next_month = datetime(year, month + 1, 1)
-
-    # Fetch all relevant rows for the month
-    cursor.execute("""
-        SELECT feedercode, started, datefrom, dateto, ended, responsibleby, remarks, relays, belongsto
-        FROM intrpns
-        WHERE fdrtype = ?
-          AND started >= ? AND started < ?
-        ORDER BY started
-    """, (fdrtype, first_day.strftime("%Y-%m-%d %H:%M:%S"), next_month.strftime("%Y-%m-%d %H:%M:%S")))
-    rows = cursor.fetchall()
-    conn.close()
-
-    # Keep only the rows where dateto == ended
-    filtered = []
-    for row in rows:
-        if row['dateto'] == row['ended']:
-            filtered.append(row)
-
+    # Rows where dateto == ended, with durations (minutes from started to ended)
+    # precomputed in the interruption rollup store
     result = []
-    for row in filtered:
-        # Calculate duration in minutes and hh:mm from started and ended
-        try:
-            started_dt = datetime.fromisoformat(row['started'])
-            ended_dt = datetime.fromisoformat(row['ended'])
-            duration = int((ended_dt - started_dt).total_seconds() // 60)
-        except Exception:
-            duration = None
-
+    for row in get_interruption_events(db_path, year_month, fdrtype):
         result.append({
             'code': row['feedercode'],
             'started': row['started'],
             'ended': row['ended'],
-            'duration': duration,
+            'duration': row['duration_minutes'],
             'attributed_to': row['responsibleby'],
             'remarks': row['remarks'],
             'relays': row['relays'],
@@ -266,31 +312,16 @@ def get_ht_monthly_interruptions_summary(db_path, year_month):
                 'unscheduled_count': ...,
             }
     """
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-
-    query = """
-    WITH grouped AS (
-        SELECT 
-            feedercode,
-            belongsto,
-            grpslno,
-            SUM(duration) AS group_duration
-        FROM intrpns
-        WHERE strftime('%Y-%m', started) = ? AND fdrtype = 'HTs'
-        GROUP BY feedercode, belongsto, grpslno
-    )
-    SELECT 
-        feedercode,
-        belongsto,
-        COUNT(*) AS interruption_count,
-        SUM(group_duration) AS total_duration
-    FROM grouped
-    GROUP BY feedercode, belongsto;
-    """
-    cursor.execute(query, (year_month,))
-    rows = cursor.fetchall()
-    conn.close()
+    # Interruption groups (grpslno) and recorded durations per feeder from the rollup store;
+    # groups are counted once per (feeder, belongsto), as a group may span responsibleby values
+    group_counts = get_interruption_group_counts(db_path, year_month, 'HTs')
+    totals = {}
+    for row in get_interruption_rollup(db_path, year_month, 'HTs'):
+        total = totals.setdefault((row['feedercode'], row['belongsto']), {
+            'interruption_count': group_counts.get((row['feedercode'], row['belongsto']), 0), 'total_duration': None})
+        if row['duration'] is not None:
+            total['total_duration'] = (total['total_duration'] or 0) + row['duration']
+    rows = [{'feedercode': feedercode, 'belongsto': belongsto, **total} for (feedercode, belongsto), total in totals.items()]
 
     result = {}
     for row in rows:
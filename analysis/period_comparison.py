@@ -0,0 +1,105 @@
+"""
+Module to compare the daily load or the energy of two periods side by side.
+
+Both periods of a table are read together: the daily statistics of the two
+dates in one query (analysis.daily_review.get_daily_current_stats) and the
+boundary readings of the two months or years in one query
+(analysis.monthly_review.get_period_energies). The rows are then aligned by
+code in the master order of the table, with absolute and percentage deltas.
+"""
+
+from analysis.daily_review import get_daily_current_stats
+from analysis.monthly_review import get_period_energies
+from analysis.utils import CODE_ORDERS, max_decimal_places
+
+# Compared values: (key, label)
+CURRENT_FIELDS = (('max_value', 'Max Value'), ('min_value', 'Min Value'))
+ENERGY_FIELDS = (('actual_export_energy', 'Export Energy'), ('actual_import_energy', 'Import Energy'))
+
+
+def compare_values(current, reference):
+    """
+    Returns the change from reference to current: {'current', 'reference', 'delta', 'percent'}.
+    Delta is None when either value is missing; percent also when reference is zero.
+    """
+    delta = None
+    percent = None
+    if current is not None and reference is not None:
+        delta = round(current - reference, max_decimal_places(current, reference))
+        if reference:
+            percent = round((current - reference) / abs(reference) * 100, 1)
+    return {'current': current, 'reference': reference, 'delta': delta, 'percent': percent}
+
+
+def align_by_code(current_rows, reference_rows, fields, code_order):
+    """
+    Aligns the rows of two periods by code and compares the given fields.
+
+    Codes are placed by their index in the master order; codes missing from it
+    follow in alphabetical order. A code present in one period only is kept with
+    the other period's row as None.
+
+    Args:
+        current_rows (list of dict): Rows of the period compared, with 'code'.
+        reference_rows (list of dict): Rows of the period compared against.
+        fields (tuple): (key, label) pairs of the compared values.
+        code_order (list): Codes in master order.
+
+    Returns:
+        list of dict: [{'code': ..., 'current': row or None, 'reference': row or None,
+                        'deltas': {key: compare_values(...)}}, ...]
+    """
+    order_index = {code: i for i, code in enumerate(code_order)}
+    current_by_code = {row['code']: row for row in current_rows}
+    reference_by_code = {row['code']: row for row in reference_rows}
+    codes = sorted(current_by_code.keys() | reference_by_code.keys(),
+                   key=lambda code: (order_index.get(code, len(order_index)), code))
+
+    result = []
+    for code in codes:
+        current = current_by_code.get(code)
+        reference = reference_by_code.get(code)
+        result.append({
+            'code': code,
+            'current': current,
+            'reference': reference,
+            'deltas': {key: compare_values(current[key] if current else None, reference[key] if reference else None)
+                       for key, _ in fields}
+        })
+    return result
+
+
+def get_current_comparison(db_path, query_date, reference_date, db_table="sosht", db_code_column="feedercode"):
+    """
+    Compares the daily min/max current of every code on two dates.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        query_date (str): Date compared, 'DD-MM-YYYY'.
+        reference_date (str): Date compared against, 'DD-MM-YYYY'.
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for code ('feedercode', 'tfcode').
+
+    Returns:
+        list of dict: As align_by_code, rows of get_daily_current_stat, deltas of CURRENT_FIELDS.
+    """
+    stats = get_daily_current_stats(db_path, (query_date, reference_date), db_table, db_code_column)
+    return align_by_code(stats[query_date], stats[reference_date], CURRENT_FIELDS, CODE_ORDERS[db_table](db_path))
+
+
+def get_energy_comparison(db_path, period, reference_period, db_table="sosht", db_code_column="feedercode"):
+    """
+    Compares the energy of every code in two months or two years.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        period (str): 'YYYY-MM' month or 'YYYY' year compared.
+        reference_period (str): Month or year compared against.
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for code ('feedercode', 'tfcode').
+
+    Returns:
+        list of dict: As align_by_code, rows of get_monthly_energy, deltas of ENERGY_FIELDS.
+    """
+    energies = get_period_energies(db_path, (period, reference_period), db_table, db_code_column)
+    return align_by_code(energies[period], energies[reference_period], ENERGY_FIELDS, CODE_ORDERS[db_table](db_path))
@@ -0,0 +1,338 @@
+"""
+Module to audit the query plans of the analysis queries and advise indexes.
+
+The SOS Offline database schema is not ours, so which queries scan whole tables
+depends on each site's database. The audit runs every batch report (and the
+hourly views) for the latest date and month in the database, records the SQL
+issued on the way, and runs EXPLAIN QUERY PLAN on each distinct statement.
+Tables read by a full SCAN get an index proposal built from the columns the
+statement filters and joins on.
+
+Proposals are tried on a copy of the database in the sidecar folder first, with
+timings before and after, so nothing changes in the SOS Offline database unless
+the useful indexes are explicitly applied. (An index must live in the same file
+as its table, so applied indexes are created in the main database.)
+
+Statements answered from caches or sidecar stores are not issued and so not audited.
+
+Usage:
+    python -m analysis.query_audit [--substation NAME] [--db PATH] [--apply]
+"""
+
+from collections import OrderedDict
+import os
+import re
+import sqlite3
+import time
+
+from routes.db_service import get_sidecar_path, trace_queries
+
+SIDECAR_NAME = "index-trial"
+# Each statement is timed this many times; the fastest run is reported
+TIMING_RUNS = 3
+# Most columns in a proposed index
+MAX_INDEX_COLUMNS = 3
+
+# Predicates that an index can serve: equality/IN first, then one range column
+_EQUALITY_OPERATORS = ('=', 'IN')
+_PREDICATE_RE = r'(?<![\w.])(?:\w+\.)?{column}\s*(=|IN\b|>=|<=|>|<|BETWEEN\b|LIKE\b)'
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS_RE = re.compile(r"\(\?\.\.\.\)(?:\s*,\s*\(\?\.\.\.\))+")
+
+
+def normalize_sql(sql):
+    """
+    Returns the statement with literals replaced by ? and value lists collapsed,
+    so calls with different parameters group together.
+    """
+    sql = _LITERAL_RE.sub('?', ' '.join(sql.split()))
+    sql = _ROWS_RE.sub('(?...)', _LIST_RE.sub('(?...)', sql))
+    return _ROWS_RE.sub('(?...)', sql)
+
+
+def _latest_period(conn):
+    """
+    Returns the latest reading date in the database as ('DD-MM-YYYY', 'YYYY-MM-DD', 'YYYY-MM').
+    """
+    row = conn.execute("""
+        SELECT dateobserved FROM soseht
+        ORDER BY substr(dateobserved, 7, 4) || substr(dateobserved, 4, 2) || substr(dateobserved, 1, 2) DESC
+        LIMIT 1
+    """).fetchone()
+    if row is None:
+        raise ValueError("The database has no readings to audit with")
+    date = row[0]
+    return date, f"{date[6:10]}-{date[3:5]}-{date[0:2]}", f"{date[6:10]}-{date[3:5]}"
+
+
+def _clear_caches():
+    # Cached results would skip the very queries being audited
+    from analysis import meter_validation
+    from analysis.utils import get_eht_feeder_order, get_ht_feeder_order, get_tf_order
+
+    for get_order in (get_ht_feeder_order, get_eht_feeder_order, get_tf_order):
+        get_order.cache_clear()
+    meter_validation._flags_cache.clear()
+
+
+def capture_queries(substation):
+    """
+    Runs every batch report for the latest date/month of the substation's database,
+    plus the hourly views, and records the statements issued on its database.
+
+    Args:
+        substation (dict): Substation definition as returned by get_config_substations().
+
+    Returns:
+        tuple: ('YYYY-MM-DD' date used, OrderedDict {normalized sql: {'sql': first expanded sql, 'calls': int}})
+    """
+    from analysis.hourly_review import get_day_matrix, get_em_diff
+    from batch_reports import REPORTS, READING_TABLES, build_report
+    from utils.slot_calendar import ALLOWED_TIMES
+
+    db_path = substation['db_path']
+    conn = sqlite3.connect(db_path)
+    try:
+        query_date, date, month = _latest_period(conn)
+    finally:
+        conn.close()
+
+    statements = OrderedDict()
+
+    def record(traced_path, sql):
+        if traced_path != db_path or not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return
+        entry = statements.setdefault(normalize_sql(sql), {'sql': sql, 'calls': 0})
+        entry['calls'] += 1
+
+    _clear_caches()
+    with trace_queries(record):
+        for report, (kind, _) in REPORTS.items():
+            build_report(substation, report, date if kind == 'date' else month)
+        for _, db_table, db_code_column in READING_TABLES:
+            get_em_diff(query_date, ALLOWED_TIMES[-1], db_path, db_table, db_code_column)
+            get_day_matrix(query_date, db_path, db_table, db_code_column)
+    return date, statements
+
+
+def _tables(conn):
+    return [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+
+def explain(conn, sql, tables):
+    """
+    Returns (plan details, tables read by a full scan) of a statement.
+    """
+    details = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    full_scans = []
+    for detail in details:
+        words = detail.split()
+        # 'SCAN soseht' reads the whole table; 'SCAN soseht USING INDEX ...' and CTE scans don't count
+        if len(words) >= 2 and words[0] == 'SCAN' and words[1] in tables and 'INDEX' not in detail:
+            if words[1] not in full_scans:
+                full_scans.append(words[1])
+    return details, full_scans
+
+
+def time_statement(conn, sql, runs=TIMING_RUNS):
+    """
+    Returns the fastest of `runs` executions of a statement, in milliseconds.
+    """
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        conn.execute(sql).fetchall()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 2)
+
+
+def propose_index(conn, sql, table):
+    """
+    Proposes index columns for a statement scanning `table`: columns compared with
+    = or IN (most distinct values first), then at most one range column.
+
+    Returns:
+        tuple of str or None: Index columns, or None if no filtered column is found.
+    """
+    equality = []
+    ranges = []
+    for row in conn.execute(f"PRAGMA table_info({table})"):
+        column = row[1]
+        operators = [m.group(1).upper().strip() for m in
+                     re.finditer(_PREDICATE_RE.format(column=re.escape(column)), sql, re.IGNORECASE)]
+        if any(op in _EQUALITY_OPERATORS for op in operators):
+            equality.append(column)
+        elif operators:
+            ranges.append(column)
+    if not equality and not ranges:
+        return None
+
+    distinct = {column: conn.execute(f"SELECT COUNT(DISTINCT {column}) FROM {table}").fetchone()[0] for column in equality}
+    columns = sorted(equality, key=lambda column: -distinct[column])[:MAX_INDEX_COLUMNS]
+    if ranges and len(columns) < MAX_INDEX_COLUMNS:
+        columns.append(ranges[0])
+    return tuple(columns)
+
+
+def _existing_indexes(conn):
+    """
+    Returns {table: [columns of each index]}.
+    """
+    indexes = {}
+    for table in _tables(conn):
+        for index in conn.execute(f"PRAGMA index_list({table})"):
+            columns = tuple(row[2] for row in conn.execute(f"PRAGMA index_info({index[1]})"))
+            indexes.setdefault(table, []).append(columns)
+    return indexes
+
+
+def _index_sql(table, columns):
+    name = f"idx_{table}_{'_'.join(columns)}"
+    return name, f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+
+
+def audit_queries(substation, apply=False):
+    """
+    Audits the query plans of the analysis queries and advises indexes (see module docstring).
+
+    Args:
+        substation (dict): Substation definition as returned by get_config_substations().
+        apply (bool): Create the indexes that proved useful on the copy in the database itself.
+
+    Returns:
+        dict: {
+            'date': 'YYYY-MM-DD' date the reports were run for,
+            'statements': [{'sql': normalized sql, 'calls': ..., 'access': 'SCAN'/'SEARCH',
+                            'plan': [...], 'full_scans': [tables], 'ms': ...,
+                            'plan_after': [...] or None, 'ms_after': ... or None}, ...],
+            'indexes': [{'table': ..., 'columns': (...), 'sql': ..., 'statements': count of scanning statements,
+                         'useful': bool, 'created': bool, 'error': str or None}, ...]
+        }
+    """
+    db_path = substation['db_path']
+    date, captured = capture_queries(substation)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        tables = _tables(conn)
+        existing = _existing_indexes(conn)
+        statements = []
+        proposals = OrderedDict()
+        for normalized, entry in captured.items():
+            plan, full_scans = explain(conn, entry['sql'], tables)
+            statements.append({
+                'sql': normalized,
+                'expanded_sql': entry['sql'],
+                'calls': entry['calls'],
+                'access': 'SCAN' if full_scans else 'SEARCH',
+                'plan': plan,
+                'full_scans': full_scans,
+                'ms': time_statement(conn, entry['sql']),
+                'plan_after': None,
+                'ms_after': None
+            })
+            for table in full_scans:
+                columns = propose_index(conn, entry['sql'], table)
+                # Skip columns an existing index already leads with; the planner chose not to use it
+                if columns is None or any(index[:len(columns)] == columns for index in existing.get(table, [])):
+                    continue
+                proposal = proposals.setdefault((table, columns), {'table': table, 'columns': columns,
+                                                                   'sql': _index_sql(table, columns)[1],
+                                                                   'statements': 0, 'useful': False,
+                                                                   'created': False, 'error': None})
+                proposal['statements'] += 1
+    finally:
+        conn.close()
+
+    if proposals:
+        _trial(db_path, statements, proposals.values(), tables)
+    if apply:
+        _apply(db_path, [proposal for proposal in proposals.values() if proposal['useful']])
+
+    for statement in statements:
+        del statement['expanded_sql']
+    return {'date': date, 'statements': statements, 'indexes': list(proposals.values())}
+
+
+def _trial(db_path, statements, proposals, tables):
+    """
+    Creates the proposed indexes on a copy of the database and measures the scanning
+    statements again. Marks the proposals the planner used as useful.
+    """
+    trial_path = get_sidecar_path(db_path, SIDECAR_NAME)
+    os.makedirs(os.path.dirname(trial_path), exist_ok=True)
+    source = sqlite3.connect(db_path)
+    trial = sqlite3.connect(trial_path)
+    try:
+        source.backup(trial)
+        for proposal in proposals:
+            trial.execute(proposal['sql'])
+        trial.commit()
+        trial.execute("ANALYZE")
+
+        used = set()
+        for statement in statements:
+            if not statement['full_scans']:
+                continue
+            statement['plan_after'], _ = explain(trial, statement['expanded_sql'], tables)
+            statement['ms_after'] = time_statement(trial, statement['expanded_sql'])
+            for detail in statement['plan_after']:
+                match = re.search(r'USING (?:COVERING )?INDEX (\w+)', detail)
+                if match:
+                    used.add(match.group(1))
+        for proposal in proposals:
+            proposal['useful'] = _index_sql(proposal['table'], proposal['columns'])[0] in used
+    finally:
+        source.close()
+        trial.close()
+        os.remove(trial_path)
+
+
+def _apply(db_path, proposals):
+    conn = sqlite3.connect(db_path)
+    try:
+        for proposal in proposals:
+            try:
+                conn.execute(proposal['sql'])
+                conn.commit()
+                proposal['created'] = True
+            except sqlite3.Error as exc:
+                # Read-only or locked (e.g. SOS entry software writing)
+                proposal['error'] = str(exc)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    from routes.app_utils import get_config_substations
+
+    parser = argparse.ArgumentParser(description="Audit analysis query plans and advise indexes.")
+    parser.add_argument("--substation", help="Substation name from sos_config.ini (default: the default substation)")
+    parser.add_argument("--db", help="Database path, overriding the configured one")
+    parser.add_argument("--apply", action="store_true", help="Create the useful indexes in the database")
+    args = parser.parse_args()
+
+    substations = {s['name']: s for s in get_config_substations()}
+    if args.substation and args.substation not in substations:
+        parser.error(f"unknown substation: {args.substation}")
+    substation = substations[args.substation] if args.substation else next(iter(substations.values()))
+    if args.db:
+        substation['db_path'] = args.db
+
+    audit = audit_queries(substation, apply=args.apply)
+    print(f"Reports run for {audit['date']}; {len(audit['statements'])} distinct statements\n")
+    for statement in audit['statements']:
+        after = f" -> {statement['ms_after']:8.2f} ms" if statement['ms_after'] is not None else ""
+        print(f"{statement['access']:6} {statement['calls']:4}x {statement['ms']:8.2f} ms{after}  {statement['sql'][:100]}")
+        if statement['full_scans']:
+            print(f"{'':12}full scan of {', '.join(statement['full_scans'])}")
+    print()
+    for proposal in audit['indexes']:
+        state = 'created' if proposal['created'] else (f"failed: {proposal['error']}" if proposal['error'] else
+                                                       ('useful' if proposal['useful'] else 'not used by the planner'))
+        print(f"{proposal['sql']}  [{proposal['statements']} statement(s), {state}]")
+    if not audit['indexes']:
+        print("No indexes to propose")
@@ -0,0 +1,297 @@
+"""
+Module to calculate reliability indices from reconstructed interruption events.
+
+An outage may be entered in `intrpns` as several rows (one per day between
+datefrom and dateto, sharing a grpslno). Events are reconstructed once: rows of
+the same feeder and group become one event from the earliest start to the latest
+end, and overlapping events of a feeder are merged. The events are kept in a
+sidecar database, rebuilt only when the interruption rows change, and held in
+memory as arrays sorted by start time, so the events of any period are found by
+binary search instead of a scan.
+"""
+
+from calendar import timegm
+from datetime import date, datetime
+import hashlib
+
+import numpy as np
+from analysis.interruption_rollups import refresh_lock, stale_months
+from analysis.utils import get_db_version, get_eht_feeder_order, get_ht_feeder_order, get_tf_order
+from routes.db_service import get_connection, get_sidecar_connection
+
+SIDECAR_NAME = "reliability"
+
+FEEDER_GROUPS = {
+    'EHT': get_eht_feeder_order,
+    'T/F': get_tf_order,
+    'HTs': get_ht_feeder_order,
+}
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS reliability_state (key TEXT PRIMARY KEY, value TEXT);
+    CREATE TABLE IF NOT EXISTS reliability_months (month TEXT PRIMARY KEY, signature TEXT);
+    CREATE TABLE IF NOT EXISTS reliability_events (
+        fdrtype TEXT, feedercode TEXT, started TEXT, ended TEXT,
+        start_minute INTEGER, end_minute INTEGER, belongsto TEXT, responsibleby TEXT, row_count INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_reliability_start ON reliability_events (start_minute);
+"""
+
+# Loaded event arrays: {db_path: (signature, timeline)}
+_timelines = {}
+
+
+def _epoch_minute(timestamp):
+    # Same clock as strftime('%s') in SQLite (timestamps taken as UTC)
+    return timegm(datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").timetuple()) // 60
+
+
+def _reconstruct_events(conn):
+    """
+    Returns the outage events of intrpns, ordered by start time. Interruptions
+    without a valid start and end are left out.
+    """
+    rows = conn.execute("""
+        SELECT fdrtype, feedercode, COALESCE(grpslno, -slno) AS grp, started, ended, belongsto, responsibleby,
+               CAST(strftime('%s', started) AS INTEGER) / 60 AS start_minute,
+               CAST(strftime('%s', ended) AS INTEGER) / 60 AS end_minute
+        FROM intrpns
+        WHERE strftime('%s', started) IS NOT NULL AND strftime('%s', ended) IS NOT NULL AND ended >= started
+        ORDER BY fdrtype, feedercode, started, slno
+    """).fetchall()
+
+    # Rows of one group: earliest start to latest end, classified by the row that closes it
+    groups = {}
+    for row in rows:
+        key = (row['fdrtype'], row['feedercode'], row['grp'])
+        event = groups.get(key)
+        if event is None:
+            groups[key] = event = {'fdrtype': row['fdrtype'], 'feedercode': row['feedercode'],
+                                   'started': row['started'], 'start_minute': row['start_minute'],
+                                   'ended': row['ended'], 'end_minute': row['end_minute'],
+                                   'belongsto': row['belongsto'], 'responsibleby': row['responsibleby'],
+                                   'row_count': 0}
+        event['row_count'] += 1
+        if row['end_minute'] >= event['end_minute']:
+            event.update(ended=row['ended'], end_minute=row['end_minute'],
+                         belongsto=row['belongsto'], responsibleby=row['responsibleby'])
+
+    # Overlapping events of the same feeder (entered twice, or under two groups) count once
+    events = []
+    for event in sorted(groups.values(), key=lambda e: (e['fdrtype'], e['feedercode'], e['start_minute'])):
+        last = events[-1] if events else None
+        if (last and last['fdrtype'] == event['fdrtype'] and last['feedercode'] == event['feedercode']
+                and event['start_minute'] <= last['end_minute']):
+            last['row_count'] += event['row_count']
+            if event['end_minute'] > last['end_minute']:
+                last.update(ended=event['ended'], end_minute=event['end_minute'])
+            continue
+        events.append(event)
+    return sorted(events, key=lambda e: (e['start_minute'], e['fdrtype'], e['feedercode']))
+
+
+def refresh_reliability_events(db_path):
+    """
+    Brings the stored events of db_path up to date, reconstructing them only when
+    the interruption rows of any month changed, and returns the signature of all months.
+    """
+    db_version = str(get_db_version(db_path))
+    with refresh_lock(db_path, SIDECAR_NAME):
+        store = get_sidecar_connection(db_path, SIDECAR_NAME)
+        try:
+            store.executescript(_SCHEMA)
+            state = dict(store.execute("SELECT key, value FROM reliability_state").fetchall())
+            if state.get('db_version') == db_version:
+                return state['signature']
+
+            conn = get_connection(db_path)
+            try:
+                stored = {row[0]: row[1] for row in store.execute("SELECT month, signature FROM reliability_months")}
+                source, changed, removed = stale_months(db_path, conn, stored)
+                signature = hashlib.sha1(repr(sorted(source.items())).encode('utf-8')).hexdigest()
+                if changed or removed:
+                    # Events may span months: reconstructed as a whole
+                    events = _reconstruct_events(conn)
+                    store.execute("DELETE FROM reliability_events")
+                    store.executemany("""
+                        INSERT INTO reliability_events
+                            (fdrtype, feedercode, started, ended, start_minute, end_minute,
+                             belongsto, responsibleby, row_count)
+                        VALUES (:fdrtype, :feedercode, :started, :ended, :start_minute, :end_minute,
+                                :belongsto, :responsibleby, :row_count)
+                    """, events)
+                    store.execute("DELETE FROM reliability_months")
+                    store.executemany("INSERT INTO reliability_months (month, signature) VALUES (?, ?)", source.items())
+            finally:
+                conn.close()
+
+            store.executemany("INSERT OR REPLACE INTO reliability_state (key, value) VALUES (?, ?)",
+                              (('db_version', db_version), ('signature', signature)))
+            store.commit()
+            return signature
+        finally:
+            store.close()
+
+
+def _load_timeline(db_path):
+    """
+    Returns the events of db_path as arrays sorted by start minute, reloading them
+    from the store when their signature changed.
+    """
+    signature = refresh_reliability_events(db_path)
+    loaded = _timelines.get(db_path)
+    if loaded and loaded[0] == signature:
+        return loaded[1]
+
+    store = get_sidecar_connection(db_path, SIDECAR_NAME)
+    try:
+        rows = store.execute("""
+            SELECT fdrtype, feedercode, start_minute, end_minute, belongsto
+            FROM reliability_events
+            ORDER BY start_minute
+        """).fetchall()
+    finally:
+        store.close()
+
+    keys = list(dict.fromkeys((row['fdrtype'], row['feedercode']) for row in rows))
+    key_index = {key: i for i, key in enumerate(keys)}
+    start = np.array([row['start_minute'] for row in rows], dtype=np.int64)
+    end = np.array([row['end_minute'] for row in rows], dtype=np.int64)
+    timeline = {
+        'keys': keys,
+        'feeder': np.array([key_index[(row['fdrtype'], row['feedercode'])] for row in rows], dtype=np.int64),
+        'start': start,
+        'end': end,
+        'scheduled': np.array([row['belongsto'] == 'Scheduled' for row in rows], dtype=bool),
+        # Longest event, bounding how far before a window an overlapping event can start
+        'max_span': int((end - start).max()) if len(rows) else 0,
+    }
+    _timelines[db_path] = (signature, timeline)
+    return timeline
+
+
+def get_outage_events(db_path, start_date, end_date, fdrtypes=('EHT', 'T/F', 'HTs')):
+    """
+    Returns the reconstructed outage events starting within a period, ordered by start time.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        start_date (str): First date, 'YYYY-MM-DD'.
+        end_date (str): Last date (inclusive), 'YYYY-MM-DD'.
+        fdrtypes (tuple): Feeder types to include.
+
+    Returns:
+        list of sqlite3.Row: fdrtype, feedercode, started, ended, start_minute, end_minute,
+                             belongsto, responsibleby, row_count.
+    """
+    refresh_reliability_events(db_path)
+    end_minute = _epoch_minute(f"{date.fromordinal(date.fromisoformat(end_date).toordinal() + 1)} 00:00:00")
+    store = get_sidecar_connection(db_path, SIDECAR_NAME)
+    try:
+        return store.execute(f"""
+            SELECT fdrtype, feedercode, started, ended, start_minute, end_minute, belongsto, responsibleby, row_count
+            FROM reliability_events
+            WHERE start_minute >= ? AND start_minute < ? AND fdrtype IN ({','.join(['?'] * len(fdrtypes))})
+            ORDER BY start_minute, fdrtype, feedercode
+        """, (_epoch_minute(f"{start_date} 00:00:00"), end_minute, *fdrtypes)).fetchall()
+    finally:
+        store.close()
+
+
+def _window(timeline, start_minute, end_minute):
+    """
+    Returns the indices of the events overlapping [start_minute, end_minute).
+    """
+    lo = np.searchsorted(timeline['start'], start_minute - timeline['max_span'], side='left')
+    hi = np.searchsorted(timeline['start'], end_minute, side='left')
+    overlaps = (timeline['end'][lo:hi] > start_minute) | (timeline['start'][lo:hi] >= start_minute)
+    return lo + np.flatnonzero(overlaps)
+
+
+def get_reliability_indices(db_path, start_date, end_date, fdrtype, feeders=None):
+    """
+    Returns per-feeder interruption frequency and duration and SAIFI/SAIDI-style
+    indices of a feeder group over a period.
+
+    Without customer counts, every feeder of the group counts as one customer:
+    SAIFI is interruptions per feeder, SAIDI interrupted minutes per feeder,
+    CAIDI = SAIDI / SAIFI, and ASAI the availability (%) over the period.
+    Interruptions are counted in the period they start in; minutes are the part
+    of each event inside the period.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        start_date (str): First date, 'YYYY-MM-DD'.
+        end_date (str): Last date (inclusive), 'YYYY-MM-DD'.
+        fdrtype (str): 'EHT', 'T/F' or 'HTs'.
+        feeders (tuple or None): Feeder codes of the group; all feeders of the type if None.
+
+    Returns:
+        dict: {
+            'period_minutes': ..., 'feeder_count': ...,
+            'saifi': ..., 'saidi': ..., 'caidi': ..., 'asai': ...,
+            'interruptions': ..., 'interrupted_minutes': ...,
+            'feeders': [{'code': ..., 'interruptions': ..., 'scheduled': ..., 'unscheduled': ...,
+                         'interrupted_minutes': ..., 'average_minutes': ..., 'longest_minutes': ...,
+                         'availability_percent': ...}, ...]
+        }
+    """
+    first = date.fromisoformat(start_date)
+    last = date.fromisoformat(end_date)
+    start_minute = _epoch_minute(f"{first} 00:00:00")
+    end_minute = _epoch_minute(f"{date.fromordinal(last.toordinal() + 1)} 00:00:00")
+    period_minutes = end_minute - start_minute
+
+    timeline = _load_timeline(db_path)
+    index = _window(timeline, start_minute, end_minute)
+    start = timeline['start'][index]
+    end = timeline['end'][index]
+    feeder = timeline['feeder'][index]
+    started_in = start >= start_minute
+    minutes = np.minimum(end, end_minute) - np.maximum(start, start_minute)
+
+    size = len(timeline['keys'])
+    counts = np.bincount(feeder[started_in], minlength=size)
+    scheduled = np.bincount(feeder[started_in & timeline['scheduled'][index]], minlength=size)
+    interrupted = np.bincount(feeder, weights=minutes, minlength=size)
+    durations = np.bincount(feeder[started_in], weights=(end - start)[started_in], minlength=size)
+    longest = np.zeros(size, dtype=np.int64)
+    np.maximum.at(longest, feeder, end - start)
+
+    codes = list(feeders or FEEDER_GROUPS[fdrtype](db_path))
+    if not feeders:
+        codes += [code for type_, code in timeline['keys'] if type_ == fdrtype and code not in codes]
+    key_index = {key: i for i, key in enumerate(timeline['keys'])}
+
+    rows = []
+    for code in codes:
+        i = key_index.get((fdrtype, code))
+        count = int(counts[i]) if i is not None else 0
+        total = int(interrupted[i]) if i is not None else 0
+        rows.append({
+            'code': code,
+            'interruptions': count,
+            'scheduled': int(scheduled[i]) if i is not None else 0,
+            'unscheduled': count - (int(scheduled[i]) if i is not None else 0),
+            'interrupted_minutes': total,
+            'average_minutes': round(float(durations[i]) / count, 1) if count else None,
+            'longest_minutes': int(longest[i]) if i is not None and total else None,
+            'availability_percent': round((period_minutes - total) / period_minutes * 100, 2)
+        })
+
+    feeder_count = len(rows)
+    interruptions = sum(row['interruptions'] for row in rows)
+    interrupted_minutes = sum(row['interrupted_minutes'] for row in rows)
+    saifi = interruptions / feeder_count if feeder_count else None
+    saidi = interrupted_minutes / feeder_count if feeder_count else None
+    return {
+        'period_minutes': period_minutes,
+        'feeder_count': feeder_count,
+        'interruptions': interruptions,
+        'interrupted_minutes': interrupted_minutes,
+        'saifi': round(saifi, 3) if saifi is not None else None,
+        'saidi': round(saidi, 1) if saidi is not None else None,
+        'caidi': round(saidi / saifi, 1) if saifi else None,
+        'asai': round((1 - saidi / period_minutes) * 100, 3) if saidi is not None else None,
+        'feeders': rows
+    }
@@ -1,9 +1,344 @@
 """
 Module to calculate station load.
+
+Station load (and any other load derived from feeder currents) is defined by a
+small formula, e.g. '1PLPM - 1PMKJ' or '"INCOMER I" + "INCOMER II"', with rules
+for missing and negative readings. A formula is compiled to SQL so the load at
+every time slot, and its peak/min with times, are computed by SQLite in one
+pivoted query per date range.
+
+Formula syntax:
+    [name =] expression [; missing=null|zero] [; negative=missing|zero|keep]
+
+    expression  terms joined by + - * / with parentheses and numbers; a term is a
+                feeder/transformer code, quoted ("INCOMER I") if it has spaces.
+    missing     null (default): the load is missing when any code has no reading
+                zero: a code without a reading counts as 0
+    negative    missing (default): a negative current is an invalid reading
+                zero: a negative current counts as 0
+                keep: negative currents are used as they are
 """
 
+from functools import lru_cache
+import re
+
 from routes.db_service import get_connection
 
+MISSING_RULES = ('null', 'zero')
+NEGATIVE_RULES = ('missing', 'zero', 'keep')
+
+_TOKEN_RE = re.compile(r'\s*(?:(\d+(?:\.\d+)?(?![A-Za-z0-9_.]))|([A-Za-z0-9_]+)|"([^"]+)"|\'([^\']+)\'|([-+*/()]))')
+
+
+class Formula:
+    """
+    A parsed load formula.
+
+    Attributes:
+        name (str or None): Optional name given as 'name = ...'.
+        text (str): The expression as written.
+        codes (tuple of str): Codes used, in order of first appearance.
+        missing (str): Rule for codes without a reading.
+        negative (str): Rule for negative currents.
+        sql (str): SQL expression over pivot columns c0, c1, ... (one per code).
+    """
+    __slots__ = ('name', 'text', 'codes', 'missing', 'negative', 'sql')
+
+    def __init__(self, name, text, codes, missing, negative, sql):
+        self.name = name
+        self.text = text
+        self.codes = codes
+        self.missing = missing
+        self.negative = negative
+        self.sql = sql
+
+    def __repr__(self):
+        return f"Formula({self.text!r}, missing={self.missing!r}, negative={self.negative!r})"
+
+
+class _Parser:
+    """
+    Recursive-descent parser emitting the SQL expression of a formula.
+    """
+
+    def __init__(self, text, missing, negative):
+        self.tokens = self._tokenize(text)
+        self.pos = 0
+        self.codes = []
+        self.missing = missing
+        self.negative = negative
+
+    @staticmethod
+    def _tokenize(text):
+        tokens = []
+        pos = 0
+        text = text.rstrip()
+        while pos < len(text):
+            match = _TOKEN_RE.match(text, pos)
+            if not match:
+                raise ValueError(f"Invalid formula near '{text[pos:].strip()}'")
+            number, code, double_quoted, single_quoted, operator = match.groups()
+            if number is not None:
+                tokens.append(('number', number))
+            elif operator is not None:
+                tokens.append(('op', operator))
+            else:
+                tokens.append(('code', (code or double_quoted or single_quoted).strip()))
+            pos = match.end()
+        return tokens
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _next(self):
+        token = self._peek()
+        self.pos += 1
+        return token
+
+    def parse(self):
+        sql = self._sum()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected '{self._peek()[1]}' in formula")
+        if not self.codes:
+            raise ValueError("Formula must use at least one code")
+        return sql
+
+    def _sum(self):
+        sql = self._product()
+        while self._peek() in (('op', '+'), ('op', '-')):
+            sql = f"({sql} {self._next()[1]} {self._product()})"
+        return sql
+
+    def _product(self):
+        sql = self._unary()
+        while self._peek() in (('op', '*'), ('op', '/')):
+            if self._next()[1] == '*':
+                sql = f"({sql} * {self._unary()})"
+            else:
+                # Real division; dividing by zero gives a missing load
+                sql = f"(1.0 * {sql} / NULLIF({self._unary()}, 0))"
+        return sql
+
+    def _unary(self):
+        if self._peek() == ('op', '-'):
+            self._next()
+            return f"(-{self._unary()})"
+        return self._atom()
+
+    def _atom(self):
+        kind, value = self._next()
+        if kind == 'number':
+            return repr(float(value))
+        if kind == 'code':
+            return self._term(value)
+        if (kind, value) == ('op', '('):
+            sql = self._sum()
+            if self._next() != ('op', ')'):
+                raise ValueError("Missing ')' in formula")
+            return sql
+        raise ValueError(f"Unexpected '{value}' in formula" if value else "Formula ends unexpectedly")
+
+    def _term(self, code):
+        if code not in self.codes:
+            self.codes.append(code)
+        column = f"c{self.codes.index(code)}"
+        if self.negative == 'missing':
+            column = f"(CASE WHEN {column} >= 0 THEN {column} END)"
+        elif self.negative == 'zero':
+            column = f"(CASE WHEN {column} < 0 THEN 0 ELSE {column} END)"
+        if self.missing == 'zero':
+            column = f"COALESCE({column}, 0)"
+        return column
+
+
+@lru_cache(maxsize=64)
+def parse_formula(spec):
+    """
+    Parses a formula specification (see module docstring).
+
+    Args:
+        spec (str): e.g. 'load = 1PLPM - 1PMKJ; negative=missing'.
+
+    Returns:
+        Formula: The parsed formula.
+
+    Raises:
+        ValueError: If the formula or one of its rules is invalid.
+    """
+    expression, *options = spec.split(';')
+    name = None
+    if '=' in expression:
+        name, expression = (part.strip() for part in expression.split('=', 1))
+
+    rules = {'missing': 'null', 'negative': 'missing'}
+    for option in options:
+        if not option.strip():
+            continue
+        key, _, value = (part.strip().lower() for part in option.partition('='))
+        allowed = {'missing': MISSING_RULES, 'negative': NEGATIVE_RULES}.get(key)
+        if allowed is None:
+            raise ValueError(f"Unknown formula rule '{key}'")
+        if value not in allowed:
+            raise ValueError(f"Rule {key} must be one of: {', '.join(allowed)}")
+        rules[key] = value
+
+    parser = _Parser(expression, rules['missing'], rules['negative'])
+    sql = parser.parse()
+    return Formula(name, expression.strip(), tuple(parser.codes), rules['missing'], rules['negative'], sql)
+
+
+def formula_from_codes(codes, operator='+', missing='null', negative='missing'):
+    """
+    Builds a formula spec joining codes with an operator, e.g. ('1PLPM', '1PMKJ'), '-'.
+    """
+    expression = f" {operator} ".join(f'"{code}"' for code in codes)
+    return f"{expression}; missing={missing}; negative={negative}"
+
+
+def station_formula(feeder_in='1PLPM', feeder_out='1PMKJ', formula=None):
+    """
+    Returns the station load formula: the configured one, or feeder_in - feeder_out
+    (negative currents are invalid readings).
+    """
+    return formula if formula is not None else formula_from_codes((feeder_in, feeder_out), '-')
+
+
+def incomers_formula(incomers=('INCOMER I', 'INCOMER II'), formula=None):
+    """
+    Returns the 11 kV incomers load formula (on sosht): the configured one, or the sum
+    of the incomers (a missing incomer counts as 0, negative currents are kept).
+    """
+    return formula if formula is not None else formula_from_codes(incomers, '+', missing='zero', negative='keep')
+
+
+def _pivot_query(formulas, db_table, db_code_column, date_count, time_filter):
+    """
+    Builds the pivot CTE: one row per (date, time) with one column per formula.
+    Returns (sql, codes); parameters are the codes (twice) followed by the dates.
+    """
+    codes = []
+    for formula in formulas.values():
+        for code in formula.codes:
+            if code not in codes:
+                codes.append(code)
+
+    pivot_columns = ",\n".join(
+        f"MAX(CASE WHEN {db_code_column} = ? THEN current END) AS p{i}" for i in range(len(codes))
+    )
+    load_columns = []
+    for i, formula in enumerate(formulas.values()):
+        # Map the formula's own column numbers onto the shared pivot columns
+        sql = re.sub(r'\bc(\d+)\b', lambda m: f"p{codes.index(formula.codes[int(m.group(1))])}", formula.sql)
+        load_columns.append(f"{sql} AS v{i}")
+
+    sql = f"""
+        WITH pivot AS (
+            SELECT dateobserved, timeobserved,
+                   {pivot_columns}
+            FROM {db_table}
+            WHERE {db_code_column} IN ({','.join(['?'] * len(codes))})
+              AND dateobserved IN ({','.join(['?'] * date_count)})
+              {time_filter}
+            GROUP BY dateobserved, timeobserved
+        ),
+        loads AS (
+            SELECT dateobserved, timeobserved, {', '.join(load_columns)}
+            FROM pivot
+        )
+    """
+    return sql, codes
+
+
+def _resolve(formulas):
+    return {name: parse_formula(spec) if isinstance(spec, str) else spec for name, spec in formulas.items()}
+
+
+def get_load_peak_min(db_path, query_dates, formulas, db_table="soseht", db_code_column="feedercode"):
+    """
+    Returns the peak and minimum of each formula, with times, for every date.
+    All formulas and dates are evaluated in one query; ties go to the earliest time.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        query_dates (list of str): Dates in 'DD-MM-YYYY' format.
+        formulas (dict): {name: formula spec (str) or Formula}.
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for code ('feedercode', 'tfcode').
+
+    Returns:
+        dict: {date: {name: {'peak': ..., 'peak_time': ..., 'min': ..., 'min_time': ...}}}
+              for every requested date (values None where there is no load).
+    """
+    formulas = _resolve(formulas)
+    names = list(formulas)
+    sql, codes = _pivot_query(formulas, db_table, db_code_column, len(query_dates), "")
+
+    ranked = []
+    for i in range(len(names)):
+        ranked.append(f"""
+            SELECT {i} AS formula, dateobserved, timeobserved, v{i} AS value,
+                   ROW_NUMBER() OVER (PARTITION BY dateobserved ORDER BY v{i} DESC, timeobserved) AS peak_rank,
+                   ROW_NUMBER() OVER (PARTITION BY dateobserved ORDER BY v{i} ASC, timeobserved) AS min_rank
+            FROM loads
+            WHERE v{i} IS NOT NULL
+        """)
+    sql += f"""
+        SELECT formula, dateobserved,
+               MAX(CASE WHEN peak_rank = 1 THEN value END) AS peak,
+               MAX(CASE WHEN peak_rank = 1 THEN timeobserved END) AS peak_time,
+               MAX(CASE WHEN min_rank = 1 THEN value END) AS min,
+               MAX(CASE WHEN min_rank = 1 THEN timeobserved END) AS min_time
+        FROM ({' UNION ALL '.join(ranked)})
+        WHERE peak_rank = 1 OR min_rank = 1
+        GROUP BY formula, dateobserved
+    """
+
+    result = {
+        query_date: {name: {'peak': None, 'peak_time': None, 'min': None, 'min_time': None} for name in names}
+        for query_date in query_dates
+    }
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    cursor.execute(sql, (*codes, *codes, *query_dates))
+    for formula, query_date, peak, peak_time, min_value, min_time in cursor:
+        result[query_date][names[formula]] = {'peak': peak, 'peak_time': peak_time, 'min': min_value, 'min_time': min_time}
+    conn.close()
+    return result
+
+
+def get_load_series(db_path, query_dates, formula, db_table="soseht", db_code_column="feedercode", query_time=None):
+    """
+    Returns the load of a formula at every time slot of the given dates.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        query_dates (list of str): Dates in 'DD-MM-YYYY' format.
+        formula (str or Formula): Formula spec or parsed formula.
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for code ('feedercode', 'tfcode').
+        query_time (str or None): Only this 'HH:MM' time slot if given.
+
+    Returns:
+        list of tuple: (date, time, load or None), ordered by date as given and time.
+    """
+    formulas = _resolve({'load': formula})
+    time_filter = "AND timeobserved = ?" if query_time else ""
+    sql, codes = _pivot_query(formulas, db_table, db_code_column, len(query_dates), time_filter)
+    sql += "SELECT dateobserved, timeobserved, v0 FROM loads"
+
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    cursor.execute(sql, (*codes, *codes, *query_dates, *([query_time] if query_time else [])))
+    rows = cursor.fetchall()
+    conn.close()
 
+    date_order = {query_date: i for i, query_date in enumerate(query_dates)}
+    return sorted(((row[0], row[1], row[2]) for row in rows), key=lambda r: (date_order[r[0]], r[1]))
 
 
+def get_load_at(db_path, query_date, query_time, formula, db_table="soseht", db_code_column="feedercode"):
+    """
+    Returns the load of a formula at one time slot, or None if it is missing.
+    """
+    series = get_load_series(db_path, [query_date], formula, db_table, db_code_column, query_time)
+    return series[0][2] if series else None
@@ -0,0 +1,139 @@
+"""
+Module to calculate transformer loading against the rating in tfmaster.
+
+Loading (%) of a reading is its apparent power, √3 x voltage x current, over the
+transformer capacity. The month's readings are fetched in one query and arranged
+as (transformer x day x slot) arrays, so loading, hours above a threshold and
+overload runs are computed with array operations.
+"""
+
+import numpy as np
+from analysis.utils import get_tf_order, sort_by_order
+from routes.db_service import get_connection
+from utils.slot_calendar import ALLOWED_TIMES, HOURLY_TIMES, SLOT_INDEX, month_dates
+
+# Capacity in tfmaster is in MVA
+CAPACITY_KVA_PER_UNIT = 1000.0
+# Voltage (kV) assumed for readings without a valid voltage (sostf is metered on the 11 kV side)
+NOMINAL_VOLTAGE_KV = 11.0
+# Hourly readings at or above this loading (%) are counted as hours above threshold
+DEFAULT_LOADING_THRESHOLD = 80.0
+# Loading (%) above which a transformer is overloaded
+OVERLOAD_PERCENT = 100.0
+
+
+def _runs(mask):
+    """
+    Returns the lengths of the runs of True in each row of a 2-D boolean array.
+    """
+    padded = np.pad(mask.astype(np.int8), ((0, 0), (1, 1)))
+    edges = np.diff(padded, axis=1)
+    runs = []
+    for starts, ends in ((np.flatnonzero(row == 1), np.flatnonzero(row == -1)) for row in edges):
+        runs.append(ends - starts)
+    return runs
+
+
+def get_transformer_loading(db_path, year_month, threshold=DEFAULT_LOADING_THRESHOLD):
+    """
+    Returns the loading of every transformer at every slot of a month, with
+    hours above the threshold and overload durations.
+
+    Hours are counted from the hourly readings (each stands for one hour);
+    overloads are runs of consecutive hourly readings above OVERLOAD_PERCENT,
+    continuing across midnight.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        year_month (str): Month in 'YYYY-MM' format.
+        threshold (float): Loading (%) counted as hours above threshold.
+
+    Returns:
+        dict: {
+            'dates': [...], 'times': [...],
+            'transformers': [{
+                'code': ..., 'capacity': ... (None if not rated),
+                'heatmap': [[loading % or None per time] per date],
+                'peak': ..., 'peak_date': ..., 'peak_time': ..., 'average': ...,
+                'hours_above_threshold': ..., 'overload_hours': ...,
+                'overload_events': ..., 'longest_overload_hours': ...
+            }, ...]
+        }
+    """
+    dates = month_dates(year_month)
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT s.tfcode, s.dateobserved, s.timeobserved, s.current, s.voltage, m.capacity
+        FROM sostf s
+        LEFT JOIN tfmaster m ON m.tfcode = s.tfcode
+        WHERE s.dateobserved IN ({','.join(['?'] * len(dates))})
+          AND s.timeobserved IN ({','.join(['?'] * len(ALLOWED_TIMES))})
+    """, (*dates, *ALLOWED_TIMES))
+    rows = cursor.fetchall()
+    conn.close()
+
+    codes = list(dict.fromkeys(row['tfcode'] for row in rows))
+    code_index = {code: i for i, code in enumerate(codes)}
+    date_index = {date: i for i, date in enumerate(dates)}
+    capacity = np.full(len(codes), np.nan)
+    positions = ([], [], [])
+    current = []
+    voltage = []
+    for row in rows:
+        i = code_index[row['tfcode']]
+        if row['capacity']:
+            capacity[i] = row['capacity']
+        positions[0].append(i)
+        positions[1].append(date_index[row['dateobserved']])
+        positions[2].append(SLOT_INDEX[row['timeobserved']])
+        current.append(np.nan if row['current'] is None else row['current'])
+        voltage.append(np.nan if row['voltage'] is None else row['voltage'])
+
+    shape = (len(codes), len(dates), len(ALLOWED_TIMES))
+    amps = np.full(shape, np.nan)
+    kv = np.full(shape, np.nan)
+    amps[positions] = current
+    kv[positions] = voltage
+
+    with np.errstate(invalid='ignore'):
+        kv = np.where(kv > 0, kv, NOMINAL_VOLTAGE_KV)
+        amps = np.where(amps >= 0, amps, np.nan)
+        loading = np.sqrt(3) * kv * amps / (capacity[:, None, None] * CAPACITY_KVA_PER_UNIT) * 100
+        loading = np.round(loading, 1)
+
+        # Hourly readings of the month in time order (day by day) for hour counts and runs
+        hourly = loading[:, :, [SLOT_INDEX[time] for time in HOURLY_TIMES]].reshape(len(codes), len(dates) * len(HOURLY_TIMES))
+        above = np.sum(hourly >= threshold, axis=1)
+        overloaded = hourly > OVERLOAD_PERCENT
+    runs = _runs(overloaded)
+
+    result = []
+    for i, code in enumerate(codes):
+        values = loading[i]
+        entry = {
+            'code': code,
+            'capacity': None if np.isnan(capacity[i]) else float(capacity[i]),
+            'heatmap': [[None if np.isnan(v) else float(v) for v in day] for day in values],
+            'peak': None, 'peak_date': None, 'peak_time': None, 'average': None,
+            'hours_above_threshold': int(above[i]),
+            'overload_hours': int(np.sum(overloaded[i])),
+            'overload_events': len(runs[i]),
+            'longest_overload_hours': int(runs[i].max()) if len(runs[i]) else 0
+        }
+        if not np.all(np.isnan(values)):
+            # First occurrence (earliest date, then time) on ties
+            day, slot = np.unravel_index(np.nanargmax(values), values.shape)
+            entry.update({
+                'peak': float(values[day, slot]),
+                'peak_date': dates[day],
+                'peak_time': ALLOWED_TIMES[slot],
+                'average': round(float(np.nanmean(values)), 1)
+            })
+        result.append(entry)
+
+    return {
+        'dates': dates,
+        'times': list(ALLOWED_TIMES),
+        'transformers': sort_by_order(result, 'code', get_tf_order(db_path))
+    }
@@ -0,0 +1,155 @@
+"""
+Module to find outages visible in the readings but missing from the interruption register.
+
+Readings with zero or negative current are outages the other reports leave out.
+The month's readings of a table are arranged as a (code x slot) current array in
+one query; runs of zero readings are found with one vectorized run-length pass,
+and every run is anti-joined against the reconstructed interruption events of
+its code (analysis.reliability). Runs no recorded interruption overlaps are gaps
+in the register.
+"""
+
+from datetime import date
+
+import numpy as np
+from analysis.reliability import get_outage_events
+from analysis.utils import get_eht_feeder_order, get_ht_feeder_order, get_tf_order, sort_by_order
+from routes.db_service import get_connection
+from utils.slot_calendar import ALLOWED_TIMES, SLOT_INDEX, SLOT_MINUTES, date_from_day_number, day_number, month_dates
+
+# Reading tables: (code column, intrpns fdrtype, feeder order)
+READING_TABLES = {
+    'soseht': ('feedercode', 'EHT', get_eht_feeder_order),
+    'sostf': ('tfcode', 'T/F', get_tf_order),
+    'sosht': ('feedercode', 'HTs', get_ht_feeder_order),
+}
+# Runs shorter than this many readings are left out (single zero readings are often entry slips)
+DEFAULT_MIN_READINGS = 2
+# Interruptions starting this many days before the month can still cover runs in it
+EVENT_LOOKBACK_DAYS = 1
+# Day number of 01-01-1970, so slot times use the same minute clock as the interruption events
+_EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+
+def _zero_runs(zero):
+    """
+    Returns (rows, first, last) arrays of the runs of True in each row of a 2-D
+    boolean array: the row of each run and its first and last column.
+    """
+    padded = np.pad(zero.astype(np.int8), ((0, 0), (1, 1)))
+    edges = np.diff(padded, axis=1)
+    rows, first = np.nonzero(edges == 1)
+    _, after = np.nonzero(edges == -1)
+    return rows, first, after - 1
+
+
+def get_unreported_outages(db_path, year_month, db_table="sosht", min_readings=DEFAULT_MIN_READINGS):
+    """
+    Returns the runs of zero or negative current readings of a month that no
+    recorded interruption of the same code overlaps.
+
+    A run is taken to span from the last reading before it to the first reading
+    after it (the outage started and ended somewhere in between); any interruption
+    overlapping that span explains the run.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        year_month (str): Month in 'YYYY-MM' format.
+        db_table (str): 'soseht', 'sostf' or 'sosht'.
+        min_readings (int): Shortest run reported, in readings.
+
+    Returns:
+        dict: {
+            'runs': number of zero-current runs, 'recorded': runs overlapping an interruption,
+            'gaps': [{'code': ..., 'first_date': ..., 'first_time': ..., 'last_date': ..., 'last_time': ...,
+                      'readings': ..., 'after': 'DD-MM-YYYY HH:MM' (last reading before the run),
+                      'before': ... (first reading after it)}, ...],
+            'codes': [{'code': ..., 'runs': ..., 'gaps': ..., 'zero_readings': ...}, ...]
+        }
+    """
+    db_code_column, fdrtype, get_order = READING_TABLES[db_table]
+    dates = month_dates(year_month)
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {db_code_column} AS code, dateobserved, timeobserved, current
+        FROM {db_table}
+        WHERE dateobserved IN ({','.join(['?'] * len(dates))})
+          AND timeobserved IN ({','.join(['?'] * len(ALLOWED_TIMES))})
+          AND current IS NOT NULL
+    """, (*dates, *ALLOWED_TIMES))
+    rows = cursor.fetchall()
+    conn.close()
+
+    codes = list(dict.fromkeys(row['code'] for row in rows))
+    code_index = {code: i for i, code in enumerate(codes)}
+    date_index = {date_str: i for i, date_str in enumerate(dates)}
+    slots_per_day = len(ALLOWED_TIMES)
+    current = np.full((len(codes), len(dates) * slots_per_day), np.nan)
+    current[[code_index[row['code']] for row in rows],
+            [date_index[row['dateobserved']] * slots_per_day + SLOT_INDEX[row['timeobserved']] for row in rows]] = \
+        [row['current'] for row in rows]
+
+    # Minute (same clock as the interruption events) of every slot of the month, one slot past each end
+    first_day = day_number(dates[0]) - _EPOCH_DAY
+    day_minutes = (first_day + np.arange(-1, len(dates) + 1))[:, None] * 1440 + np.array(SLOT_MINUTES)[None, :]
+    slot_minutes = day_minutes.ravel()[slots_per_day - 1:-(slots_per_day - 1)]
+
+    with np.errstate(invalid='ignore'):
+        zero = current <= 0
+    run_rows, run_first, run_last = _zero_runs(zero)
+    long_enough = run_last - run_first + 1 >= min_readings
+    run_rows, run_first, run_last = run_rows[long_enough], run_first[long_enough], run_last[long_enough]
+    # Span of each run: last slot before it to first slot after it (offset by the padding slot)
+    span_start = slot_minutes[run_first]
+    span_end = slot_minutes[run_last + 2]
+
+    # Anti-join: per code, events sorted by start; a run is covered if an event starting
+    # before the span ends has its end (running maximum) after the span starts
+    lookback = date.fromordinal(day_number(dates[0]) - EVENT_LOOKBACK_DAYS).isoformat()
+    last_date = date.fromordinal(day_number(dates[-1])).isoformat()
+    events = {}
+    for event in get_outage_events(db_path, lookback, last_date, (fdrtype,)):
+        events.setdefault(event['feedercode'], []).append((event['start_minute'], event['end_minute']))
+    covered = np.zeros(len(run_rows), dtype=bool)
+    for i, code in enumerate(codes):
+        if code not in events:
+            continue
+        in_code = run_rows == i
+        starts = np.array([start for start, _ in events[code]])
+        max_end = np.maximum.accumulate(np.array([end for _, end in events[code]]))
+        count = np.searchsorted(starts, span_end[in_code], side='right')
+        covered[in_code] = (count > 0) & (max_end[np.maximum(count - 1, 0)] >= span_start[in_code])
+
+    def date_time(slot):
+        day, index = divmod(int(slot), slots_per_day)
+        return date_from_day_number(day_number(dates[0]) + day), ALLOWED_TIMES[index]
+
+    gaps = []
+    for row, first, last in zip(run_rows[~covered], run_first[~covered], run_last[~covered]):
+        first_date, first_time = date_time(first)
+        last_date_str, last_time = date_time(last)
+        after = date_time(first - 1) if first > 0 else None
+        before = date_time(last + 1) if last + 1 < current.shape[1] else None
+        gaps.append({
+            'code': codes[row],
+            'first_date': first_date, 'first_time': first_time,
+            'last_date': last_date_str, 'last_time': last_time,
+            'readings': int(last - first + 1),
+            'after': ' '.join(after) if after else None,
+            'before': ' '.join(before) if before else None
+        })
+
+    summary = [{
+        'code': code,
+        'runs': int(np.sum(run_rows == i)),
+        'gaps': int(np.sum((run_rows == i) & ~covered)),
+        'zero_readings': int(np.sum(zero[i]))
+    } for i, code in enumerate(codes)]
+    order = get_order(db_path)
+    return {
+        'runs': len(run_rows),
+        'recorded': int(np.sum(covered)),
+        'gaps': sort_by_order(gaps, 'code', order),
+        'codes': sort_by_order([entry for entry in summary if entry['zero_readings']], 'code', order)
+    }
@@ -2,7 +2,13 @@
 Utility functions for analysis tasks.
 """
 from routes.db_service import get_connection
+from utils.slot_calendar import day_number
+from datetime import date
 from functools import lru_cache
+import os
+
+# Days older than this (relative to today) are not rescanned when only other days changed
+SETTLED_DAYS = 7
 
 
 def max_decimal_places(a, b):
@@ -16,7 +22,54 @@ def max_decimal_places(a, b):
         return 0
     return max(count_decimals(a), count_decimals(b))
 
-@lru_cache(maxsize=1)
+class MinMaxTracker:
+    """
+    Streaming min/max of a value together with the tag (e.g. time) at which it occurred.
+    Keeps the first occurrence on ties, like min()/max() over a list.
+    """
+    __slots__ = ('min_value', 'min_tag', 'max_value', 'max_tag')
+
+    def __init__(self):
+        self.min_value = None
+        self.min_tag = None
+        self.max_value = None
+        self.max_tag = None
+
+    def add(self, value, tag):
+        """
+        Updates the min/max with a value; None values are ignored.
+        """
+        if value is None:
+            return
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+            self.min_tag = tag
+        if self.max_value is None or value > self.max_value:
+            self.max_value = value
+            self.max_tag = tag
+
+def get_db_version(db_path):
+    """
+    Returns a token that changes whenever the database is modified.
+    Used as part of cache keys so cached results are dropped after new entries.
+    In WAL mode commits go to the -wal file and leave the database file untouched,
+    so the -wal file is part of the token.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+    Returns:
+        tuple: Modification time and size of the database file and of its -wal file, 0 if unavailable.
+    """
+    version = ()
+    for path in (db_path, db_path + '-wal'):
+        try:
+            stat = os.stat(path)
+            version += (stat.st_mtime, stat.st_size)
+        except OSError:
+            version += (0, 0)
+    return version
+
+@lru_cache(maxsize=16)
 def get_ht_feeder_order(db_path):
     """
     Fetches the HT feeder order from the feeder11kvmaster table.
@@ -33,7 +86,7 @@ def get_ht_feeder_order(db_path):
     conn.close()
     return order_list
 
-@lru_cache(maxsize=1)
+@lru_cache(maxsize=16)
 def get_eht_feeder_order(db_path):
     """
     Fetches the EHT feeder order from the feederehtmaster table.
@@ -50,7 +103,7 @@ def get_eht_feeder_order(db_path):
     conn.close()
     return order_list
 
-@lru_cache(maxsize=1)
+@lru_cache(maxsize=16)
 def get_tf_order(db_path):
     """
     Fetches the TF order from the tfmaster table.
@@ -67,6 +120,13 @@ def get_tf_order(db_path):
     conn.close()
     return order_list
 
+# Master order of the codes of each reading table
+CODE_ORDERS = {
+    'soseht': get_eht_feeder_order,
+    'sostf': get_tf_order,
+    'sosht': get_ht_feeder_order,
+}
+
 def sort_by_order(data_list, code_key, order_list):
     """
     Sorts a list of dictionaries based on a predefined order list.
@@ -79,4 +139,48 @@ def sort_by_order(data_list, code_key, order_list):
     Returns:
         list: Sorted list of dictionaries.
     """
-    return sorted(data_list, key=lambda x: order_list.index(x[code_key]) if x[code_key] in order_list else len('inf'))
\ No newline at end of file
+    return sorted(data_list, key=lambda x: order_list.index(x[code_key]) if x[code_key] in order_list else len('inf'))
+
+def get_row_counts(db_path, dates, db_table, db_code_column=None, codes=None):
+    """
+    Counts the readings of each date in one query.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        dates (list of str): Dates in 'DD-MM-YYYY' format.
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for code, when counting only some codes.
+        codes (list or None): Codes counted; all codes if None.
+    Returns:
+        dict: {date: number of readings}, dates without readings left out.
+    """
+    code_filter = f"AND {db_code_column} IN ({','.join(['?'] * len(codes))})" if codes else ""
+    conn = get_connection(db_path)
+    row_counts = {row[0]: row[1] for row in conn.execute(f"""
+        SELECT dateobserved, COUNT(*) FROM {db_table}
+        WHERE dateobserved IN ({','.join(['?'] * len(dates))}) {code_filter}
+        GROUP BY dateobserved
+    """, (*dates, *(codes or ())))}
+    conn.close()
+    return row_counts
+
+def stale_days(dates, stored, row_counts, db_version):
+    """
+    Returns the dates whose per-day results in a sidecar store must be rescanned:
+    days not stored, days whose number of readings changed, and recent days
+    (SETTLED_DAYS) stored under another database version.
+
+    Args:
+        dates (list of str): Dates in 'DD-MM-YYYY' format.
+        stored (dict): {date: row with 'row_count' and 'db_version'} of the store.
+        row_counts (dict): {date: number of readings}, as get_row_counts.
+        db_version (str): Current database version.
+    Returns:
+        list: Stale dates, in the order of dates.
+    """
+    settled_before = date.today().toordinal() - SETTLED_DAYS
+    return [
+        d for d in dates
+        if d not in stored or stored[d]['row_count'] != row_counts.get(d, 0)
+        or (stored[d]['db_version'] != db_version and day_number(d) >= settled_before)
+    ]
\ No newline at end of file
@@ -0,0 +1,254 @@
+"""
+Module to calculate voltage quality-of-supply statistics per feeder/transformer.
+
+Readings are compared with a statutory band around the nominal voltage of each
+table. Statistics are built from per-day, per-code partial results (counts,
+hours, sums, min/max and a voltage histogram) which are merged for any range,
+so a year is the sum of its days. Partial results are kept in a sidecar database;
+a day is rescanned only when its number of readings changes, or while it is
+recent and the database has changed since it was scanned (analysis.utils.stale_days).
+"""
+
+import threading
+
+import numpy as np
+from analysis.utils import get_db_version, get_eht_feeder_order, get_ht_feeder_order, get_row_counts, get_tf_order, sort_by_order, stale_days
+from routes.db_service import get_connection, get_sidecar_connection
+from utils.slot_calendar import ALLOWED_TIMES, HOUR_INDEX, SLOT_INDEX
+
+SIDECAR_NAME = "voltage"
+
+# Nominal voltage (kV) and statutory band (% below, % above) of each table
+VOLTAGE_BANDS = {
+    'soseht': (110.0, -12.5, 10.0),
+    'sostf': (11.0, -6.0, 6.0),
+    'sosht': (11.0, -6.0, 6.0),
+}
+# Percentiles reported, from the merged histograms
+PERCENTILES = (5, 50, 95)
+# Histogram of voltage as % of nominal: HISTOGRAM_BINS bins of HISTOGRAM_STEP from HISTOGRAM_START
+# (readings outside the range fall in the first/last bin)
+HISTOGRAM_START = 70.0
+HISTOGRAM_STEP = 0.5
+HISTOGRAM_BINS = 120
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS voltage_days (
+        db_table TEXT, date TEXT, row_count INTEGER, db_version TEXT,
+        PRIMARY KEY (db_table, date)
+    );
+    CREATE TABLE IF NOT EXISTS voltage_day_stats (
+        db_table TEXT, date TEXT, code TEXT,
+        readings INTEGER, hours INTEGER, low_count INTEGER, high_count INTEGER,
+        low_hours INTEGER, high_hours INTEGER, voltage_sum REAL,
+        min_voltage REAL, min_time TEXT, max_voltage REAL, max_time TEXT,
+        histogram BLOB
+    );
+    CREATE INDEX IF NOT EXISTS idx_voltage_day_stats ON voltage_day_stats (db_table, date);
+"""
+
+# Summed per-day fields
+_COUNT_FIELDS = ('readings', 'hours', 'low_count', 'high_count', 'low_hours', 'high_hours', 'voltage_sum')
+
+_scan_lock = threading.Lock()
+
+
+def _scan_days(db_path, dates, db_table, db_code_column):
+    """
+    Scans the voltage readings of the given dates in one query and returns the
+    partial results: [(date, code, {field: value, ..., 'histogram': array})].
+    """
+    nominal, low_percent, high_percent = VOLTAGE_BANDS[db_table]
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {db_code_column}, dateobserved, timeobserved, voltage
+        FROM {db_table}
+        WHERE dateobserved IN ({','.join(['?'] * len(dates))})
+          AND timeobserved IN ({','.join(['?'] * len(ALLOWED_TIMES))})
+          AND voltage > 0
+    """, (*dates, *ALLOWED_TIMES))
+    rows = cursor.fetchall()
+    conn.close()
+    if not rows:
+        return []
+
+    codes = list(dict.fromkeys(row[0] for row in rows))
+    code_index = {code: i for i, code in enumerate(codes)}
+    date_index = {d: i for i, d in enumerate(dates)}
+    group = np.array([date_index[row[1]] * len(codes) + code_index[row[0]] for row in rows])
+    slot = np.array([SLOT_INDEX[row[2]] for row in rows])
+    hourly = np.array([row[2] in HOUR_INDEX for row in rows])
+    voltage = np.array([row[3] for row in rows], dtype=float)
+
+    groups = len(dates) * len(codes)
+    percent = voltage / nominal * 100
+    low = percent < 100 + low_percent
+    high = percent > 100 + high_percent
+    counts = {
+        'readings': np.bincount(group, minlength=groups),
+        'hours': np.bincount(group, weights=hourly, minlength=groups),
+        'low_count': np.bincount(group, weights=low, minlength=groups),
+        'high_count': np.bincount(group, weights=high, minlength=groups),
+        'low_hours': np.bincount(group, weights=low & hourly, minlength=groups),
+        'high_hours': np.bincount(group, weights=high & hourly, minlength=groups),
+        'voltage_sum': np.bincount(group, weights=voltage, minlength=groups),
+    }
+    bins = np.clip(((percent - HISTOGRAM_START) // HISTOGRAM_STEP).astype(int), 0, HISTOGRAM_BINS - 1)
+    histogram = np.zeros((groups, HISTOGRAM_BINS), dtype=np.int32)
+    np.add.at(histogram, (group, bins), 1)
+
+    # First row of each group after sorting by group, voltage (ascending/descending), then time
+    min_order = np.lexsort((slot, voltage, group))
+    max_order = np.lexsort((slot, -voltage, group))
+    min_groups, min_first = np.unique(group[min_order], return_index=True)
+    max_first = np.unique(group[max_order], return_index=True)[1]
+
+    result = []
+    for g, min_row, max_row in zip(min_groups, min_order[min_first], max_order[max_first]):
+        day, code = divmod(int(g), len(codes))
+        stats = {field: float(values[g]) if field == 'voltage_sum' else int(values[g]) for field, values in counts.items()}
+        stats.update({
+            'min_voltage': float(voltage[min_row]), 'min_time': ALLOWED_TIMES[slot[min_row]],
+            'max_voltage': float(voltage[max_row]), 'max_time': ALLOWED_TIMES[slot[max_row]],
+            'histogram': histogram[g]
+        })
+        result.append((dates[day], codes[code], stats))
+    return result
+
+
+def _day_stats(db_path, dates, db_table, db_code_column):
+    """
+    Returns the per-day partial results of the dates, from the sidecar store where
+    still valid and from one scan of the readings for the rest.
+
+    Returns:
+        list of tuple: (date, code, stats dict)
+    """
+    db_version = str(get_db_version(db_path))
+    # Readings per date (answered from a (dateobserved, ...) index where the query audit created one)
+    row_counts = get_row_counts(db_path, dates, db_table)
+
+    with _scan_lock:
+        store = get_sidecar_connection(db_path, SIDECAR_NAME)
+        try:
+            store.executescript(_SCHEMA)
+            stored = {row['date']: row for row in store.execute(
+                f"SELECT date, row_count, db_version FROM voltage_days WHERE db_table = ? AND date IN ({','.join(['?'] * len(dates))})",
+                (db_table, *dates))}
+            stale = stale_days(dates, stored, row_counts, db_version)
+
+            if stale:
+                scanned = _scan_days(db_path, stale, db_table, db_code_column)
+                placeholders = ','.join(['?'] * len(stale))
+                store.execute(f"DELETE FROM voltage_day_stats WHERE db_table = ? AND date IN ({placeholders})", (db_table, *stale))
+                store.executemany("INSERT OR REPLACE INTO voltage_days (db_table, date, row_count, db_version) VALUES (?, ?, ?, ?)",
+                                  [(db_table, d, row_counts.get(d, 0), db_version) for d in stale])
+                store.executemany(f"""
+                    INSERT INTO voltage_day_stats (db_table, date, code, {', '.join(_COUNT_FIELDS)},
+                                                   min_voltage, min_time, max_voltage, max_time, histogram)
+                    VALUES ({','.join(['?'] * (len(_COUNT_FIELDS) + 8))})
+                """, [(db_table, d, code, *(stats[field] for field in _COUNT_FIELDS), stats['min_voltage'], stats['min_time'],
+                       stats['max_voltage'], stats['max_time'], stats['histogram'].tobytes()) for d, code, stats in scanned])
+                store.commit()
+
+            rows = store.execute(
+                f"SELECT * FROM voltage_day_stats WHERE db_table = ? AND date IN ({','.join(['?'] * len(dates))})",
+                (db_table, *dates)).fetchall()
+        finally:
+            store.close()
+
+    return [(row['date'], row['code'], dict(row, histogram=np.frombuffer(row['histogram'], dtype=np.int32))) for row in rows]
+
+
+def _percentile(histogram, q, nominal):
+    """
+    Returns the q-th percentile (kV) of a histogram, interpolated within its bin.
+    """
+    total = histogram.sum()
+    if not total:
+        return None
+    target = total * q / 100
+    cumulative = np.cumsum(histogram)
+    index = int(np.searchsorted(cumulative, target))
+    before = cumulative[index - 1] if index else 0
+    fraction = (target - before) / histogram[index] if histogram[index] else 0
+    return round(float((HISTOGRAM_START + (index + fraction) * HISTOGRAM_STEP) * nominal / 100), 2)
+
+
+def get_voltage_stats(db_path, query_dates, db_table="sosht", db_code_column="feedercode"):
+    """
+    Returns voltage quality-of-supply statistics of every code over a range of dates.
+
+    Hours are counted from the hourly readings (each stands for one hour); counts
+    include the half-hourly readings. Readings with a zero or negative voltage are
+    treated as missing. Percentiles are accurate to HISTOGRAM_STEP % of nominal.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        query_dates (list of str): Dates in 'DD-MM-YYYY' format.
+        db_table (str): Table name to query ('sosht', 'soseht', 'sostf').
+        db_code_column (str): Column name for code ('feedercode', 'tfcode').
+
+    Returns:
+        dict: {
+            'nominal': kV, 'band_low': kV, 'band_high': kV,
+            'codes': [{
+                'code': ..., 'readings': ..., 'hours': ...,
+                'low_count': ..., 'high_count': ..., 'low_hours': ..., 'high_hours': ...,
+                'outside_percent': % of hours outside the band, 'mean': ...,
+                'min': ..., 'min_date': ..., 'min_time': ..., 'max': ..., 'max_date': ..., 'max_time': ...,
+                'worst_excursion': % deviation from nominal of the reading furthest from it,
+                'worst_date': ..., 'worst_time': ...,
+                'p5': ..., 'p50': ..., 'p95': ...   # one key per PERCENTILES entry
+            }, ...]
+        }
+    """
+    nominal, low_percent, high_percent = VOLTAGE_BANDS[db_table]
+    merged = {}
+    date_order = {d: i for i, d in enumerate(query_dates)}
+    # Merge in date order so min/max ties keep the earliest reading
+    for d, code, stats in sorted(_day_stats(db_path, query_dates, db_table, db_code_column), key=lambda s: date_order[s[0]]):
+        entry = merged.get(code)
+        if entry is None:
+            merged[code] = entry = {field: 0 for field in _COUNT_FIELDS}
+            entry.update({'code': code, 'min': None, 'max': None, 'histogram': np.zeros(HISTOGRAM_BINS, dtype=np.int64)})
+        for field in _COUNT_FIELDS:
+            entry[field] += stats[field]
+        entry['histogram'] += stats['histogram']
+        if entry['min'] is None or stats['min_voltage'] < entry['min']:
+            entry.update({'min': stats['min_voltage'], 'min_date': d, 'min_time': stats['min_time']})
+        if entry['max'] is None or stats['max_voltage'] > entry['max']:
+            entry.update({'max': stats['max_voltage'], 'max_date': d, 'max_time': stats['max_time']})
+
+    result = []
+    for entry in merged.values():
+        histogram = entry.pop('histogram')
+        voltage_sum = entry.pop('voltage_sum')
+        entry['mean'] = round(voltage_sum / entry['readings'], 2) if entry['readings'] else None
+        entry['outside_percent'] = (round((entry['low_hours'] + entry['high_hours']) / entry['hours'] * 100, 2)
+                                    if entry['hours'] else None)
+        low_deviation = (entry['min'] / nominal - 1) * 100
+        high_deviation = (entry['max'] / nominal - 1) * 100
+        worst = 'min' if -low_deviation > high_deviation else 'max'
+        entry['worst_excursion'] = round(low_deviation if worst == 'min' else high_deviation, 2)
+        entry['worst_date'] = entry[f'{worst}_date']
+        entry['worst_time'] = entry[f'{worst}_time']
+        for q in PERCENTILES:
+            entry[f'p{q}'] = _percentile(histogram, q, nominal)
+        result.append(entry)
+
+    code_order = []
+    if db_table == "sosht":
+        code_order = get_ht_feeder_order(db_path)
+    elif db_table == "soseht":
+        code_order = get_eht_feeder_order(db_path)
+    elif db_table == "sostf":
+        code_order = get_tf_order(db_path)
+
+    return {
+        'nominal': nominal,
+        'band_low': round(nominal * (100 + low_percent) / 100, 2),
+        'band_high': round(nominal * (100 + high_percent) / 100, 2),
+        'codes': sort_by_order(result, 'code', code_order)
+    }
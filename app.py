@@ -3,13 +3,26 @@ Main entry point for the Substation Operating Review Flask application.
 
 This file creates the Flask app instance, loads configuration,
 registers blueprints, and runs the development server.
+
+Run with --startup-benchmark to measure time-to-first-response and exit.
 """
 
+import time
+
+# Taken before any heavy import so the startup benchmark covers them
+_START_TIME = time.perf_counter()
+
 from flask import Flask
 from routes.sos_routes import sos_bp
-from routes.app_utils import get_config_database
+from routes.compression import init_compression
+from routes.substations import load_substations
+import argparse
+import multiprocessing
 import os
 import secrets
+import sys
+
+_IMPORTS_DONE_TIME = time.perf_counter()
 
 # Create Flask application instance
 app = Flask(__name__)
@@ -17,13 +30,64 @@ app = Flask(__name__)
 # Add secret key for session management
 app.secret_key = secrets.token_hex(32)
 
-db_path = get_config_database()
-
-app.config['DATABASE'] = db_path
+# Named substations (databases, station load definitions, caches) from sos_config.ini
+app.config['SUBSTATIONS'] = load_substations()
 
 # Register the SOS blueprint containing all routes
 app.register_blueprint(sos_bp)
 
+# Compressed responses and content-hashed static URLs
+init_compression(app)
+
+_APP_READY_TIME = time.perf_counter()
+
+
+def run_startup_benchmark(urls=("/", "/hourly-review")):
+    """
+    Starts the server on a free local port, requests each URL once and
+    prints the elapsed time of each startup phase.
+
+    Args:
+        urls (tuple of str): Paths to request, in order.
+    """
+    import threading
+    import urllib.request
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    listening_time = time.perf_counter()
+
+    print(f"Imports:           {(_IMPORTS_DONE_TIME - _START_TIME) * 1000:8.1f} ms")
+    print(f"App setup:         {(_APP_READY_TIME - _IMPORTS_DONE_TIME) * 1000:8.1f} ms")
+    print(f"Server listening:  {(listening_time - _START_TIME) * 1000:8.1f} ms")
+
+    for url in urls:
+        request_start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}{url}") as response:
+                status = response.status
+                response.read()
+        except Exception as exc:
+            status = exc
+        done = time.perf_counter()
+        print(f"GET {url:<14} {(done - request_start) * 1000:8.1f} ms "
+              f"(time-to-response {(done - _START_TIME) * 1000:.1f} ms, status {status})")
+
+    server.shutdown()
+
+
 # Run the Flask development server if this file is executed directly
 if __name__ == "__main__":
-    app.run(debug=True)
+    # Report jobs run in worker processes; needed by the packaged executable
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="Substation Operating Review")
+    parser.add_argument("--startup-benchmark", action="store_true",
+                        help="measure time-to-first-response and exit")
+    args = parser.parse_args()
+
+    if args.startup_benchmark:
+        run_startup_benchmark()
+    else:
+        # The reloader starts a second process; skip it in the packaged executable
+        app.run(debug=True, use_reloader=not getattr(sys, "frozen", False))
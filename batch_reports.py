@@ -0,0 +1,318 @@
+"""
+Command-line batch report generator for the Substation Operating Review application.
+
+Runs the analysis functions directly (no web server) for every date/month in a range
+and writes one print-ready HTML page (print to PDF from any browser) and CSV files per
+report. Jobs run in a process pool; each worker keeps its connection pool, master-order
+caches and meter validation flags across all jobs it runs.
+
+Usage:
+    python batch_reports.py --start 2025-01-01 --end 2025-12-31 --output reports
+    python batch_reports.py --start 2025-06-01 --end 2025-06-30 --reports daily-summary mor-energy --formats csv
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import argparse
+import csv
+import math
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from routes.app_utils import get_config_substations
+
+# Report name: (period kind, builder name). Builders return [(table title, rows), ...]
+REPORTS = {
+    'daily-summary': ('date', '_daily_summary'),
+    'daily-load': ('date', '_daily_load'),
+    'daily-energy': ('date', '_daily_energy'),
+    'mor-energy': ('month', '_mor_energy'),
+    'mor-energy-balance': ('month', '_mor_energy_balance'),
+    'mor-eht-tf-interruptions': ('month', '_mor_eht_tf_interruptions'),
+    'mor-ht-interruptions': ('month', '_mor_ht_interruptions'),
+    'abc-details': ('month', '_abc_details'),
+}
+FORMATS = ('html', 'csv')
+
+# Tables of the three reading tables, in page order
+READING_TABLES = (
+    ('110 kV Feeders', 'soseht', 'feedercode'),
+    ('Transformers', 'sostf', 'tfcode'),
+    ('11 kV Feeders', 'sosht', 'feedercode'),
+)
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+
+def _daily_summary(substation, period):
+    from analysis.daily_review import get_incomers_peak_min, get_station_peak_min
+
+    query_date = _query_date(period)
+    return [
+        ('Station Load on 110 kV', [get_station_peak_min(substation['db_path'], query_date, substation['station_feeder_in'],
+                                                         substation['station_feeder_out'], substation['station_load'])]),
+        ('11 kV Incomers Load', [get_incomers_peak_min(substation['db_path'], query_date, substation['incomers'],
+                                                       substation['incomers_load'])]),
+    ]
+
+
+def _daily_load(substation, period):
+    from analysis.daily_review import get_daily_current_stat
+
+    query_date = _query_date(period)
+    return [(title, get_daily_current_stat(substation['db_path'], query_date, db_table, db_code_column))
+            for title, db_table, db_code_column in READING_TABLES]
+
+
+def _daily_energy(substation, period):
+    from analysis.daily_review import get_daily_em_diff_stat
+
+    query_date = _query_date(period)
+    return [(title, get_daily_em_diff_stat(substation['db_path'], query_date, db_table, db_code_column))
+            for title, db_table, db_code_column in READING_TABLES]
+
+
+def _mor_energy(substation, period):
+    from analysis.monthly_review import get_monthly_energy
+
+    return [(title, get_monthly_energy(substation['db_path'], period, db_table, db_code_column))
+            for title, db_table, db_code_column in READING_TABLES]
+
+
+def _mor_energy_balance(substation, period):
+    from analysis.energy_balance import DEFAULT_LOSS_THRESHOLD, get_energy_balance
+
+    balance = get_energy_balance(substation['db_path'], period, DEFAULT_LOSS_THRESHOLD, substation['incomers'])
+    return [
+        ('Monthly Balance', [balance['monthly']] if balance['monthly'] else []),
+        ('Daily Balance', balance['daily']),
+        ('Hourly Balance', balance['hourly']),
+    ]
+
+
+def _mor_eht_tf_interruptions(substation, period):
+    from analysis.monthly_review import get_eht_tf_monthly_interruptions, get_eht_tf_monthly_interruptions_summary
+
+    tables = []
+    for title, fdrtype in (('110 kV Feeders', 'EHT'), ('Transformers', 'T/F')):
+        interruptions = get_eht_tf_monthly_interruptions(substation['db_path'], period, fdrtype)
+        tables.append((f'{title} Interruptions', interruptions))
+        tables.append((f'{title} Summary', get_eht_tf_monthly_interruptions_summary(interruptions, period)))
+    return tables
+
+
+def _mor_ht_interruptions(substation, period):
+    from analysis.monthly_review import get_ht_monthly_interruptions_summary
+
+    return [('11 kV Feeder Interruptions', get_ht_monthly_interruptions_summary(substation['db_path'], period))]
+
+
+def _abc_details(substation, period):
+    from analysis.abc_details import get_abc_details
+
+    return [('Town ABC Feeder Details', [get_abc_details(substation['db_path'], period)])]
+
+
+def _query_date(period):
+    # 'YYYY-MM-DD' -> 'DD-MM-YYYY' as stored in the database
+    return f"{period[8:10]}-{period[5:7]}-{period[0:4]}"
+
+
+def _cell(value):
+    """
+    Formats one value for HTML/CSV output; lists of dicts (e.g. flagged readings) are joined.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return '; '.join(' '.join(str(v) for v in item.values()) if isinstance(item, dict) else str(item) for item in value)
+    return value
+
+
+def _columns(rows):
+    columns = []
+    for row in rows:
+        for column in row:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def _slug(text):
+    return re.sub(r'[^A-Za-z0-9]+', '-', text).strip('-').lower()
+
+
+def build_report(substation, report, period):
+    """
+    Runs the analysis behind one report and formats its tables for output.
+
+    Args:
+        substation (dict): Substation definition as returned by get_config_substations().
+        report (str): Report name (key of REPORTS).
+        period (str): 'YYYY-MM-DD' for daily reports, 'YYYY-MM' for monthly reports.
+
+    Returns:
+        list of tuple: (table title, columns, rows of formatted cells)
+    """
+    tables = []
+    for title, rows in globals()[REPORTS[report][1]](substation, period):
+        columns = _columns(rows)
+        tables.append((title, columns, [[_cell(row.get(column)) for column in columns] for row in rows]))
+    return tables
+
+
+# Per-process state set up by _init_worker and reused by every job of the worker
+_worker = {}
+
+
+def _init_worker(substations, output_dir, formats):
+    """
+    Prepares a worker process: substation definitions, output settings, the HTML
+    template and the master-order caches of every database (loaded once per worker).
+    """
+    from analysis.utils import get_eht_feeder_order, get_ht_feeder_order, get_tf_order
+
+    _worker['substations'] = {substation['name']: substation for substation in substations}
+    _worker['output_dir'] = output_dir
+    _worker['formats'] = formats
+    if 'html' in formats:
+        env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=select_autoescape(['html']))
+        _worker['template'] = env.get_template('batch_report.html')
+    for substation in substations:
+        for get_order in (get_ht_feeder_order, get_eht_feeder_order, get_tf_order):
+            try:
+                get_order(substation['db_path'])
+            except Exception:
+                # Reported per job when the database is unusable
+                pass
+
+
+def run_job(job):
+    """
+    Builds one report for one substation and period and writes its files.
+
+    Args:
+        job (tuple): (substation name, report name, period 'YYYY-MM-DD' or 'YYYY-MM').
+
+    Returns:
+        tuple: (job, list of written paths, error message or None, seconds taken)
+    """
+    substation_name, report, period = job
+    started = time.perf_counter()
+    substation = _worker['substations'][substation_name]
+    try:
+        tables = build_report(substation, report, period)
+    except Exception as exc:
+        return job, [], f"{type(exc).__name__}: {exc}", time.perf_counter() - started
+
+    report_dir = os.path.join(_worker['output_dir'], _slug(substation_name), period)
+    os.makedirs(report_dir, exist_ok=True)
+    written = []
+    if 'csv' in _worker['formats']:
+        for title, columns, rows in tables:
+            path = os.path.join(report_dir, f"{report}_{_slug(title)}.csv")
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(rows)
+            written.append(path)
+    if 'html' in _worker['formats']:
+        path = os.path.join(report_dir, f"{report}.html")
+        html = _worker['template'].render(
+            substation=substation_name,
+            report=report,
+            period=period,
+            generated=datetime.now().strftime("%d-%m-%Y %H:%M"),
+            tables=tables
+        )
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        written.append(path)
+    return job, written, None, time.perf_counter() - started
+
+
+def build_jobs(substation_names, reports, start, end):
+    """
+    Expands a date range into jobs: every date for daily reports and every month
+    touching the range for monthly reports. Jobs of one substation and report are
+    consecutive so a worker's caches serve neighbouring periods.
+
+    Args:
+        substation_names (list of str): Substations to report on.
+        reports (list of str): Report names (keys of REPORTS).
+        start (datetime): First date.
+        end (datetime): Last date (inclusive).
+
+    Returns:
+        list of tuple: (substation name, report, period)
+    """
+    dates = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((end - start).days + 1)]
+    months = sorted(set(d[:7] for d in dates))
+    jobs = []
+    for name in substation_names:
+        for report in reports:
+            periods = dates if REPORTS[report][0] == 'date' else months
+            jobs.extend((name, report, period) for period in periods)
+    return jobs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate operating review reports without the web server.")
+    parser.add_argument("--start", required=True, help="First date, YYYY-MM-DD")
+    parser.add_argument("--end", help="Last date, YYYY-MM-DD (default: same as --start)")
+    parser.add_argument("--reports", nargs="+", choices=list(REPORTS), default=list(REPORTS), help="Reports to generate (default: all)")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS), help="Output formats (default: html csv)")
+    parser.add_argument("--substation", action="append", help="Substation name from sos_config.ini (repeatable; default: all)")
+    parser.add_argument("--db", help="Database path, overriding the configured database of a single substation")
+    parser.add_argument("--output", default="reports", help="Output directory (default: reports)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    try:
+        start = datetime.strptime(args.start, "%Y-%m-%d")
+        end = datetime.strptime(args.end, "%Y-%m-%d") if args.end else start
+    except ValueError:
+        parser.error("dates must be in YYYY-MM-DD format")
+    if end < start:
+        parser.error("--end is before --start")
+
+    substations = get_config_substations()
+    if args.substation:
+        unknown = set(args.substation) - set(s['name'] for s in substations)
+        if unknown:
+            parser.error(f"unknown substation(s): {', '.join(sorted(unknown))}")
+        substations = [s for s in substations if s['name'] in args.substation]
+    if args.db:
+        if len(substations) != 1:
+            parser.error("--db needs exactly one substation (use --substation)")
+        substations[0]['db_path'] = args.db
+
+    jobs = build_jobs([s['name'] for s in substations], args.reports, start, end)
+    workers = max(1, min(args.workers, len(jobs)))
+    # A few chunks per worker: consecutive periods stay together, stragglers still balance
+    chunksize = max(1, math.ceil(len(jobs) / (workers * 4)))
+
+    started = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(substations, os.path.abspath(args.output), tuple(args.formats))) as executor:
+        for (name, report, period), written, error, seconds in executor.map(run_job, jobs, chunksize=chunksize):
+            if error:
+                failed += 1
+                print(f"FAILED {name} {report} {period}: {error}", file=sys.stderr)
+            else:
+                print(f"{name} {report} {period}: {len(written)} file(s) in {seconds * 1000:.0f} ms")
+
+    print(f"{len(jobs) - failed}/{len(jobs)} reports written to {os.path.abspath(args.output)} "
+          f"in {time.perf_counter() - started:.1f} s using {workers} worker(s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1 +1,9 @@
-pyinstaller --onefile --name OperatingReview --icon "logo.ico" --add-data "templates;templates" --add-data "static;static" app.py
\ No newline at end of file
+@echo off
+REM Usage: package.bat [onedir or onefile]
+REM onedir (default) starts fastest: nothing is unpacked to a temp folder on each launch.
+REM onefile builds a single OperatingReview.exe that unpacks itself on every start.
+set MODE=%1
+if "%MODE%"=="" set MODE=onedir
+REM Precompress static assets (.gz, and .br if brotli is installed) so they are not compressed at runtime
+python -m routes.compression
+pyinstaller --%MODE% --noconfirm --name OperatingReview --icon "logo.ico" --add-data "templates;templates" --add-data "static;static" --exclude-module pandas --exclude-module matplotlib --exclude-module scipy --exclude-module tkinter --exclude-module IPython --exclude-module pytest app.py
\ No newline at end of file
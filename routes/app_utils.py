@@ -28,21 +28,22 @@ def is_valid_sqlite_db(db_path):
     except Exception:
         return False
 
-def update_config_database(db_path):
+def update_config_database(db_path, section='SOSOFFLINE'):
     """
     Updates (or creates) the sos_config.ini file in the user's home directory with the given db_path.
-    Ensures the [SOSOFFLINE] section exists and sets the DATABASE value.
+    Ensures the section ([SOSOFFLINE] by default, or a [SUBSTATION <name>] section) exists
+    and sets the DATABASE value.
     """
     config_path = get_config_path()
     config = configparser.ConfigParser()
-    # If sos_config.ini does not exist, create it with default section
+    # If sos_config.ini does not exist, create it with the section
     if not os.path.exists(config_path):
-        config['SOSOFFLINE'] = {'DATABASE': db_path}
+        config[section] = {'DATABASE': db_path}
     else:
         config.read(config_path)
-        if 'SOSOFFLINE' not in config:
-            config['SOSOFFLINE'] = {}
-        config['SOSOFFLINE']['DATABASE'] = db_path
+        if section not in config:
+            config[section] = {}
+        config[section]['DATABASE'] = db_path
     with open(config_path, 'w') as configfile:
         config.write(configfile)
 
@@ -56,4 +57,51 @@ def get_config_database():
     if os.path.exists(config_path):
         config.read(config_path)
         return config.get('SOSOFFLINE', 'DATABASE', fallback="")
-    return None
\ No newline at end of file
+    return None
+
+# Station load definitions used when a substation section does not override them
+DEFAULT_STATION_FEEDER_IN = "1PLPM"
+DEFAULT_STATION_FEEDER_OUT = "1PMKJ"
+DEFAULT_INCOMERS = "INCOMER I, INCOMER II"
+
+# Extra substations are configured in sections named "SUBSTATION <name>"
+SUBSTATION_SECTION_PREFIX = "SUBSTATION "
+
+def get_config_substations():
+    """
+    Reads all substations from the sos_config.ini file in the user's home directory.
+
+    The [SOSOFFLINE] section is the default substation; each [SUBSTATION <name>]
+    section adds one more. Every section has a DATABASE path and may override
+    STATION_FEEDER_IN, STATION_FEEDER_OUT (station load = in - out),
+    INCOMERS (comma separated 11 kV incomer codes) and the load formulas
+    STATION_LOAD and INCOMERS_LOAD (see analysis.station_load).
+
+    Returns:
+        list of dict: [{'name': ..., 'db_path': ..., 'station_feeder_in': ...,
+                        'station_feeder_out': ..., 'incomers': (...),
+                        'station_load': formula or None, 'incomers_load': formula or None}, ...]
+    """
+    config_path = get_config_path()
+    config = configparser.ConfigParser()
+    if os.path.exists(config_path):
+        config.read(config_path)
+
+    def substation(name, section):
+        return {
+            'name': name,
+            'db_path': section.get('DATABASE', fallback=""),
+            'station_feeder_in': section.get('STATION_FEEDER_IN', fallback=DEFAULT_STATION_FEEDER_IN),
+            'station_feeder_out': section.get('STATION_FEEDER_OUT', fallback=DEFAULT_STATION_FEEDER_OUT),
+            'incomers': tuple(code.strip() for code in section.get('INCOMERS', fallback=DEFAULT_INCOMERS).split(',') if code.strip()),
+            'station_load': section.get('STATION_LOAD', fallback=None),
+            'incomers_load': section.get('INCOMERS_LOAD', fallback=None)
+        }
+
+    substations = []
+    default_section = config['SOSOFFLINE'] if 'SOSOFFLINE' in config else config[config.default_section]
+    substations.append(substation(default_section.get('NAME', fallback="Default"), default_section))
+    for section_name in config.sections():
+        if section_name.startswith(SUBSTATION_SECTION_PREFIX):
+            substations.append(substation(section_name[len(SUBSTATION_SECTION_PREFIX):].strip(), config[section_name]))
+    return substations
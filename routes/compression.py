@@ -0,0 +1,168 @@
+"""
+Response compression and static asset fingerprinting for the Substation Operating Review Flask application.
+
+- HTML/JSON/CSV responses above COMPRESS_MIN_SIZE are compressed with brotli
+  (if the optional `brotli` package is installed) or gzip, as the browser accepts.
+- url_for('static', ...) adds a content hash (?v=...) to static URLs; hashed
+  requests are served with a one-year immutable Cache-Control header.
+- Precompressed static files (styles.css.gz, styles.css.br) built at package time
+  are served instead of the originals when present:
+
+    python -m routes.compression
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import sys
+
+from flask import request, send_file
+from werkzeug.utils import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_SIZE = 1024
+COMPRESSIBLE_MIMETYPES = {'text/html', 'application/json', 'text/csv', 'text/css', 'text/javascript', 'application/javascript'}
+# Compression levels: fast for responses, maximum for files compressed once at package time
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+STATIC_EXTENSIONS = ('.css', '.js', '.html', '.svg', '.json')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# {path: (mtime, hash)}
+_static_hashes = {}
+
+
+def _accepted_encoding():
+    """
+    Returns 'br', 'gzip' or None, the best encoding both sides support.
+    """
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, level=None):
+    """
+    Compresses bytes with 'br' or 'gzip' (level defaults to the response level).
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY if level is None else level)
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=GZIP_LEVEL if level is None else level, mtime=0)
+
+
+def static_hash(static_folder, filename):
+    """
+    Returns a short content hash of a static file, recomputed only when the file changes.
+    """
+    path = safe_join(static_folder, filename)
+    if path is None:
+        return None
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _static_hashes.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:12]
+    _static_hashes[path] = (mtime, digest)
+    return digest
+
+
+def init_compression(app):
+    """
+    Registers the fingerprinting, precompressed static and response compression hooks on the app.
+    """
+
+    @app.url_defaults
+    def add_static_hash(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            digest = static_hash(app.static_folder, values['filename'])
+            if digest:
+                values['v'] = digest
+
+    @app.before_request
+    def serve_precompressed_static():
+        if request.endpoint != 'static':
+            return None
+        encoding = _accepted_encoding()
+        filename = request.view_args.get('filename', '')
+        if encoding is None or not filename.endswith(STATIC_EXTENSIONS):
+            return None
+        path = safe_join(app.static_folder, filename + ('.br' if encoding == 'br' else '.gz'))
+        original = safe_join(app.static_folder, filename)
+        # Only use a variant built from the current file; without the original the static view answers 404
+        if (path is None or not os.path.isfile(path) or not os.path.isfile(original)
+                or os.path.getmtime(path) < os.path.getmtime(original)):
+            return None
+        response = send_file(path, mimetype=mimetypes.guess_type(filename)[0], conditional=True)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    @app.after_request
+    def compress_response(response):
+        if request.endpoint == 'static':
+            if request.args.get('v'):
+                response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+            return response
+
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        encoding = _accepted_encoding()
+        if encoding is None:
+            return response
+
+        response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+def precompress_static(static_folder):
+    """
+    Writes .gz (and .br, if brotli is installed) next to every text asset in static_folder,
+    at maximum compression.
+
+    Returns:
+        list of str: Paths written.
+    """
+    written = []
+    encodings = [('gzip', '.gz', 9)] + ([('br', '.br', 11)] if brotli is not None else [])
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if not name.endswith(STATIC_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            for encoding, extension, level in encodings:
+                with open(path + extension, 'wb') as f:
+                    f.write(compress(data, encoding, level))
+                written.append(path + extension)
+    return written
+
+
+if __name__ == "__main__":
+    static_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+    paths = precompress_static(static_dir)
+    for path in paths:
+        print(path)
+    if brotli is None:
+        print("brotli is not installed; only .gz files were written", file=sys.stderr)
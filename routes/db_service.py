@@ -2,13 +2,145 @@
 Database service utilities for the Substation Operating Review Flask application.
 
 Provides functions to create and manage SQLite database connections.
+Connections are pooled per database path; closing a pooled connection
+returns it to its pool so the next request skips opening the file again.
+
+Data derived by the application (rollups, search indexes, ...) is kept in
+sidecar SQLite files outside the SOS Offline database, one per database and purpose.
 """
 
+from contextlib import contextmanager
+from functools import partial
+import hashlib
+import os
 import sqlite3
+import threading
+
+# Folder in the user's home directory holding sidecar databases
+SIDECAR_DIR = os.path.join(os.path.expanduser("~"), "sos_review_data")
+
+# Idle connections kept per database
+POOL_MAX_IDLE = 4
+
+# Called with (db_path, sql) for statements run on pooled connections (see trace_queries)
+_query_tracer = None
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    SQLite connection whose close() hands it back to its pool.
+    """
+    pool = None
+
+    def close(self):
+        if self.pool is not None and self.pool.release(self):
+            return
+        super().close()
+
+
+class ConnectionPool:
+    """
+    Pool of read connections to one SQLite database.
+    """
+
+    def __init__(self, db_path, max_idle=POOL_MAX_IDLE):
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Returns an idle connection, or opens a new one if none is idle.
+        """
+        conn = None
+        with self._lock:
+            if self._idle:
+                conn = self._idle.pop()
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, factory=PooledConnection, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.pool = self
+        if _query_tracer is not None:
+            conn.set_trace_callback(partial(_query_tracer, self.db_path))
+        return conn
+
+    def release(self, conn):
+        """
+        Takes a connection back. Returns False if the pool is full and it should be closed.
+        """
+        try:
+            conn.set_trace_callback(None)
+            conn.rollback()
+        except sqlite3.Error:
+            return False
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return True
+        return False
+
+    def close_all(self):
+        """
+        Closes all idle connections.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.pool = None
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path):
+    """
+    Returns the connection pool for the given database path, creating it on first use.
+    """
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = _pools[db_path] = ConnectionPool(db_path)
+        return pool
+
+
+@contextmanager
+def trace_queries(callback):
+    """
+    Calls callback(db_path, sql) for every statement, with its parameters expanded,
+    run on pooled connections acquired inside the with block.
+    """
+    global _query_tracer
+    _query_tracer = callback
+    try:
+        yield
+    finally:
+        _query_tracer = None
+
 
 # Returns a SQLite connection object for the given database path.
 # Sets row_factory to sqlite3.Row for dict-like row access.
 def get_connection(db_path="power-system.s3db"):
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_pool(db_path).acquire()
+
+
+def get_sidecar_path(db_path, name):
+    """
+    Returns the path of the sidecar database `name` belonging to db_path.
+    Files are named after the database and a hash of its absolute path,
+    e.g. power-system-1a2b3c4d.rollups.s3db.
+    """
+    db_path = os.path.abspath(db_path)
+    stem = os.path.splitext(os.path.basename(db_path))[0]
+    digest = hashlib.sha1(db_path.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(SIDECAR_DIR, f"{stem}-{digest}.{name}.s3db")
+
+
+def get_sidecar_connection(db_path, name):
+    """
+    Returns a pooled connection to the sidecar database `name` of db_path, creating the folder if needed.
+    """
+    os.makedirs(SIDECAR_DIR, exist_ok=True)
+    return get_connection(get_sidecar_path(db_path, name))
@@ -0,0 +1,274 @@
+"""
+Asynchronous report jobs for the Substation Operating Review Flask application.
+
+A job runs one batch report (see batch_reports.REPORTS) for a substation over a
+date range. Every date/month of the range is a separate task in a bounded process
+pool, so long reports don't hold a server thread and progress is the number of
+finished periods. Jobs and their results are kept in a local SQLite results store
+and evicted JOB_TTL seconds after they finish.
+
+Submitting a report identical to a running or finished (unexpired) job, for the
+same database version, returns that job instead of starting another.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import partial
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+
+from analysis.utils import get_db_version
+from batch_reports import REPORTS, build_jobs, build_report
+from routes.db_service import SIDECAR_DIR, get_connection
+
+# Results store shared by all substations
+JOBS_STORE_PATH = os.path.join(SIDECAR_DIR, "report_jobs.s3db")
+# Worker processes running report periods
+JOB_WORKERS = 2
+# Seconds a finished job and its result are kept
+JOB_TTL = 24 * 60 * 60
+# Longest range a job may cover, in days
+JOB_MAX_DAYS = 366
+# Seconds between keep-alive messages of an idle event stream
+JOB_EVENTS_KEEPALIVE = 15
+
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY, key TEXT, substation TEXT, report TEXT, start TEXT, "end" TEXT,
+        status TEXT, done INTEGER, total INTEGER, error TEXT,
+        created REAL, finished REAL, result TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs (key, status);
+"""
+
+# Fields returned by get_job/list_jobs (everything but the result)
+_JOB_FIELDS = ('id', 'substation', 'report', 'start', 'end', 'status', 'done', 'total', 'error', 'created', 'finished')
+
+# Reentrant: a done callback may run in the submitting thread
+_lock = threading.RLock()
+# Notified whenever a job makes progress
+_progress = threading.Condition(_lock)
+_executor = None
+_store_ready = False
+# Jobs running in this process: {job id: {'results': [...], 'errors': [...], 'remaining': int}}
+_running = {}
+
+
+def _store():
+    """
+    Returns a connection to the results store. On first use in a process, creates the
+    schema and fails jobs left running by a previous run of the application.
+    """
+    global _store_ready
+    os.makedirs(SIDECAR_DIR, exist_ok=True)
+    conn = get_connection(JOBS_STORE_PATH)
+    if not _store_ready:
+        conn.executescript(_SCHEMA)
+        conn.execute("UPDATE jobs SET status = ?, error = 'Interrupted by an application restart', finished = ? "
+                     "WHERE status = ?", (JOB_FAILED, time.time(), JOB_RUNNING))
+        conn.commit()
+        _store_ready = True
+    return conn
+
+
+def _submit(*args):
+    """
+    Submits a task to the worker pool, replacing the pool if a worker process died.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=JOB_WORKERS)
+    try:
+        return _executor.submit(*args)
+    except BrokenProcessPool:
+        _executor = ProcessPoolExecutor(max_workers=JOB_WORKERS)
+        return _executor.submit(*args)
+
+
+def _job_dict(row):
+    job = {field: row[field] for field in _JOB_FIELDS}
+    for field in ('created', 'finished'):
+        if job[field] is not None:
+            job[field] = datetime.fromtimestamp(job[field]).strftime("%d-%m-%Y %H:%M:%S")
+    return job
+
+
+def _evict(store):
+    store.execute("DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?", (time.time() - JOB_TTL,))
+
+
+def submit_job(substation, report, start, end):
+    """
+    Starts a report job, or returns the identical job already running or finished.
+
+    Args:
+        substation (Substation): Substation to report on.
+        report (str): Report name (key of batch_reports.REPORTS).
+        start (str): First date, 'YYYY-MM-DD'.
+        end (str): Last date (inclusive), 'YYYY-MM-DD'.
+
+    Returns:
+        str: Job id.
+
+    Raises:
+        ValueError: If the report is unknown or the range is invalid.
+    """
+    if report not in REPORTS:
+        raise ValueError(f"Unknown report '{report}'")
+    try:
+        start_date = datetime.strptime(start, "%Y-%m-%d")
+        end_date = datetime.strptime(end, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError("Dates must be in YYYY-MM-DD format")
+    if end_date < start_date:
+        raise ValueError("End date is before start date")
+    if (end_date - start_date).days >= JOB_MAX_DAYS:
+        raise ValueError(f"Range is longer than {JOB_MAX_DAYS} days")
+
+    config = substation.config()
+    periods = [period for _, _, period in build_jobs([substation.name], [report], start_date, end_date)]
+    key = hashlib.sha1(json.dumps([config, get_db_version(substation.db_path), report, start, end],
+                                  sort_keys=True).encode("utf-8")).hexdigest()
+
+    with _lock:
+        store = _store()
+        try:
+            _evict(store)
+            existing = store.execute("SELECT id FROM jobs WHERE key = ? AND status != ? ORDER BY created DESC",
+                                     (key, JOB_FAILED)).fetchone()
+            if existing:
+                store.commit()
+                return existing['id']
+
+            job_id = secrets.token_hex(8)
+            store.execute("""
+                INSERT INTO jobs (id, key, substation, report, start, "end", status, done, total, created)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?)
+            """, (job_id, key, substation.name, report, start, end, JOB_RUNNING, len(periods), time.time()))
+            store.commit()
+        finally:
+            store.close()
+
+        _running[job_id] = {'results': [None] * len(periods), 'errors': [], 'remaining': len(periods)}
+        for index, period in enumerate(periods):
+            future = _submit(build_report, config, report, period)
+            future.add_done_callback(partial(_period_done, job_id, index, period))
+    return job_id
+
+
+def _period_done(job_id, index, period, future):
+    """
+    Records one finished period; the last one stores the result and ends the job.
+    """
+    try:
+        tables = future.result()
+    except Exception as exc:
+        tables = None
+        error = f"{period}: {type(exc).__name__}: {exc}"
+
+    with _lock:
+        state = _running[job_id]
+        if tables is None:
+            state['errors'].append(error)
+        else:
+            state['results'][index] = {
+                'period': period,
+                'tables': [{'title': title, 'columns': columns, 'rows': rows} for title, columns, rows in tables]
+            }
+        state['remaining'] -= 1
+        done = len(state['results']) - state['remaining']
+
+        store = _store()
+        try:
+            if state['remaining']:
+                store.execute("UPDATE jobs SET done = ? WHERE id = ?", (done, job_id))
+            else:
+                del _running[job_id]
+                result = json.dumps([entry for entry in state['results'] if entry is not None], default=str)
+                store.execute("""
+                    UPDATE jobs SET done = ?, status = ?, error = ?, finished = ?, result = ? WHERE id = ?
+                """, (done, JOB_FAILED if state['errors'] else JOB_DONE, '; '.join(state['errors']) or None,
+                      time.time(), result, job_id))
+            store.commit()
+        finally:
+            store.close()
+        _progress.notify_all()
+
+
+def get_job(job_id):
+    """
+    Returns the status of a job, or None if it does not exist (or has expired).
+
+    Returns:
+        dict: id, substation, report, start, end, status ('running', 'done' or 'failed'),
+              done and total periods, error, created and finished times.
+    """
+    with _lock:
+        store = _store()
+        try:
+            row = store.execute("SELECT * FROM jobs WHERE id = ? AND (finished IS NULL OR finished >= ?)",
+                                (job_id, time.time() - JOB_TTL)).fetchone()
+        finally:
+            store.close()
+    return _job_dict(row) if row else None
+
+
+def get_job_result(job_id):
+    """
+    Returns the result of a finished job: [{'period': ..., 'tables': [{'title', 'columns', 'rows'}, ...]}, ...]
+    (periods that failed are left out), or None if the job is unknown or still running.
+    """
+    with _lock:
+        store = _store()
+        try:
+            row = store.execute("SELECT result FROM jobs WHERE id = ? AND finished >= ?",
+                                (job_id, time.time() - JOB_TTL)).fetchone()
+        finally:
+            store.close()
+    return json.loads(row['result']) if row and row['result'] is not None else None
+
+
+def list_jobs(limit=20):
+    """
+    Returns the most recent unexpired jobs, newest first (see get_job).
+    """
+    with _lock:
+        store = _store()
+        try:
+            _evict(store)
+            store.commit()
+            rows = store.execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        finally:
+            store.close()
+    return [_job_dict(row) for row in rows]
+
+
+def job_events(job_id):
+    """
+    Yields server-sent events with the job status each time it changes, until it finishes.
+    """
+    last = None
+    while True:
+        job = get_job(job_id)
+        if job is None:
+            yield "event: missing\ndata: {}\n\n"
+            return
+        if job != last:
+            yield f"data: {json.dumps(job)}\n\n"
+            last = job
+        if job['status'] != JOB_RUNNING:
+            return
+        with _progress:
+            changed = _progress.wait(JOB_EVENTS_KEEPALIVE)
+        if not changed:
+            # Lets the server notice a closed connection
+            yield ": keep-alive\n\n"
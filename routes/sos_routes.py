@@ -3,18 +3,27 @@ Routes for the Substation Operating Review Flask application.
 
 This module defines the blueprint and view functions for:
 - Home page
-- Hourly review page (fetches and displays feeder/transformer data)
+- Hourly review page (fetches and displays feeder/transformer data), for one slot or a full day
+- Daily and monthly review pages
+- Cross-substation summary and settings
+- Interruption search (page and JSON API)
+- Asynchronous report jobs (submit, follow progress over server-sent events, fetch the result)
+
+Every view works on the substation selected for the request (see routes.substations).
 """
 
-from flask import Blueprint, render_template, request, current_app, flash, redirect, url_for
-from routes.app_utils import is_valid_sqlite_db, update_config_database, get_config_database
+from flask import Blueprint, Response, abort, render_template, request, flash, redirect, url_for, jsonify
+from analysis.utils import get_db_version
+from routes.app_utils import is_valid_sqlite_db, update_config_database, SUBSTATION_SECTION_PREFIX
+from routes.substations import get_current_substation, get_substations
+from concurrent.futures import ThreadPoolExecutor
 from utils.date_utils import format_date, generate_allowed_times, get_closest_allowed_datetime, get_previous_month, get_previous_date
-from analysis.hourly_review import get_em_diff, get_station_load
-from analysis.daily_review import get_daily_current_stat, get_daily_em_diff_stat, get_station_peak_min, get_incomers_peak_min
-from analysis.monthly_review import get_eht_tf_monthly_interruptions, get_eht_tf_monthly_interruptions_summary, get_ht_monthly_interruptions_summary, get_monthly_energy
-from analysis.abc_details import get_abc_details
+from utils.slot_calendar import adjacent_allowed_slot
 import os
 
+# Analysis modules (and numpy behind them) are imported inside each view on first use,
+# so the application starts serving without loading them.
+
 # Create a Blueprint for SOS routes
 sos_bp = Blueprint('sos', __name__)
 
@@ -26,6 +35,10 @@ def index():
 # Hourly review route for displaying feeder/transformer data
 @sos_bp.route("/hourly-review", methods=["GET", "POST"])
 def hourly_review():
+    from analysis.hourly_review import get_em_diff, get_station_load
+
+    substation = get_current_substation()
+    db_path = substation.db_path
     eht_data = []  # 110 kV feeder data
     tf_data = []   # Transformer data
     ht_data = []   # 11 kV feeder data
@@ -42,11 +55,13 @@ def hourly_review():
 
     formatted_date = format_date(selected_date) # Format date for DB query
     # Fetch data for each table
-    eht_data = get_em_diff(formatted_date, selected_time, db_path=current_app.config['DATABASE'], db_table="soseht")
-    tf_data = get_em_diff(formatted_date, selected_time, db_path=current_app.config['DATABASE'], db_table="sostf", db_code_column="tfcode")
-    ht_data = get_em_diff(formatted_date, selected_time, db_path=current_app.config['DATABASE'], db_table="sosht")
+    eht_data = substation.cached_call(get_em_diff, formatted_date, selected_time, db_path=db_path, db_table="soseht")
+    tf_data = substation.cached_call(get_em_diff, formatted_date, selected_time, db_path=db_path, db_table="sostf", db_code_column="tfcode")
+    ht_data = substation.cached_call(get_em_diff, formatted_date, selected_time, db_path=db_path, db_table="sosht")
     # Fetch station load
-    station_load = get_station_load(formatted_date, selected_time, db_path=current_app.config['DATABASE'])
+    station_load = substation.cached_call(get_station_load, formatted_date, selected_time, db_path=db_path,
+                                          feeder_in=substation.station_feeder_in, feeder_out=substation.station_feeder_out,
+                                          formula=substation.station_load)
 
     # Render the hourly review template with all required data
     return render_template(
@@ -60,9 +75,109 @@ def hourly_review():
         allowed_times=allowed_times
     )
 
+# Quantities shown by the full-day hourly matrix: field -> heading
+DAY_MATRIX_QUANTITIES = {
+    'current': 'Load (A)',
+    'delta_emc_import': 'Δ EM Import',
+    'delta_emc_export': 'Δ EM Export',
+}
+
+# Full-day hourly review: every allowed time slot of a day in one codes x slots matrix per table
+@sos_bp.route("/hourly-review-day", methods=["GET", "POST"])
+def hourly_review_day():
+    from analysis.hourly_review import get_day_matrix, get_station_load_range
+
+    substation = get_current_substation()
+    db_path = substation.db_path
+    allowed_times = generate_allowed_times()
+
+    if request.method == "POST":
+        selected_date = request.form['date']
+        quantity = request.form.get('quantity', 'current')
+    else:
+        selected_date = get_closest_allowed_datetime(allowed_times)[0]
+        quantity = 'current'
+    if quantity not in DAY_MATRIX_QUANTITIES:
+        quantity = 'current'
+
+    formatted_date = format_date(selected_date)
+    eht_data = substation.cached_call(get_day_matrix, formatted_date, db_path=db_path, db_table="soseht")
+    tf_data = substation.cached_call(get_day_matrix, formatted_date, db_path=db_path, db_table="sostf", db_code_column="tfcode")
+    ht_data = substation.cached_call(get_day_matrix, formatted_date, db_path=db_path, db_table="sosht")
+    slots = tuple((formatted_date, time) for time in allowed_times)
+    station_load = substation.cached_call(get_station_load_range, slots, db_path, substation.station_feeder_in,
+                                          substation.station_feeder_out, substation.station_load)
+
+    return render_template(
+        "hourly_review_day.html",
+        eht_data=eht_data,
+        tf_data=tf_data,
+        ht_data=ht_data,
+        station_load=[station_load[slot] for slot in slots],
+        selected_date=selected_date,
+        quantity=quantity,
+        quantities=DAY_MATRIX_QUANTITIES,
+        allowed_times=allowed_times
+    )
+
+# Maximum number of slots on each side returned by the batch hourly endpoint
+EM_DIFF_MAX_SPAN = 6
+
+# Batch hourly review data: the selected slot and `span` slots on each side, for client-side prefetch
+@sos_bp.route("/api/em-diff")
+def em_diff_batch():
+    from analysis.hourly_review import get_em_diff_range, get_station_load_range
+
+    substation = get_current_substation()
+    db_path = substation.db_path
+    try:
+        formatted_date = format_date(request.args['date'])
+        span = min(max(int(request.args.get('span', 1)), 0), EM_DIFF_MAX_SPAN)
+    except (KeyError, ValueError):
+        return jsonify({'error': "date (YYYY-MM-DD) and an integer span are required"}), 400
+    selected_time = request.args.get('time', '')
+    if selected_time not in generate_allowed_times():
+        return jsonify({'error': "time must be one of the allowed slots"}), 400
+
+    slots = tuple(adjacent_allowed_slot(formatted_date, selected_time, step) for step in range(-span, span + 1))
+    eht_data = substation.cached_call(get_em_diff_range, slots, db_path, "soseht")
+    tf_data = substation.cached_call(get_em_diff_range, slots, db_path, "sostf", "tfcode")
+    ht_data = substation.cached_call(get_em_diff_range, slots, db_path, "sosht")
+    station_load = substation.cached_call(get_station_load_range, slots, db_path, substation.station_feeder_in,
+                                          substation.station_feeder_out, substation.station_load)
+
+    result = []
+    for slot in slots:
+        slot_date = f"{slot[0][6:10]}-{slot[0][3:5]}-{slot[0][0:2]}"
+        result.append({
+            'date': slot_date,
+            'time': slot[1],
+            'eht_data': eht_data[slot],
+            'tf_data': tf_data[slot],
+            'ht_data': ht_data[slot],
+            'station_load': station_load[slot],
+            # Rendered tables, swapped into the page by static/js/auto-reload.js
+            'html': render_template("hourly_review_tables.html", eht_data=eht_data[slot], tf_data=tf_data[slot],
+                                    ht_data=ht_data[slot], station_load=station_load[slot])
+        })
+    return jsonify({'slots': result, 'db_version': str(get_db_version(db_path))})
+
+@sos_bp.route("/api/db-version")
+def db_version():
+    """
+    Returns the version of the current substation's database, checked by
+    static/js/auto-reload.js before it serves a cached result.
+    """
+    return jsonify({'db_version': str(get_db_version(get_current_substation().db_path))})
+
 # Daily review summary route
 @sos_bp.route("/daily-review-summary", methods=["GET", "POST"])
 def daily_review_summary():
+    from analysis.daily_review import get_station_peak_min, get_incomers_peak_min
+    from utils.slot_calendar import date_from_day_number, day_number
+
+    substation = get_current_substation()
+    db_path = substation.db_path
     selected_date = None
     station_peak_min = None
     incomers_peak_min = None
@@ -74,46 +189,180 @@ def daily_review_summary():
 
     query_date = format_date(selected_date)
 
-    station_peak_min = get_station_peak_min(current_app.config['DATABASE'], query_date)
-    incomers_peak_min = get_incomers_peak_min(current_app.config['DATABASE'], query_date)
+    station_peak_min = substation.cached_call(get_station_peak_min, db_path, query_date, substation.station_feeder_in,
+                                              substation.station_feeder_out, substation.station_load)
+    incomers_peak_min = substation.cached_call(get_incomers_peak_min, db_path, query_date, substation.incomers, substation.incomers_load)
+    # Forecast for the day after the selected date
+    station_forecast, incomers_forecast = _peak_forecasts(substation, date_from_day_number(day_number(query_date) + 1))
 
     return render_template(
         "daily_review_summary.html",
         selected_date=selected_date,
         station_peak_min=station_peak_min,
-        incomers_peak_min=incomers_peak_min
+        incomers_peak_min=incomers_peak_min,
+        station_forecast=station_forecast,
+        incomers_forecast=incomers_forecast
+    )
+
+def _peak_forecasts(substation, target_date):
+    """
+    Returns the station (110 kV) and incomers (11 kV) peak forecasts of a 'DD-MM-YYYY' date.
+    """
+    from analysis.load_forecast import get_peak_forecast
+    from analysis.station_load import incomers_formula, station_formula
+
+    station = substation.cached_call(get_peak_forecast, substation.db_path, target_date,
+                                     station_formula(substation.station_feeder_in, substation.station_feeder_out,
+                                                     substation.station_load))
+    incomers = substation.cached_call(get_peak_forecast, substation.db_path, target_date,
+                                      incomers_formula(substation.incomers, substation.incomers_load), "sosht")
+    return station, incomers
+
+# Next-day peak load forecast (station and incomers) for scripts and other pages
+@sos_bp.route("/api/peak-forecast")
+def api_peak_forecast():
+    from datetime import date, timedelta
+
+    substation = get_current_substation()
+    try:
+        target_date = format_date(request.args.get('date') or str(date.today() + timedelta(days=1)))
+    except ValueError:
+        return jsonify({'error': "date must be in YYYY-MM-DD format"}), 400
+    station, incomers = _peak_forecasts(substation, target_date)
+    return jsonify({'date': target_date, 'station': station, 'incomers': incomers})
+
+# Longest range of the load analytics page, in days
+LOAD_ANALYTICS_MAX_DAYS = 366
+
+# Station / incomers load ramps, time near the peak and peak windows over a range of days
+@sos_bp.route("/load-analytics", methods=["GET", "POST"])
+def load_analytics():
+    from analysis.load_analytics import get_load_analytics, DEFAULT_PEAK_PERCENT, PEAK_WINDOWS
+    from analysis.station_load import incomers_formula, station_formula
+    from calendar import monthrange
+    from datetime import date
+
+    substation = get_current_substation()
+    db_path = substation.db_path
+    load = "station"
+    peak_percent = DEFAULT_PEAK_PERCENT
+
+    if request.method == "POST":
+        start_date = request.form.get("start")
+        end_date = request.form.get("end")
+        load = "incomers" if request.form.get("load") == "incomers" else "station"
+        try:
+            peak_percent = min(max(float(request.form.get("peak_percent", DEFAULT_PEAK_PERCENT)), 1), 100)
+        except ValueError:
+            peak_percent = DEFAULT_PEAK_PERCENT
+    else:
+        previous_month = get_previous_month()
+        year, month = map(int, previous_month.split('-'))
+        start_date = f"{previous_month}-01"
+        end_date = f"{previous_month}-{monthrange(year, month)[1]:02d}"
+
+    analytics = None
+    try:
+        first, last = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    except (TypeError, ValueError):
+        first = last = None
+    if first and first <= last and (last - first).days < LOAD_ANALYTICS_MAX_DAYS:
+        query_dates = tuple(date.fromordinal(day).strftime("%d-%m-%Y") for day in range(first.toordinal(), last.toordinal() + 1))
+        if load == "incomers":
+            formula = incomers_formula(substation.incomers, substation.incomers_load)
+            analytics = substation.cached_call(get_load_analytics, db_path, query_dates, formula, "sosht", "feedercode", peak_percent)
+        else:
+            formula = station_formula(substation.station_feeder_in, substation.station_feeder_out, substation.station_load)
+            analytics = substation.cached_call(get_load_analytics, db_path, query_dates, formula, "soseht", "feedercode", peak_percent)
+
+    return render_template(
+        "load_analytics.html",
+        start_date=start_date,
+        end_date=end_date,
+        load=load,
+        peak_percent=peak_percent,
+        peak_windows=PEAK_WINDOWS,
+        max_days=LOAD_ANALYTICS_MAX_DAYS,
+        analytics=analytics
     )
 
 # Daily load review route
 @sos_bp.route("/daily-review-load", methods=["GET", "POST"])
 def daily_review_load():
+    from analysis.daily_review import get_daily_current_stat
+    from analysis.period_comparison import CURRENT_FIELDS, get_current_comparison
+
+    substation = get_current_substation()
+    db_path = substation.db_path
     selected_date = None
+    compare_date = None
     ht_data = None
     eht_data = None
     tf_data = None
+    comparison = None
 
     if request.method == "POST":
         selected_date = request.form.get("date")
+        compare_date = request.form.get("compare_date") or None
     else:
         selected_date = get_previous_date()
 
     query_date = format_date(selected_date)
 
-    ht_data = get_daily_current_stat(current_app.config['DATABASE'], query_date, db_table="sosht", db_code_column="feedercode")
-    eht_data = get_daily_current_stat(current_app.config['DATABASE'], query_date, db_table="soseht", db_code_column="feedercode")
-    tf_data = get_daily_current_stat(current_app.config['DATABASE'], query_date, db_table="sostf", db_code_column="tfcode")
+    if compare_date:
+        comparison = _compare_tables(substation, get_current_comparison, query_date, format_date(compare_date), (
+            ("11kV Feeders", "sosht", "feedercode"),
+            ("EHT Feeders", "soseht", "feedercode"),
+            ("Transformers", "sostf", "tfcode"),
+        ))
+    else:
+        ht_data = substation.cached_call(get_daily_current_stat, db_path, query_date, db_table="sosht", db_code_column="feedercode")
+        eht_data = substation.cached_call(get_daily_current_stat, db_path, query_date, db_table="soseht", db_code_column="feedercode")
+        tf_data = substation.cached_call(get_daily_current_stat, db_path, query_date, db_table="sostf", db_code_column="tfcode")
 
     return render_template(
         "daily_review_load.html",
         selected_date=selected_date,
+        compare_date=compare_date,
         ht_data=ht_data,
         eht_data=eht_data,
-        tf_data=tf_data
+        tf_data=tf_data,
+        comparison=comparison,
+        comparison_fields=CURRENT_FIELDS,
+        current_label=selected_date,
+        reference_label=compare_date
     )
 
+def _compare_tables(substation, compare, current, reference, tables):
+    """
+    Runs a period comparison (analysis.period_comparison) on each reading table.
+
+    Args:
+        substation (Substation): Substation whose database is compared.
+        compare (callable): get_current_comparison or get_energy_comparison.
+        current: Date or period compared.
+        reference: Date or period compared against.
+        tables (tuple): (title, db_table, db_code_column) of each table, in display order.
+
+    Returns:
+        list: [(title, comparison rows), ...]
+    """
+    def run(table):
+        title, db_table, db_code_column = table
+        return title, substation.cached_call(compare, substation.db_path, current, reference,
+                                             db_table=db_table, db_code_column=db_code_column)
+
+    # Each table is one batched query for both periods, so query the tables concurrently
+    with ThreadPoolExecutor(max_workers=len(tables)) as executor:
+        return list(executor.map(run, tables))
+
 # Daily energy review route
 @sos_bp.route("/daily-review-energy", methods=["GET", "POST"])
 def daily_review_energy():
+    from analysis.daily_review import get_daily_em_diff_stat
+
+    substation = get_current_substation()
+    db_path = substation.db_path
     selected_date = None
     ht_em_diff = None
     eht_em_diff = None
@@ -126,9 +375,9 @@ def daily_review_energy():
 
     query_date = format_date(selected_date)
 
-    ht_em_diff = get_daily_em_diff_stat(current_app.config['DATABASE'], query_date, db_table="sosht", db_code_column="feedercode")
-    eht_em_diff = get_daily_em_diff_stat(current_app.config['DATABASE'], query_date, db_table="soseht", db_code_column="feedercode")
-    tf_em_diff = get_daily_em_diff_stat(current_app.config['DATABASE'], query_date, db_table="sostf", db_code_column="tfcode")
+    ht_em_diff = substation.cached_call(get_daily_em_diff_stat, db_path, query_date, db_table="sosht", db_code_column="feedercode")
+    eht_em_diff = substation.cached_call(get_daily_em_diff_stat, db_path, query_date, db_table="soseht", db_code_column="feedercode")
+    tf_em_diff = substation.cached_call(get_daily_em_diff_stat, db_path, query_date, db_table="sostf", db_code_column="tfcode")
 
     return render_template(
         "daily_review_energy.html",
@@ -141,30 +390,317 @@ def daily_review_energy():
 # Monthly energy review route
 @sos_bp.route("/mor-energy", methods=["GET", "POST"])
 def mor_energy():
+    from analysis.monthly_review import get_period_energies
+    from analysis.period_comparison import ENERGY_FIELDS, get_energy_comparison
+
+    substation = get_current_substation()
+    db_path = substation.db_path
+    span = "month"
+    compare_month = None
     ht_data = None
     eht_data = None
     tf_data = None
+    comparison = None
 
     if request.method == "POST":
         selected_month = request.form.get("month")
+        span = "year" if request.form.get("span") == "year" else "month"
+        compare_month = request.form.get("compare_month") or None
     else:
         selected_month = get_previous_month()
-    
-    ht_data = get_monthly_energy(current_app.config['DATABASE'], selected_month, db_table="sosht", db_code_column="feedercode")
-    eht_data = get_monthly_energy(current_app.config['DATABASE'], selected_month, db_table="soseht", db_code_column="feedercode")
-    tf_data = get_monthly_energy(current_app.config['DATABASE'], selected_month, db_table="sostf", db_code_column="tfcode")
+
+    period = selected_month[:4] if span == "year" else selected_month
+    reference_period = None
+    if compare_month:
+        reference_period = compare_month[:4] if span == "year" else compare_month
+        comparison = _compare_tables(substation, get_energy_comparison, period, reference_period, (
+            ("EHT Feeders", "soseht", "feedercode"),
+            ("Transformers", "sostf", "tfcode"),
+            ("HT Feeders", "sosht", "feedercode"),
+        ))
+    else:
+        ht_data = substation.cached_call(get_period_energies, db_path, (period,), db_table="sosht", db_code_column="feedercode")[period]
+        eht_data = substation.cached_call(get_period_energies, db_path, (period,), db_table="soseht", db_code_column="feedercode")[period]
+        tf_data = substation.cached_call(get_period_energies, db_path, (period,), db_table="sostf", db_code_column="tfcode")[period]
 
     return render_template(
         "mor_energy.html",
         selected_month=selected_month,
+        span=span,
+        compare_month=compare_month,
         ht_data=ht_data,
         eht_data=eht_data,
-        tf_data=tf_data
+        tf_data=tf_data,
+        comparison=comparison,
+        comparison_fields=ENERGY_FIELDS,
+        current_label=period,
+        reference_label=reference_period
+    )
+
+# Monthly energy balance reconciliation route
+@sos_bp.route("/mor-energy-balance", methods=["GET", "POST"])
+def mor_energy_balance():
+    from analysis.energy_balance import get_energy_balance, DEFAULT_LOSS_THRESHOLD
+
+    substation = get_current_substation()
+    db_path = substation.db_path
+    balance = None
+    loss_threshold = DEFAULT_LOSS_THRESHOLD
+
+    if request.method == "POST":
+        selected_month = request.form.get("month")
+        try:
+            loss_threshold = float(request.form.get("loss_threshold", DEFAULT_LOSS_THRESHOLD))
+        except ValueError:
+            loss_threshold = DEFAULT_LOSS_THRESHOLD
+    else:
+        selected_month = get_previous_month()
+
+    balance = substation.cached_call(get_energy_balance, db_path, selected_month, loss_threshold, substation.incomers)
+
+    return render_template(
+        "mor_energy_balance.html",
+        selected_month=selected_month,
+        loss_threshold=loss_threshold,
+        balance=balance
+    )
+
+# Monthly transformer loading heatmap route
+@sos_bp.route("/tf-loading", methods=["GET", "POST"])
+def tf_loading():
+    from analysis.transformer_loading import get_transformer_loading, DEFAULT_LOADING_THRESHOLD, OVERLOAD_PERCENT
+
+    substation = get_current_substation()
+    db_path = substation.db_path
+    threshold = DEFAULT_LOADING_THRESHOLD
+
+    if request.method == "POST":
+        selected_month = request.form.get("month")
+        try:
+            threshold = float(request.form.get("threshold", DEFAULT_LOADING_THRESHOLD))
+        except ValueError:
+            threshold = DEFAULT_LOADING_THRESHOLD
+    else:
+        selected_month = get_previous_month()
+
+    loading = substation.cached_call(get_transformer_loading, db_path, selected_month, threshold)
+
+    return render_template(
+        "tf_loading.html",
+        selected_month=selected_month,
+        threshold=threshold,
+        overload_percent=OVERLOAD_PERCENT,
+        loading=loading
+    )
+
+# Voltage quality-of-supply statistics route (month or year)
+@sos_bp.route("/voltage-stats", methods=["GET", "POST"])
+def voltage_stats():
+    from analysis.voltage_stats import get_voltage_stats
+    from utils.slot_calendar import period_dates
+
+    substation = get_current_substation()
+    db_path = substation.db_path
+    span = "month"
+
+    if request.method == "POST":
+        selected_month = request.form.get("month")
+        span = "year" if request.form.get("span") == "year" else "month"
+    else:
+        selected_month = get_previous_month()
+
+    query_dates = tuple(period_dates(selected_month[:4] if span == "year" else selected_month))
+    eht_data = substation.cached_call(get_voltage_stats, db_path, query_dates, db_table="soseht", db_code_column="feedercode")
+    tf_data = substation.cached_call(get_voltage_stats, db_path, query_dates, db_table="sostf", db_code_column="tfcode")
+    ht_data = substation.cached_call(get_voltage_stats, db_path, query_dates, db_table="sosht", db_code_column="feedercode")
+
+    return render_template(
+        "voltage_stats.html",
+        selected_month=selected_month,
+        span=span,
+        tables=[('110 kV Feeders', eht_data), ('Transformers', tf_data), ('11 kV Feeders', ht_data)]
+    )
+
+# Reliability indices of a feeder group over any period
+@sos_bp.route("/reliability", methods=["GET", "POST"])
+def reliability():
+    from analysis.reliability import get_reliability_indices, FEEDER_GROUPS
+    from calendar import monthrange
+
+    substation = get_current_substation()
+    db_path = substation.db_path
+    fdrtype = "HTs"
+
+    if request.method == "POST":
+        start_date = request.form.get("start")
+        end_date = request.form.get("end")
+        if request.form.get("fdrtype") in FEEDER_GROUPS:
+            fdrtype = request.form.get("fdrtype")
+    else:
+        previous_month = get_previous_month()
+        year, month = map(int, previous_month.split('-'))
+        start_date = f"{previous_month}-01"
+        end_date = f"{previous_month}-{monthrange(year, month)[1]:02d}"
+
+    indices = None
+    if start_date and end_date and start_date <= end_date:
+        try:
+            indices = substation.cached_call(get_reliability_indices, db_path, start_date, end_date, fdrtype)
+        except ValueError:
+            indices = None
+
+    return render_template(
+        "reliability.html",
+        start_date=start_date,
+        end_date=end_date,
+        fdrtype=fdrtype,
+        indices=indices
+    )
+
+# Marks put around matched words by the interruption search, replaced with <mark> after escaping
+SEARCH_HIGHLIGHT = ('\x02', '\x03')
+
+def _search_params(values):
+    from analysis.interruption_search import DEFAULT_SEARCH_LIMIT
+
+    text = values.get("q", "").strip()
+    fdrtype = values.get("fdrtype") if values.get("fdrtype") in ("EHT", "T/F", "HTs") else None
+    try:
+        limit = min(max(int(values.get("limit", DEFAULT_SEARCH_LIMIT)), 1), 500)
+    except ValueError:
+        limit = DEFAULT_SEARCH_LIMIT
+    return text, fdrtype, limit
+
+# Full-text search over interruption remarks and relay operations (whole history)
+@sos_bp.route("/interruption-search", methods=["GET", "POST"])
+def interruption_search():
+    from analysis.interruption_search import search_interruptions
+    from markupsafe import Markup, escape
+
+    substation = get_current_substation()
+    db_path = substation.db_path
+    text, fdrtype, limit = _search_params(request.form if request.method == "POST" else request.args)
+
+    results = None
+    if text:
+        results = search_interruptions(db_path, text, fdrtype, limit, highlight=SEARCH_HIGHLIGHT)
+        for hit in results['hits']:
+            for field in ('remarks', 'relays'):
+                hit[field] = Markup(str(escape(hit[field] or '')).replace(SEARCH_HIGHLIGHT[0], '<mark>')
+                                    .replace(SEARCH_HIGHLIGHT[1], '</mark>'))
+
+    return render_template(
+        "interruption_search.html",
+        query=text,
+        fdrtype=fdrtype or "",
+        results=results
+    )
+
+@sos_bp.route("/api/interruption-search")
+def api_interruption_search():
+    from analysis.interruption_search import search_interruptions
+
+    substation = get_current_substation()
+    text, fdrtype, limit = _search_params(request.args)
+    if not text:
+        return jsonify({'error': "q (words to search for) is required"}), 400
+    return jsonify(dict(search_interruptions(substation.db_path, text, fdrtype, limit), query=text))
+
+# HT interruptions attributed to 110 kV feeder and transformer outages (month or year)
+@sos_bp.route("/cascading-outages", methods=["GET", "POST"])
+def cascading_outages():
+    from analysis.cascading_outages import get_cascading_outages, CASCADE_TOLERANCE_MINUTES
+
+    substation = get_current_substation()
+    db_path = substation.db_path
+    span = "month"
+    tolerance = CASCADE_TOLERANCE_MINUTES
+
+    if request.method == "POST":
+        selected_month = request.form.get("month")
+        span = "year" if request.form.get("span") == "year" else "month"
+        try:
+            tolerance = min(max(int(request.form.get("tolerance", CASCADE_TOLERANCE_MINUTES)), 0), 60)
+        except ValueError:
+            tolerance = CASCADE_TOLERANCE_MINUTES
+    else:
+        selected_month = get_previous_month()
+
+    period = selected_month[:4] if span == "year" else selected_month
+    correlation = substation.cached_call(get_cascading_outages, db_path, period, tolerance)
+
+    return render_template(
+        "cascading_outages.html",
+        selected_month=selected_month,
+        span=span,
+        tolerance=tolerance,
+        correlation=correlation
+    )
+
+# Zero-current runs of a month missing from the interruption register
+@sos_bp.route("/unreported-outages", methods=["GET", "POST"])
+def unreported_outages():
+    from analysis.unreported_outages import get_unreported_outages, DEFAULT_MIN_READINGS
+
+    substation = get_current_substation()
+    db_path = substation.db_path
+    min_readings = DEFAULT_MIN_READINGS
+
+    if request.method == "POST":
+        selected_month = request.form.get("month")
+        try:
+            min_readings = max(int(request.form.get("min_readings", DEFAULT_MIN_READINGS)), 1)
+        except ValueError:
+            min_readings = DEFAULT_MIN_READINGS
+    else:
+        selected_month = get_previous_month()
+
+    eht_data = substation.cached_call(get_unreported_outages, db_path, selected_month, "soseht", min_readings)
+    tf_data = substation.cached_call(get_unreported_outages, db_path, selected_month, "sostf", min_readings)
+    ht_data = substation.cached_call(get_unreported_outages, db_path, selected_month, "sosht", min_readings)
+
+    return render_template(
+        "unreported_outages.html",
+        selected_month=selected_month,
+        min_readings=min_readings,
+        tables=[('110 kV Feeders', eht_data), ('Transformers', tf_data), ('11 kV Feeders', ht_data)]
+    )
+
+# Missing, duplicate and conflicting readings against the slot calendar (month or year)
+@sos_bp.route("/data-completeness", methods=["GET", "POST"])
+def data_completeness():
+    from analysis.data_completeness import get_data_completeness
+    from utils.slot_calendar import period_dates
+
+    substation = get_current_substation()
+    db_path = substation.db_path
+    span = "month"
+
+    if request.method == "POST":
+        selected_month = request.form.get("month")
+        span = "year" if request.form.get("span") == "year" else "month"
+    else:
+        selected_month = get_previous_month()
+
+    query_dates = tuple(period_dates(selected_month[:4] if span == "year" else selected_month))
+    eht_data = substation.cached_call(get_data_completeness, db_path, query_dates, db_table="soseht", db_code_column="feedercode")
+    tf_data = substation.cached_call(get_data_completeness, db_path, query_dates, db_table="sostf", db_code_column="tfcode")
+    ht_data = substation.cached_call(get_data_completeness, db_path, query_dates, db_table="sosht", db_code_column="feedercode")
+
+    return render_template(
+        "data_completeness.html",
+        selected_month=selected_month,
+        span=span,
+        tables=[('110 kV Feeders', eht_data), ('Transformers', tf_data), ('11 kV Feeders', ht_data)]
     )
 
 # Monthly EHT and T/F Interruptions and Summary route
 @sos_bp.route("/mor-eht-tf-interruptions", methods=["GET", "POST"])
 def mor_eht_tf_interruptions():
+    from analysis.monthly_review import get_eht_tf_monthly_interruptions, get_eht_tf_monthly_interruptions_summary
+
+    substation = get_current_substation()
+    db_path = substation.db_path
     eht_data = None
     eht_data_summary = None
     tf_data = None
@@ -175,10 +711,10 @@ def mor_eht_tf_interruptions():
     else:
         selected_month = get_previous_month()
     
-    eht_data = get_eht_tf_monthly_interruptions(current_app.config['DATABASE'], selected_month, 'EHT')
+    eht_data = substation.cached_call(get_eht_tf_monthly_interruptions, db_path, selected_month, 'EHT')
     eht_data_summary = get_eht_tf_monthly_interruptions_summary(eht_data, selected_month)
 
-    tf_data = get_eht_tf_monthly_interruptions(current_app.config['DATABASE'], selected_month, 'T/F')
+    tf_data = substation.cached_call(get_eht_tf_monthly_interruptions, db_path, selected_month, 'T/F')
     tf_data_summary = get_eht_tf_monthly_interruptions_summary(tf_data, selected_month)
     
     return render_template(
@@ -193,6 +729,10 @@ def mor_eht_tf_interruptions():
 # Monthly HT Interruption Summary route
 @sos_bp.route("/mor-ht-interruptions", methods=["GET", "POST"])
 def mor_ht_interruptions():
+    from analysis.monthly_review import get_ht_monthly_interruptions_summary
+
+    substation = get_current_substation()
+    db_path = substation.db_path
     ht_data = None
 
     if request.method == "POST":
@@ -200,7 +740,7 @@ def mor_ht_interruptions():
     else:
         selected_month = get_previous_month()
     
-    ht_data = get_ht_monthly_interruptions_summary(current_app.config['DATABASE'], selected_month) 
+    ht_data = substation.cached_call(get_ht_monthly_interruptions_summary, db_path, selected_month) 
     
     return render_template(
         "mor_ht_interruptions.html",
@@ -211,6 +751,10 @@ def mor_ht_interruptions():
 # ABC Feeder Details route
 @sos_bp.route("/abc-details", methods=["GET", "POST"])
 def abc_details():
+    from analysis.abc_details import get_abc_details
+
+    substation = get_current_substation()
+    db_path = substation.db_path
     abc_details = None
 
     if request.method == "POST":
@@ -219,7 +763,7 @@ def abc_details():
         # Show previous month by default
         selected_month = get_previous_month()
     
-    abc_details = get_abc_details(current_app.config['DATABASE'], selected_month)
+    abc_details = substation.cached_call(get_abc_details, db_path, selected_month)
 
     return render_template(
         "abc_details.html",
@@ -227,20 +771,140 @@ def abc_details():
         abc_details=abc_details
     )
 
+# Cross-substation summary route: daily peaks of every configured substation
+@sos_bp.route("/substations-summary", methods=["GET", "POST"])
+def substations_summary():
+    from analysis.daily_review import get_station_peak_min, get_incomers_peak_min
+
+    if request.method == "POST":
+        selected_date = request.form.get("date")
+    else:
+        selected_date = get_previous_date()
+
+    query_date = format_date(selected_date)
+
+    def summarize(substation):
+        try:
+            return {
+                'name': substation.name,
+                'station_peak_min': substation.cached_call(get_station_peak_min, substation.db_path, query_date,
+                                                           substation.station_feeder_in, substation.station_feeder_out,
+                                                           substation.station_load),
+                'incomers_peak_min': substation.cached_call(get_incomers_peak_min, substation.db_path, query_date,
+                                                            substation.incomers, substation.incomers_load),
+                'error': None
+            }
+        except Exception as exc:
+            return {'name': substation.name, 'station_peak_min': None, 'incomers_peak_min': None, 'error': str(exc)}
+
+    # Each substation has its own database, so query them concurrently
+    substations = list(get_substations().values())
+    with ThreadPoolExecutor(max_workers=max(1, len(substations))) as executor:
+        summaries = list(executor.map(summarize, substations))
+
+    return render_template(
+        "substations_summary.html",
+        selected_date=selected_date,
+        summaries=summaries
+    )
+
+# Report jobs page: submit long reports and follow their progress
+@sos_bp.route("/report-jobs", methods=["GET", "POST"])
+def report_jobs():
+    from batch_reports import REPORTS
+    from routes.report_jobs import list_jobs, submit_job
+
+    if request.method == "POST":
+        try:
+            job_id = submit_job(get_current_substation(), request.form.get("report", ""),
+                                request.form.get("start", ""), request.form.get("end", ""))
+            return redirect(url_for('sos.report_job', job_id=job_id))
+        except ValueError as exc:
+            flash(str(exc), "error")
+
+    return render_template(
+        "report_jobs.html",
+        reports=list(REPORTS),
+        jobs=list_jobs(),
+        selected_date=get_previous_date()
+    )
+
+# Report job page: progress while running, result tables when finished
+@sos_bp.route("/report-jobs/<job_id>")
+def report_job(job_id):
+    from routes.report_jobs import get_job, get_job_result
+
+    job = get_job(job_id)
+    if job is None:
+        abort(404)
+    return render_template("report_job.html", job=job, result=get_job_result(job_id))
+
+# Submits a report job: report, start and end (YYYY-MM-DD) as form or JSON fields
+@sos_bp.route("/api/jobs", methods=["POST"])
+def api_submit_job():
+    from routes.report_jobs import get_job, submit_job
+
+    fields = request.get_json(silent=True) or request.form
+    try:
+        job_id = submit_job(get_current_substation(), fields.get("report", ""), fields.get("start", ""), fields.get("end", ""))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    response = jsonify(dict(get_job(job_id), status_url=url_for('sos.api_job', job_id=job_id),
+                            events_url=url_for('sos.api_job_events', job_id=job_id),
+                            result_url=url_for('sos.api_job_result', job_id=job_id),
+                            page_url=url_for('sos.report_job', job_id=job_id)))
+    response.status_code = 202
+    response.headers['Location'] = url_for('sos.api_job', job_id=job_id)
+    return response
+
+# Job status for polling
+@sos_bp.route("/api/jobs/<job_id>")
+def api_job(job_id):
+    from routes.report_jobs import get_job
+
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': "Unknown or expired job"}), 404
+    return jsonify(job)
+
+# Job status as server-sent events, one per change, until the job finishes
+@sos_bp.route("/api/jobs/<job_id>/events")
+def api_job_events(job_id):
+    from routes.report_jobs import job_events
+
+    return Response(job_events(job_id), mimetype="text/event-stream",
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Job result tables
+@sos_bp.route("/api/jobs/<job_id>/result")
+def api_job_result(job_id):
+    from routes.report_jobs import JOB_RUNNING, get_job, get_job_result
+
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': "Unknown or expired job"}), 404
+    if job['status'] == JOB_RUNNING:
+        return jsonify({'error': "Job is still running", 'job': job}), 409
+    return jsonify(dict(job, periods=get_job_result(job_id)))
+
 # Settings route for configuring application settings
 @sos_bp.route("/settings", methods=["GET", "POST"])
 def settings():
-    db_path = get_config_database()
-    if db_path is None:
-        db_path = ""
+    substation = get_current_substation()
+    db_path = substation.db_path or ""
 
     if request.method == "POST":
         new_db_path = request.form.get("db_path", "").strip()
         # Only allow full absolute path
         if new_db_path and os.path.isabs(new_db_path):
             if is_valid_sqlite_db(new_db_path):
-                update_config_database(new_db_path)
-                current_app.config['DATABASE'] = new_db_path
+                # The first (default) substation lives in [SOSOFFLINE]
+                if substation is next(iter(get_substations().values())):
+                    update_config_database(new_db_path)
+                else:
+                    update_config_database(new_db_path, section=SUBSTATION_SECTION_PREFIX + substation.name)
+                substation.db_path = new_db_path
+                substation.results.clear()
                 flash("Database path updated!", "success")
                 return redirect(url_for('sos.settings'))
             else:
@@ -248,4 +912,32 @@ def settings():
         else:
             flash("Please enter a valid absolute database path.", "error")
 
-    return render_template("settings.html", db_path=db_path)
+    return render_template("settings.html", db_path=db_path, substation=substation)
+
+# Query plan audit of the current substation's database (settings page panel)
+@sos_bp.route("/settings/query-audit", methods=["POST"])
+def query_audit():
+    from analysis.query_audit import audit_queries
+
+    substation = get_current_substation()
+    apply = request.form.get("action") == "apply"
+    audit = None
+    try:
+        audit = audit_queries(substation.config(), apply=apply)
+        if apply:
+            created = sum(1 for index in audit['indexes'] if index['created'])
+            flash(f"{created} index(es) created.", "success")
+    except Exception as exc:
+        flash(f"Query audit failed: {exc}", "error")
+
+    return render_template("settings.html", db_path=substation.db_path or "", substation=substation, audit=audit)
+
+# Makes the substation list, current selection and its database version available to all templates
+@sos_bp.app_context_processor
+def inject_substations():
+    substation = get_current_substation()
+    return {
+        'substations': list(get_substations()),
+        'current_substation': substation.name,
+        'db_version': str(get_db_version(substation.db_path))
+    }
@@ -0,0 +1,136 @@
+"""
+Substation registry for the Substation Operating Review Flask application.
+
+Each configured substation has its own database, station load definitions
+and result cache; connection pools and master-order caches are keyed by the
+database path. The substation for a request is chosen with the `substation`
+query/form parameter and remembered in the session.
+"""
+
+from collections import OrderedDict
+import threading
+
+from flask import current_app, request, session
+
+from analysis.utils import get_db_version
+from routes.app_utils import get_config_substations
+
+# Analysis results kept per substation
+RESULT_CACHE_SIZE = 128
+
+
+class ResultCache:
+    """
+    Small thread-safe LRU cache of analysis results for one database.
+    Keys include the database version, so entries expire when the database changes.
+    """
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value for key, calling compute() and storing its result on a miss.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class Substation:
+    """
+    One configured substation: its database and station load definitions.
+    """
+
+    def __init__(self, name, db_path, station_feeder_in, station_feeder_out, incomers, station_load=None, incomers_load=None):
+        self.name = name
+        self.db_path = db_path
+        self.station_feeder_in = station_feeder_in
+        self.station_feeder_out = station_feeder_out
+        self.incomers = tuple(incomers)
+        # Load formulas (analysis.station_load); None uses feeder_in - feeder_out / sum of incomers
+        self.station_load = station_load
+        self.incomers_load = incomers_load
+        self.results = ResultCache()
+
+    def config(self):
+        """
+        Returns the substation definition as a dict, in the form of get_config_substations().
+        """
+        return {
+            'name': self.name,
+            'db_path': self.db_path,
+            'station_feeder_in': self.station_feeder_in,
+            'station_feeder_out': self.station_feeder_out,
+            'incomers': self.incomers,
+            'station_load': self.station_load,
+            'incomers_load': self.incomers_load,
+        }
+
+    def cached(self, key, compute):
+        """
+        Returns a cached analysis result for this substation's current database version.
+
+        Args:
+            key (tuple): Identifies the report and its parameters.
+            compute (callable): Computes the result on a cache miss.
+        """
+        return self.results.get_or_compute((get_db_version(self.db_path),) + tuple(key), compute)
+
+    def cached_call(self, func, *args, **kwargs):
+        """
+        Calls an analysis function through the result cache. Arguments must be hashable.
+        """
+        key = (func.__module__, func.__name__, args, tuple(sorted(kwargs.items())))
+        return self.cached(key, lambda: func(*args, **kwargs))
+
+
+def load_substations():
+    """
+    Builds the substation registry from sos_config.ini.
+
+    Returns:
+        OrderedDict: {name: Substation}, default substation first.
+    """
+    substations = OrderedDict()
+    for config in get_config_substations():
+        substations[config['name']] = Substation(**config)
+    return substations
+
+
+def get_substations():
+    """
+    Returns the registry of the running application.
+    """
+    return current_app.config['SUBSTATIONS']
+
+
+def get_current_substation():
+    """
+    Returns the substation selected for this request, falling back to the session
+    and then to the default substation.
+    """
+    substations = get_substations()
+    if len(substations) == 1:
+        # Nothing to select: the session is not touched, so responses do not vary by cookie
+        return next(iter(substations.values()))
+    name = request.values.get('substation') or session.get('substation')
+    if name not in substations:
+        name = next(iter(substations))
+    # Only a change is written, so unchanged sessions send no Set-Cookie (and Vary: Cookie)
+    if session.get('substation') != name:
+        session['substation'] = name
+    return substations[name]
@@ -1,19 +1,110 @@
 /**
  * Auto-reload functionality for date/time changes
- * Automatically refreshes data when date or time inputs change
+ * Automatically refreshes data when date or time inputs change.
+ * Recent results are cached (memory + IndexedDB) and the neighbouring
+ * slot/day/month is prefetched while the browser is idle. Cached results are
+ * keyed by the database version, so edits are never hidden by the cache, and
+ * periods that have not ended yet (readings still to come) are not cached.
  */
 
+/**
+ * Bounded cache of rendered result tables keyed by (substation, database version, page, form params).
+ * Entries live in memory and in IndexedDB (when available) for `ttl` milliseconds.
+ */
+class ResultCache {
+    constructor(maxEntries = 60, ttl = 10 * 60 * 1000) {
+        this.maxEntries = maxEntries;
+        this.ttl = ttl;
+        this.memory = new Map();
+        this.dbPromise = this.openDb();
+    }
+
+    openDb() {
+        if (!window.indexedDB) return Promise.resolve(null);
+        return new Promise(resolve => {
+            const request = indexedDB.open('sos-review-cache', 1);
+            request.onupgradeneeded = () => {
+                const store = request.result.createObjectStore('results', { keyPath: 'key' });
+                store.createIndex('stored', 'stored');
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => resolve(null);
+        });
+    }
+
+    isFresh(entry) {
+        return entry && Date.now() - entry.stored < this.ttl;
+    }
+
+    async get(key) {
+        const entry = this.memory.get(key);
+        if (this.isFresh(entry)) {
+            // Move to the end: most recently used
+            this.memory.delete(key);
+            this.memory.set(key, entry);
+            return entry.html;
+        }
+        const db = await this.dbPromise;
+        if (!db) return null;
+        const stored = await new Promise(resolve => {
+            const request = db.transaction('results').objectStore('results').get(key);
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => resolve(null);
+        });
+        if (!this.isFresh(stored)) return null;
+        this.remember(stored);
+        return stored.html;
+    }
+
+    async has(key) {
+        return this.isFresh(this.memory.get(key)) || (await this.get(key)) !== null;
+    }
+
+    remember(entry) {
+        this.memory.delete(entry.key);
+        this.memory.set(entry.key, entry);
+        while (this.memory.size > this.maxEntries) {
+            this.memory.delete(this.memory.keys().next().value);
+        }
+    }
+
+    async set(key, html) {
+        const entry = { key, html, stored: Date.now() };
+        this.remember(entry);
+        const db = await this.dbPromise;
+        if (!db) return;
+        const store = db.transaction('results', 'readwrite').objectStore('results');
+        store.put(entry);
+        // Drop the oldest entries beyond the limit
+        const count = store.count();
+        count.onsuccess = () => {
+            let excess = count.result - this.maxEntries;
+            if (excess <= 0) return;
+            store.index('stored').openCursor().onsuccess = event => {
+                const cursor = event.target.result;
+                if (cursor && excess-- > 0) {
+                    cursor.delete();
+                    cursor.continue();
+                }
+            };
+        };
+    }
+}
+
 class AutoReloadManager {
     constructor() {
         this.isLoading = false;
         this.debounceTimer = null;
         this.debounceDelay = 500; // milliseconds
+        this.cache = new ResultCache();
+        this.dbVersion = this.pageVersion(document);
         this.init();
     }
 
     init() {
         this.bindEvents();
         this.setupLoadingIndicator();
+        this.rememberCurrentPage();
     }
 
     bindEvents() {
@@ -47,33 +138,31 @@ class AutoReloadManager {
         this.debounceTimer = setTimeout(func, this.debounceDelay);
     }
 
-    reloadData() {
+    async reloadData() {
         if (this.isLoading) return;
 
-        this.isLoading = true;
-        this.showLoading();
-
         const form = document.querySelector('.review-form');
-        if (!form) {
-            this.isLoading = false;
-            this.hideLoading();
+        if (!form) return;
+
+        const params = new URLSearchParams(new FormData(form));
+        await this.refreshVersion();
+        const cached = await this.cache.get(this.cacheKey(params));
+        if (cached !== null) {
+            this.updatePageContent(cached);
+            this.schedulePrefetch(params);
             return;
         }
 
-        const formData = new FormData(form);
-        const url = window.location.pathname;
+        this.isLoading = true;
+        this.showLoading();
 
-        fetch(url, {
-            method: 'POST',
-            body: formData,
-            headers: {
-                'X-Requested-With': 'XMLHttpRequest'
+        this.fetchTables(params)
+        .then(tables => {
+            if (tables !== null) {
+                this.updatePageContent(tables);
+                this.schedulePrefetch(params);
             }
         })
-        .then(response => response.text())
-        .then(html => {
-            this.updatePageContent(html);
-        })
         .catch(error => {
             console.error('Auto-reload failed:', error);
             this.showError();
@@ -84,6 +173,135 @@ class AutoReloadManager {
         });
     }
 
+    /**
+     * Cache key of a result: substation, database version, page and form parameters.
+     */
+    cacheKey(params, version = this.dbVersion) {
+        const substation = document.querySelector('#substation');
+        return `${substation ? substation.value : ''}|${version}|${window.location.pathname}|${params.toString()}`;
+    }
+
+    pageVersion(doc) {
+        const meta = doc.querySelector('meta[name="db-version"]');
+        return meta ? meta.content : '';
+    }
+
+    /**
+     * Asks the server for the current database version, so results cached
+     * before the database changed are not served.
+     */
+    async refreshVersion() {
+        try {
+            const response = await fetch('/api/db-version');
+            if (response.ok) this.dbVersion = (await response.json()).db_version;
+        } catch (error) {
+            console.debug('Database version check failed:', error);
+        }
+    }
+
+    /**
+     * True while the slot, day or month of the form parameters has not ended:
+     * its readings may still be entered, so its result is not cached.
+     */
+    isOpenPeriod(params) {
+        const ends = [];
+        for (const field of ['date', 'end', 'compare_date']) {
+            if (!params.get(field)) continue;
+            const [year, month, day] = params.get(field).split('-').map(Number);
+            const end = new Date(year, month - 1, day + 1);
+            if (field === 'date' && params.get('time')) {
+                // End of the slot; 24:00 is the end of the day
+                const [hours, minutes] = params.get('time').split(':').map(Number);
+                end.setDate(end.getDate() - 1);
+                end.setHours(hours, minutes);
+            }
+            ends.push(end);
+        }
+        for (const field of ['month', 'compare_month']) {
+            if (!params.get(field)) continue;
+            const [year, month] = params.get(field).split('-').map(Number);
+            ends.push(params.get('span') === 'year' ? new Date(year + 1, 0, 1) : new Date(year, month, 1));
+        }
+        const now = new Date();
+        return ends.some(end => Number.isNaN(end.getTime()) || end > now);
+    }
+
+    /**
+     * Posts the form parameters to the page and caches the returned result tables.
+     */
+    async fetchTables(params) {
+        const response = await fetch(window.location.pathname, {
+            method: 'POST',
+            body: params,
+            headers: {
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        });
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const doc = new DOMParser().parseFromString(await response.text(), 'text/html');
+        const version = this.pageVersion(doc);
+        const tables = doc.querySelector('.tables-flex');
+        if (!tables) return null;
+        if (!this.isOpenPeriod(params)) this.cache.set(this.cacheKey(params, version), tables.outerHTML);
+        return tables.outerHTML;
+    }
+
+    rememberCurrentPage() {
+        const form = document.querySelector('.review-form');
+        const tables = document.querySelector('.tables-flex');
+        if (!form || !tables) return;
+        const params = new URLSearchParams(new FormData(form));
+        if (!this.isOpenPeriod(params)) this.cache.set(this.cacheKey(params), tables.outerHTML);
+        this.schedulePrefetch(params);
+    }
+
+    schedulePrefetch(params) {
+        const idle = window.requestIdleCallback || (callback => setTimeout(callback, 200));
+        idle(() => this.prefetchNeighbours(params).catch(error => console.debug('Prefetch skipped:', error)));
+    }
+
+    /**
+     * Prefetches the previous and next slot (hourly review, one batch request)
+     * or the previous and next day/month (other pages). Periods that have not
+     * ended are skipped.
+     */
+    async prefetchNeighbours(params) {
+        if (params.has('time')) {
+            const query = new URLSearchParams({ date: params.get('date'), time: params.get('time'), span: 1 });
+            const response = await fetch(`/api/em-diff?${query}`);
+            if (!response.ok) return;
+            const data = await response.json();
+            data.slots.forEach(slot => {
+                const slotParams = new URLSearchParams(params);
+                slotParams.set('date', slot.date);
+                slotParams.set('time', slot.time);
+                if (!this.isOpenPeriod(slotParams)) this.cache.set(this.cacheKey(slotParams, data.db_version), slot.html);
+            });
+            return;
+        }
+
+        const field = params.has('date') ? 'date' : (params.has('month') ? 'month' : null);
+        if (!field) return;
+        for (const step of [-1, 1]) {
+            const neighbour = new URLSearchParams(params);
+            neighbour.set(field, field === 'date' ? this.shiftDate(params.get(field), step) : this.shiftMonth(params.get(field), step));
+            if (this.isLoading || this.isOpenPeriod(neighbour) || await this.cache.has(this.cacheKey(neighbour))) continue;
+            await this.fetchTables(neighbour);
+        }
+    }
+
+    shiftDate(value, days) {
+        const date = new Date(`${value}T00:00:00Z`);
+        date.setUTCDate(date.getUTCDate() + days);
+        return date.toISOString().slice(0, 10);
+    }
+
+    shiftMonth(value, months) {
+        const [year, month] = value.split('-').map(Number);
+        const date = new Date(Date.UTC(year, month - 1 + months, 1));
+        return date.toISOString().slice(0, 7);
+    }
+
     updatePageContent(html) {
         const parser = new DOMParser();
         const doc = parser.parseFromString(html, 'text/html');
@@ -161,7 +379,14 @@ document.addEventListener('DOMContentLoaded', () => {
         window.location.pathname.includes('/mor-energy') || 
         window.location.pathname.includes('/mor-eht-tf-interruptions') || 
         window.location.pathname.includes('/mor-ht-interruptions') ||
-        window.location.pathname.includes('/abc-details')) {
+        window.location.pathname.includes('/abc-details') ||
+        window.location.pathname.includes('/tf-loading') ||
+        window.location.pathname.includes('/voltage-stats') ||
+        window.location.pathname.includes('/reliability') ||
+        window.location.pathname.includes('/cascading-outages') ||
+        window.location.pathname.includes('/unreported-outages') ||
+        window.location.pathname.includes('/data-completeness') ||
+        window.location.pathname.includes('/load-analytics')) {
         window.autoReloadManager = new AutoReloadManager();
     }
 });
@@ -0,0 +1,77 @@
+/**
+ * Report jobs: submits jobs without leaving the page and follows the progress
+ * of running jobs over server-sent events (/api/jobs/<id>/events).
+ */
+
+function updateRow(row, job) {
+    row.dataset.status = job.status;
+    row.querySelector('.job-progress').innerHTML = `<progress max="${job.total}" value="${job.done}"></progress> ${job.done}/${job.total}`;
+    const status = row.querySelector('.job-status');
+    status.textContent = job.status;
+    status.classList.toggle('flagged-value', Boolean(job.error));
+    status.title = job.error || '';
+}
+
+function followJob(row) {
+    if (row.dataset.following) return;
+    row.dataset.following = 'true';
+    const source = new EventSource(`/api/jobs/${row.dataset.job}/events`);
+    source.onmessage = event => {
+        const job = JSON.parse(event.data);
+        updateRow(row, job);
+        if (job.status !== 'running') {
+            source.close();
+            // The job page shows the result tables once the job has finished
+            if (row.dataset.reload) window.location.reload();
+        }
+    };
+    source.addEventListener('missing', () => source.close());
+    source.onerror = () => source.close();
+}
+
+function addRow(job) {
+    const tbody = document.querySelector('.jobs-table tbody');
+    const empty = tbody.querySelector('.no-jobs');
+    if (empty) empty.remove();
+
+    let row = tbody.querySelector(`tr[data-job="${job.id}"]`);
+    if (!row) {
+        row = document.createElement('tr');
+        row.dataset.job = job.id;
+        const cells = [job.substation, null, job.start, job.end, job.created];
+        cells.forEach((text, i) => {
+            const cell = document.createElement('td');
+            if (i === 1) {
+                const link = document.createElement('a');
+                link.href = job.page_url;
+                link.textContent = job.report;
+                cell.appendChild(link);
+            } else {
+                cell.textContent = text;
+            }
+            row.appendChild(cell);
+        });
+        row.insertAdjacentHTML('beforeend', '<td class="job-progress"></td><td class="job-status"></td>');
+        tbody.prepend(row);
+    }
+    updateRow(row, job);
+    return row;
+}
+
+function bindForm(form) {
+    form.addEventListener('submit', async event => {
+        event.preventDefault();
+        const response = await fetch('/api/jobs', { method: 'POST', body: new FormData(form) });
+        const job = await response.json();
+        if (!response.ok) {
+            alert(job.error);
+            return;
+        }
+        const row = addRow(job);
+        if (job.status === 'running') followJob(row);
+    });
+}
+
+document.querySelectorAll('.jobs-table tr[data-status="running"]').forEach(followJob);
+const form = document.querySelector('.job-form');
+if (form) bindForm(form);
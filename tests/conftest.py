@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import routes.db_service as db_service
+
+READING_COLUMNS = """
+    dateobserved TEXT, timeobserved TEXT, current REAL, voltage REAL,
+    emc_export REAL, emc_import REAL, mf_export REAL, mf_import REAL
+"""
+
+
+@pytest.fixture
+def sos_db(tmp_path, monkeypatch):
+    """
+    Returns the path of a small SOS Offline database with the interruption register,
+    the feeder masters and empty reading tables; sidecar stores are kept in tmp_path.
+    """
+    monkeypatch.setattr(db_service, "SIDECAR_DIR", str(tmp_path / "sos_review_data"))
+    db_path = str(tmp_path / "power-system.s3db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE intrpns (
+            slno INTEGER PRIMARY KEY, feedercode TEXT, fdrtype TEXT, started TEXT, ended TEXT,
+            datefrom TEXT, dateto TEXT, duration INTEGER, grpslno INTEGER,
+            responsibleby TEXT, belongsto TEXT, remarks TEXT, relays TEXT
+        );
+        CREATE TABLE feederehtmaster (feedercode TEXT, feederorder INTEGER);
+        CREATE TABLE feeder11kvmaster (feedercode_11 TEXT, feederorder INTEGER);
+        CREATE TABLE tfmaster (tfcode TEXT, tforder INTEGER, capacity REAL);
+        CREATE TABLE soseht (feedercode TEXT, {readings});
+        CREATE TABLE sostf (tfcode TEXT, {readings});
+        CREATE TABLE sosht (feedercode TEXT, {readings});
+        INSERT INTO feederehtmaster VALUES ('1PLPM', 1), ('1PMKJ', 2);
+        INSERT INTO feeder11kvmaster VALUES ('F1', 1), ('F2', 2);
+        INSERT INTO tfmaster VALUES ('TF1', 1, 12.5);
+    """.format(readings=READING_COLUMNS))
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def add_readings(db_path, table, rows):
+    """
+    Inserts readings given as dicts with 'code', 'dateobserved', 'timeobserved' and any
+    of the reading columns; MFs default to 1.
+    """
+    code_column = 'tfcode' if table == 'sostf' else 'feedercode'
+    conn = sqlite3.connect(db_path)
+    for row in rows:
+        row = {'mf_export': 1, 'mf_import': 1, **row}
+        columns = [code_column if column == 'code' else column for column in row]
+        conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(row))})", tuple(row.values()))
+    conn.commit()
+    conn.close()
+    touch(db_path)
+
+
+def add_interruptions(db_path, rows):
+    """
+    Inserts interruptions given as dicts of intrpns columns; dateto defaults to ended.
+    """
+    conn = sqlite3.connect(db_path)
+    for row in rows:
+        row = dict(row)
+        row.setdefault('dateto', row['ended'])
+        conn.execute(f"INSERT INTO intrpns ({', '.join(row)}) VALUES ({', '.join(['?'] * len(row))})", tuple(row.values()))
+    conn.commit()
+    conn.close()
+    touch(db_path)
+
+
+def execute(db_path, sql, params=()):
+    """
+    Runs one statement on the database and marks the file as modified.
+    """
+    conn = sqlite3.connect(db_path)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+    touch(db_path)
+
+
+def touch(db_path):
+    """
+    Moves the modification time forward, so the change is seen even within the timer resolution.
+    """
+    mtime = os.path.getmtime(db_path) + 1
+    os.utime(db_path, (mtime, mtime))
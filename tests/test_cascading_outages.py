@@ -0,0 +1,42 @@
+from analysis.cascading_outages import attribute_interruptions, get_cascading_outages
+from conftest import add_interruptions
+
+
+def outage(feedercode, fdrtype, started, ended, grpslno):
+    return {'feedercode': feedercode, 'fdrtype': fdrtype, 'started': started, 'ended': ended, 'grpslno': grpslno,
+            'belongsto': 'Un Scheduled'}
+
+
+def test_attribution_prefers_the_latest_upstream_start():
+    upstream = [{'start_minute': 0, 'end_minute': 100}, {'start_minute': 30, 'end_minute': 40}]
+    ht = [{'start_minute': -5}, {'start_minute': 35}, {'start_minute': 60}, {'start_minute': 105}, {'start_minute': 106}]
+    assert attribute_interruptions(upstream, ht, tolerance=5) == [0, 1, 0, 0, None]
+
+
+def test_ht_interruptions_follow_upstream_outages(sos_db):
+    add_interruptions(sos_db, [
+        # Started the day before the month, still open when an HT feeder tripped
+        outage('1PMKJ', 'EHT', '2025-05-31 23:00:00', '2025-06-01 01:00:00', 1),
+        outage('F1', 'HTs', '2025-06-01 00:30:00', '2025-06-01 00:40:00', 2),
+        outage('1PLPM', 'EHT', '2025-06-10 10:00:00', '2025-06-10 11:00:00', 3),
+        # Entered 3 minutes before the EHT outage and 4 minutes after it: within the tolerance
+        outage('F2', 'HTs', '2025-06-10 09:57:00', '2025-06-10 10:30:00', 4),
+        outage('F1', 'HTs', '2025-06-10 10:02:00', '2025-06-10 10:50:00', 5),
+        outage('F2', 'HTs', '2025-06-10 11:04:00', '2025-06-10 11:10:00', 6),
+        # The transformer outage started last, so it is the cause
+        outage('1PMKJ', 'EHT', '2025-06-15 07:00:00', '2025-06-15 10:00:00', 7),
+        outage('TF1', 'T/F', '2025-06-15 08:00:00', '2025-06-15 09:00:00', 8),
+        outage('F1', 'HTs', '2025-06-15 08:30:00', '2025-06-15 08:45:00', 9),
+        outage('F2', 'HTs', '2025-06-20 12:00:00', '2025-06-20 12:10:00', 10),
+    ])
+
+    result = get_cascading_outages(sos_db, '2025-06')
+    assert (result['ht_total'], result['ht_attributed'], result['ht_unattributed']) == (6, 5, 1)
+    assert [(c['code'], c['started'], [(h['code'], h['delay_minutes'], h['duration_minutes']) for h in c['ht_interruptions']])
+            for c in result['cascades']] == [
+        ('1PMKJ', '2025-05-31 23:00:00', [('F1', 90, 10)]),
+        ('1PLPM', '2025-06-10 10:00:00', [('F2', -3, 33), ('F1', 2, 48), ('F2', 64, 6)]),
+        ('TF1', '2025-06-15 08:00:00', [('F1', 30, 15)]),
+    ]
+    assert [(s['code'], s['outages'], s['cascading_outages'], s['ht_interruptions'], s['ht_minutes'])
+            for s in result['sources']] == [('1PLPM', 1, 1, 3, 87), ('1PMKJ', 2, 1, 1, 10), ('TF1', 1, 1, 1, 15)]
@@ -0,0 +1,29 @@
+from analysis.daily_review import get_daily_em_diff_stat
+from conftest import add_readings
+from utils.slot_calendar import HOURLY_TIMES
+
+
+def hourly_readings(code, query_date, previous_date, import_steps):
+    """
+    Readings of one feeder: 24:00 of the previous day, then one reading per hour
+    whose import register advances by the given steps.
+    """
+    emc_import = 1000.0
+    rows = [{'code': code, 'dateobserved': previous_date, 'timeobserved': '24:00', 'current': 100.0,
+             'emc_export': 500.0, 'emc_import': emc_import}]
+    for time, step in zip(HOURLY_TIMES, import_steps):
+        emc_import = round(emc_import + step, 2)
+        rows.append({'code': code, 'dateobserved': query_date, 'timeobserved': time, 'current': 100.0,
+                     'emc_export': 500.0, 'emc_import': emc_import})
+    return rows
+
+
+def test_outliers_stay_in_daily_max(sos_db):
+    steps = [1.0 + 0.01 * (i % 3) for i in range(24)]
+    steps[12] = 30.0  # a real load peak, far outside the rolling median
+    add_readings(sos_db, 'sosht', hourly_readings('F1', '10-06-2025', '09-06-2025', steps))
+
+    [row] = get_daily_em_diff_stat(sos_db, '10-06-2025')
+    assert {'time': HOURLY_TIMES[12], 'channel': 'import', 'flag': 'outlier'} in row['flagged']
+    assert row['max_delta_emc_import'] == 30.0
+    assert row['time_max_delta_emc_import'] == HOURLY_TIMES[12]
@@ -0,0 +1,42 @@
+from analysis.data_completeness import get_data_completeness
+from conftest import add_readings
+from utils.slot_calendar import ALLOWED_TIMES
+
+
+def day_readings(code, date, times, current=100.0):
+    return [{'code': code, 'dateobserved': date, 'timeobserved': time, 'current': current} for time in times]
+
+
+def test_missing_duplicate_and_conflicting_slots(sos_db):
+    add_readings(sos_db, 'sosht', day_readings('F1', '01-06-2025', ALLOWED_TIMES))
+    add_readings(sos_db, 'sosht', day_readings('F2', '01-06-2025', [t for t in ALLOWED_TIMES if t != '10:00']))
+    # 11:00 entered again with the same values, 12:00 with a different current
+    add_readings(sos_db, 'sosht', day_readings('F2', '01-06-2025', ['11:00']) + day_readings('F2', '01-06-2025', ['12:00'], 90.0))
+
+    result = get_data_completeness(sos_db, ['01-06-2025', '02-06-2025'])
+    assert result['empty_dates'] == ['02-06-2025']
+    f1, f2 = result['codes']
+    assert (f1['code'], f1['present'], f1['missing'], f1['complete_days'], f1['completeness_percent']) == \
+        ('F1', len(ALLOWED_TIMES), 0, 1, 100.0)
+    assert (f2['code'], f2['missing'], f2['duplicates'], f2['conflicts'], f2['extra_rows']) == ('F2', 1, 2, 1, 2)
+    assert result['issues'] == [{'code': 'F2', 'date': '01-06-2025', 'missing': ['10:00'], 'all_missing': False,
+                                 'duplicates': ['11:00', '12:00'], 'conflicts': ['12:00']}]
+
+
+def test_codes_without_readings_and_outside_the_master(sos_db):
+    add_readings(sos_db, 'sosht', day_readings('F9', '01-06-2025', ALLOWED_TIMES[:2]))
+
+    result = get_data_completeness(sos_db, ['01-06-2025'])
+    assert [entry['code'] for entry in result['codes']] == ['F1', 'F2', 'F9']
+    assert result['codes'][0]['present'] == 0
+    assert result['issues'][0] == {'code': 'F1', 'date': '01-06-2025', 'missing': list(ALLOWED_TIMES), 'all_missing': True,
+                                   'duplicates': [], 'conflicts': []}
+
+
+def test_day_rescanned_after_new_readings(sos_db):
+    times = [t for t in ALLOWED_TIMES if t != '10:00']
+    add_readings(sos_db, 'sosht', day_readings('F1', '01-06-2025', times) + day_readings('F2', '01-06-2025', ALLOWED_TIMES))
+    assert get_data_completeness(sos_db, ['01-06-2025'])['codes'][0]['missing'] == 1
+
+    add_readings(sos_db, 'sosht', day_readings('F1', '01-06-2025', ['10:00']))
+    assert get_data_completeness(sos_db, ['01-06-2025'])['issues'] == []
@@ -0,0 +1,45 @@
+from analysis.energy_balance import get_energy_balance
+from conftest import add_readings
+from utils.slot_calendar import HOURLY_TIMES
+
+# Hourly register steps of each side: 12 units in, 11.5 through the transformer, 11 out
+STEPS = {('soseht', '1PLPM'): 12.0, ('sostf', 'TF1'): 11.5, ('sosht', 'F1'): 11.0}
+
+
+def balance_readings(table, code, step, skip=()):
+    """
+    Readings of one code at 24:00 of 31-05-2025 and every hour of 01-06-2025 whose
+    energy register (import for EHT and T/F, export for HT) advances by step.
+    """
+    channel = 'emc_export' if table == 'sosht' else 'emc_import'
+    other = 'emc_import' if table == 'sosht' else 'emc_export'
+    slots = [('31-05-2025', '24:00')] + [('01-06-2025', time) for time in HOURLY_TIMES]
+    return [{'code': code, 'dateobserved': date, 'timeobserved': time, 'current': 100.0,
+             channel: 1000.0 + i * step, other: 100.0}
+            for i, (date, time) in enumerate(slots) if time not in skip]
+
+
+def test_balance_of_complete_hours(sos_db):
+    for (table, code), step in STEPS.items():
+        add_readings(sos_db, table, balance_readings(table, code, step))
+
+    balance = get_energy_balance(sos_db, '2025-06')
+    hour = balance['hourly'][0]
+    assert (hour['date'], hour['time']) == ('01-06-2025', '01:00')
+    assert (hour['eht_net'], hour['tf_energy'], hour['ht_outgoing']) == (12.0, 11.5, 11.0)
+    assert hour['transformation_loss'] == 0.5
+    assert hour['loss_percent'] == round(1 / 12 * 100, 2)
+    assert balance['monthly']['eht_net'] == 12.0 * 24
+    assert balance['monthly']['excluded_readings'] == 0
+
+
+def test_delta_over_missing_hour_is_excluded(sos_db):
+    for (table, code), step in STEPS.items():
+        skip = ('05:00',) if table == 'sosht' else ()
+        add_readings(sos_db, table, balance_readings(table, code, step, skip))
+
+    hourly = {row['time']: row for row in get_energy_balance(sos_db, '2025-06')['hourly']}
+    # 06:00 follows a missing 05:00 reading: its delta spans two hours and is not booked to 06:00
+    assert hourly['06:00']['ht_outgoing'] is None
+    assert hourly['06:00']['excluded_readings'] == 1
+    assert hourly['07:00']['ht_outgoing'] == 11.0
@@ -0,0 +1,46 @@
+import analysis.interruption_rollups as interruption_rollups
+from analysis.interruption_rollups import get_interruption_events, refresh_interruption_rollups
+from analysis.interruption_search import refresh_search_index
+from analysis.reliability import refresh_reliability_events
+from conftest import add_interruptions, execute
+
+INTERRUPTIONS = [
+    {'feedercode': '1PLPM', 'fdrtype': 'EHT', 'started': '2025-06-03 10:00:00', 'ended': '2025-06-03 10:30:00',
+     'duration': 30, 'grpslno': 1, 'responsibleby': 'KSEBL', 'belongsto': 'Scheduled', 'remarks': 'Maintenance', 'relays': ''},
+    {'feedercode': '1PLPM', 'fdrtype': 'EHT', 'started': '2025-06-05 14:00:00', 'ended': '2025-06-05 14:20:00',
+     'duration': 20, 'grpslno': 2, 'responsibleby': 'KSEBL', 'belongsto': 'Un Scheduled', 'remarks': 'Line fault', 'relays': 'O/C'},
+]
+
+
+def test_rollup_refreshes_after_same_length_edit(sos_db):
+    add_interruptions(sos_db, INTERRUPTIONS)
+    assert [row['feedercode'] for row in get_interruption_events(sos_db, '2025-06', 'EHT')] == ['1PLPM', '1PLPM']
+
+    # Same length, same totals: only the content differs
+    execute(sos_db, "UPDATE intrpns SET feedercode = '1PMKJ' WHERE grpslno = 1")
+    assert refresh_interruption_rollups(sos_db) == ['2025-06']
+    assert [row['feedercode'] for row in get_interruption_events(sos_db, '2025-06', 'EHT')] == ['1PMKJ', '1PLPM']
+
+
+def test_rollup_keeps_unchanged_months(sos_db):
+    add_interruptions(sos_db, INTERRUPTIONS)
+    refresh_interruption_rollups(sos_db)
+
+    add_interruptions(sos_db, [dict(INTERRUPTIONS[0], started='2025-07-01 09:00:00', ended='2025-07-01 09:10:00', grpslno=3)])
+    assert refresh_interruption_rollups(sos_db) == ['2025-07']
+
+
+def test_months_hashed_once_per_version(sos_db, monkeypatch):
+    scans = []
+    month_signatures = interruption_rollups.month_signatures
+    monkeypatch.setattr(interruption_rollups, 'month_signatures', lambda conn: scans.append(1) or month_signatures(conn))
+    add_interruptions(sos_db, INTERRUPTIONS)
+
+    for refresh in (refresh_interruption_rollups, refresh_search_index, refresh_reliability_events):
+        refresh(sos_db)
+    assert len(scans) == 1
+
+    execute(sos_db, "UPDATE intrpns SET remarks = 'Tree fall' WHERE grpslno = 2")
+    for refresh in (refresh_interruption_rollups, refresh_search_index, refresh_reliability_events):
+        refresh(sos_db)
+    assert len(scans) == 2
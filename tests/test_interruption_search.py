@@ -0,0 +1,17 @@
+from analysis.interruption_search import refresh_search_index, search_interruptions
+from conftest import add_interruptions, execute
+
+
+def test_search_index_refreshes_after_same_length_edit(sos_db):
+    add_interruptions(sos_db, [
+        {'feedercode': 'F1', 'fdrtype': 'HTs', 'started': '2025-06-03 10:00:00', 'ended': '2025-06-03 10:30:00',
+         'duration': 30, 'grpslno': 1, 'responsibleby': 'KSEBL', 'belongsto': 'Un Scheduled',
+         'remarks': 'Tree touching', 'relays': 'E/F'},
+    ])
+    assert search_interruptions(sos_db, 'touching')['total'] == 1
+
+    # Same length, same totals: only the content differs
+    execute(sos_db, "UPDATE intrpns SET remarks = 'Tree trimming' WHERE slno = 1")
+    assert refresh_search_index(sos_db) == ['2025-06']
+    assert search_interruptions(sos_db, 'touching')['total'] == 0
+    assert search_interruptions(sos_db, 'trimming')['total'] == 1
@@ -0,0 +1,55 @@
+from analysis.load_analytics import get_load_analytics
+from conftest import add_readings
+from utils.slot_calendar import ALLOWED_TIMES
+
+# Station load (1PLPM - 1PMKJ): 100 with a morning bump and an evening peak
+LOADS = {'06:00': 150.0, '19:00': 200.0, '20:00': 190.0}
+
+
+def station_readings(date, loads, skip=()):
+    rows = []
+    for time in ALLOWED_TIMES:
+        if time in skip:
+            continue
+        rows.append({'code': '1PLPM', 'dateobserved': date, 'timeobserved': time, 'current': loads.get(time, 100.0) + 20.0})
+        rows.append({'code': '1PMKJ', 'dateobserved': date, 'timeobserved': time, 'current': 20.0})
+    return rows
+
+
+def test_daily_peaks_and_ramps(sos_db):
+    add_readings(sos_db, 'soseht', station_readings('01-06-2025', LOADS))
+
+    result = get_load_analytics(sos_db, ['01-06-2025'], '1PLPM - 1PMKJ')
+    [day] = result['days']
+    assert (day['peak'], day['peak_time'], day['min'], day['min_time']) == (200.0, '19:00', 100.0, '01:00')
+    assert (day['average'], day['load_factor']) == (round(3340 / 31, 2), 53.9)
+    # Half an hour from 100 to 200 and back
+    assert (day['ramp_up'], day['ramp_up_time'], day['ramp_down'], day['ramp_down_time']) == (200.0, '19:00', -200.0, '19:30')
+    assert day['hours_near_peak'] == 2
+    assert (day['morning_peak'], day['morning_peak_time'], day['evening_peak'], day['evening_peak_time']) == \
+        (150.0, '06:00', 200.0, '19:00')
+    assert result['profile'][ALLOWED_TIMES.index('19:00')] == 200.0
+
+
+def test_range_summary_and_gaps(sos_db):
+    add_readings(sos_db, 'soseht', station_readings('01-06-2025', LOADS))
+    # 19:00 not entered on the second day: the ramp runs from 18:30 to 19:30
+    add_readings(sos_db, 'soseht', station_readings('02-06-2025', {'19:30': 220.0}, skip=('19:00',)))
+
+    result = get_load_analytics(sos_db, ['01-06-2025', '02-06-2025', '03-06-2025'], '1PLPM - 1PMKJ')
+    second, third = result['days'][1:]
+    assert (second['ramp_up'], second['ramp_up_time']) == (120.0, '19:30')
+    assert third['peak'] is None and third['hours_near_peak'] == 0
+    summary = result['summary']
+    assert (summary['peak'], summary['peak_date'], summary['peak_time']) == (220.0, '02-06-2025', '19:30')
+    assert (summary['ramp_up'], summary['ramp_up_date']) == (200.0, '01-06-2025')
+    assert summary['average_evening_peak'] == 210.0
+    assert summary['hours_near_peak'] == 1
+
+
+def test_days_rescanned_after_new_readings(sos_db):
+    add_readings(sos_db, 'soseht', station_readings('01-06-2025', {}, skip=('19:00',)))
+    assert get_load_analytics(sos_db, ['01-06-2025'], '1PLPM - 1PMKJ')['days'][0]['peak'] == 100.0
+
+    add_readings(sos_db, 'soseht', [row for row in station_readings('01-06-2025', LOADS) if row['timeobserved'] == '19:00'])
+    assert get_load_analytics(sos_db, ['01-06-2025'], '1PLPM - 1PMKJ')['days'][0]['peak'] == 200.0
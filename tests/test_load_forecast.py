@@ -0,0 +1,46 @@
+import pytest
+from analysis.load_forecast import HISTORY_DAYS, get_peak_forecast
+from conftest import add_readings
+from utils.slot_calendar import ALLOWED_TIMES, date_from_day_number, day_number
+
+TARGET = '01-08-2025'
+# Daily profile: evening peak at 19:00
+PROFILE = [100.0 + 60.0 * (time == '19:00') + 30.0 * (time in ('18:30', '19:30')) + i for i, time in enumerate(ALLOWED_TIMES)]
+
+
+def history(days, growth):
+    """
+    Readings of 1PLPM on the days before TARGET: PROFILE rising by growth per day.
+    """
+    target = day_number(TARGET)
+    return [{'code': '1PLPM', 'dateobserved': date_from_day_number(target - back), 'timeobserved': time,
+             'current': round(load + growth * (days - back), 2)}
+            for back in range(1, days + 1) for time, load in zip(ALLOWED_TIMES, PROFILE)]
+
+
+def test_forecast_follows_the_trend(sos_db):
+    add_readings(sos_db, 'soseht', history(HISTORY_DAYS + 7, 0.5))
+
+    forecast = get_peak_forecast(sos_db, TARGET, '1PLPM')
+    peak = PROFILE[ALLOWED_TIMES.index('19:00')]
+    assert (forecast['weekday'], forecast['peak_time']) == ('Friday', '19:00')
+    assert forecast['peak'] == pytest.approx(peak + 0.5 * (HISTORY_DAYS + 7), abs=0.01)
+    assert forecast['training_days'] == HISTORY_DAYS
+    assert forecast['peak_error'] == 0.0
+    assert (forecast['previous_peak'], forecast['previous_peak_time']) == (peak + 0.5 * (HISTORY_DAYS + 6), '19:00')
+    assert forecast['week_ago_peak'] == peak + 0.5 * HISTORY_DAYS
+
+
+def test_short_history_falls_back_to_the_lags(sos_db):
+    add_readings(sos_db, 'soseht', history(7, 0.0))
+
+    forecast = get_peak_forecast(sos_db, TARGET, '1PLPM')
+    assert forecast['training_days'] == 0
+    assert forecast['peak_error'] is None
+    assert (forecast['peak'], forecast['peak_time']) == (PROFILE[ALLOWED_TIMES.index('19:00')], '19:00')
+
+
+def test_no_history(sos_db):
+    forecast = get_peak_forecast(sos_db, TARGET, '1PLPM')
+    assert (forecast['peak'], forecast['peak_time'], forecast['previous_peak']) == (None, None, None)
+    assert forecast['profile'] == [None] * len(ALLOWED_TIMES)
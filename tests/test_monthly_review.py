@@ -0,0 +1,51 @@
+import sqlite3
+
+from analysis.monthly_review import get_ht_monthly_interruptions_summary
+from conftest import add_interruptions
+
+
+def baseline_summary(db_path, year_month):
+    """
+    The summary computed directly from intrpns: groups and durations per (feeder, belongsto).
+    """
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("""
+        WITH grouped AS (
+            SELECT feedercode, belongsto, grpslno, SUM(duration) AS group_duration
+            FROM intrpns
+            WHERE strftime('%Y-%m', started) = ? AND fdrtype = 'HTs'
+            GROUP BY feedercode, belongsto, grpslno
+        )
+        SELECT feedercode, belongsto, COUNT(*), SUM(group_duration)
+        FROM grouped
+        GROUP BY feedercode, belongsto
+    """, (year_month,)).fetchall()
+    conn.close()
+    result = {}
+    for feedercode, belongsto, count, duration in rows:
+        entry = result.setdefault(feedercode, {'feedercode': feedercode, 'scheduled_duration': 0, 'unscheduled_duration': 0,
+                                               'scheduled_count': 0, 'unscheduled_count': 0})
+        kind = 'scheduled' if belongsto == 'Scheduled' else 'unscheduled'
+        entry[f'{kind}_duration'] = duration
+        entry[f'{kind}_count'] = count
+    return result
+
+
+def interruption(feedercode, started, ended, duration, grpslno, responsibleby, belongsto='Un Scheduled'):
+    return {'feedercode': feedercode, 'fdrtype': 'HTs', 'started': started, 'ended': ended, 'duration': duration,
+            'grpslno': grpslno, 'responsibleby': responsibleby, 'belongsto': belongsto, 'remarks': '', 'relays': ''}
+
+
+def test_ht_summary_counts_groups_across_responsibleby(sos_db):
+    add_interruptions(sos_db, [
+        # One outage entered over two days, each row with a different responsibleby
+        interruption('F1', '2025-06-03 23:00:00', '2025-06-03 23:59:00', 59, 1, 'KSEBL'),
+        interruption('F1', '2025-06-04 00:00:00', '2025-06-04 00:30:00', 30, 1, 'Others'),
+        interruption('F1', '2025-06-10 08:00:00', '2025-06-10 09:00:00', 60, 2, 'KSEBL', 'Scheduled'),
+        interruption('F2', '2025-06-11 08:00:00', '2025-06-11 08:10:00', 10, None, 'KSEBL'),
+        interruption('F2', '2025-06-12 08:00:00', '2025-06-12 08:20:00', 20, None, 'Others'),
+    ])
+
+    summary = {row['feedercode']: row for row in get_ht_monthly_interruptions_summary(sos_db, '2025-06')}
+    assert summary['F1']['unscheduled_count'] == 1
+    assert summary == baseline_summary(sos_db, '2025-06')
@@ -0,0 +1,57 @@
+from analysis.reliability import get_outage_events, get_reliability_indices
+from conftest import add_interruptions, execute
+
+
+def outage(feedercode, started, ended, grpslno, belongsto='Un Scheduled'):
+    return {'feedercode': feedercode, 'fdrtype': 'EHT', 'started': started, 'ended': ended, 'grpslno': grpslno,
+            'responsibleby': 'KSEBL', 'belongsto': belongsto, 'remarks': '', 'relays': ''}
+
+
+INTERRUPTIONS = [
+    # One outage entered as a row per day
+    outage('1PLPM', '2025-06-03 23:00:00', '2025-06-04 00:00:00', 1),
+    outage('1PLPM', '2025-06-04 00:00:00', '2025-06-04 01:00:00', 1),
+    outage('1PLPM', '2025-06-10 10:00:00', '2025-06-10 10:30:00', 2, 'Scheduled'),
+    # Entered twice under two groups: one outage from 10:00 to 11:30
+    outage('1PMKJ', '2025-06-20 10:00:00', '2025-06-20 11:00:00', 3),
+    outage('1PMKJ', '2025-06-20 10:30:00', '2025-06-20 11:30:00', 4),
+    # Runs into July: only its first hour falls in June
+    outage('1PMKJ', '2025-06-30 23:00:00', '2025-07-01 01:00:00', 5),
+]
+
+
+def test_events_are_reconstructed(sos_db):
+    add_interruptions(sos_db, INTERRUPTIONS)
+    events = get_outage_events(sos_db, '2025-06-01', '2025-06-30')
+    assert [(e['feedercode'], e['started'], e['ended'], e['row_count']) for e in events] == [
+        ('1PLPM', '2025-06-03 23:00:00', '2025-06-04 01:00:00', 2),
+        ('1PLPM', '2025-06-10 10:00:00', '2025-06-10 10:30:00', 1),
+        ('1PMKJ', '2025-06-20 10:00:00', '2025-06-20 11:30:00', 2),
+        ('1PMKJ', '2025-06-30 23:00:00', '2025-07-01 01:00:00', 1),
+    ]
+
+
+def test_reliability_indices(sos_db):
+    add_interruptions(sos_db, INTERRUPTIONS)
+    indices = get_reliability_indices(sos_db, '2025-06-01', '2025-06-30', 'EHT')
+
+    plpm, pmkj = indices['feeders']
+    assert (plpm['code'], plpm['interruptions'], plpm['scheduled'], plpm['interrupted_minutes']) == ('1PLPM', 2, 1, 150)
+    assert (plpm['average_minutes'], plpm['longest_minutes']) == (75.0, 120)
+    assert (pmkj['code'], pmkj['interruptions'], pmkj['interrupted_minutes']) == ('1PMKJ', 2, 150)
+    assert (pmkj['average_minutes'], pmkj['longest_minutes']) == (105.0, 120)
+    assert (indices['period_minutes'], indices['interruptions'], indices['interrupted_minutes']) == (43200, 4, 300)
+    assert (indices['saifi'], indices['saidi'], indices['caidi'], indices['asai']) == (2.0, 150.0, 75.0, 99.653)
+
+    # July gets the rest of the outage but not the interruption
+    july = get_reliability_indices(sos_db, '2025-07-01', '2025-07-31', 'EHT')
+    assert (july['interruptions'], july['interrupted_minutes']) == (0, 60)
+
+
+def test_indices_follow_edits(sos_db):
+    add_interruptions(sos_db, INTERRUPTIONS)
+    assert get_reliability_indices(sos_db, '2025-06-01', '2025-06-30', 'EHT')['interruptions'] == 4
+
+    execute(sos_db, "DELETE FROM intrpns WHERE grpslno = 2")
+    indices = get_reliability_indices(sos_db, '2025-06-01', '2025-06-30', 'EHT')
+    assert (indices['interruptions'], indices['interrupted_minutes']) == (3, 270)
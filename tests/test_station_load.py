@@ -0,0 +1,133 @@
+import sqlite3
+
+import pytest
+from analysis.hourly_review import get_station_load
+from analysis.station_load import get_load_peak_min, get_load_series, parse_formula
+from conftest import add_readings
+from utils.slot_calendar import ALLOWED_TIMES
+
+
+def evaluate(spec, *currents):
+    """
+    Evaluates the SQL of a formula with its codes' currents bound to c0, c1, ...
+    """
+    formula = parse_formula(spec)
+    columns = ', '.join(f"? AS c{i}" for i in range(len(currents)))
+    return sqlite3.connect(':memory:').execute(f"SELECT {formula.sql} FROM (SELECT {columns})", currents).fetchone()[0]
+
+
+def eht_readings(currents):
+    """
+    Readings of 01-06-2025 from {(code, time): current}.
+    """
+    return [{'code': code, 'dateobserved': '01-06-2025', 'timeobserved': time, 'current': current}
+            for (code, time), current in currents.items()]
+
+
+def test_parse_formula():
+    formula = parse_formula('load = 1PLPM - "INCOMER I" * 2 + 1PLPM; missing=zero; negative=keep')
+    assert formula.name == 'load'
+    assert formula.text == '1PLPM - "INCOMER I" * 2 + 1PLPM'
+    assert formula.codes == ('1PLPM', 'INCOMER I')
+    assert (formula.missing, formula.negative) == ('zero', 'keep')
+
+    default = parse_formula("'INCOMER II'")
+    assert (default.name, default.codes) == (None, ('INCOMER II',))
+    assert (default.missing, default.negative) == ('null', 'missing')
+
+
+@pytest.mark.parametrize('spec', [
+    '1PLPM -',
+    '(1PLPM - 1PMKJ',
+    '1PLPM - 1PMKJ)',
+    '1PLPM 1PMKJ',
+    '1PLPM $ 1PMKJ',
+    '2 + 3',
+    '',
+    '1PLPM; missing=maybe',
+    '1PLPM; negative=drop',
+    '1PLPM; spare=1',
+])
+def test_malformed_formulas(spec):
+    with pytest.raises(ValueError):
+        parse_formula(spec)
+
+
+def test_operators_and_precedence():
+    assert evaluate('A - B * 2', 10, 3) == 4
+    assert evaluate('(A - B) * 2', 10, 3) == 14
+    assert evaluate('-A + B', 10, 3) == -7
+    assert evaluate('A / B', 10, 4) == 2.5
+    # Division by zero gives a missing load
+    assert evaluate('A / B', 10, 0) is None
+
+
+def test_missing_and_negative_rules():
+    assert evaluate('A + B', 10, None) is None
+    assert evaluate('A + B; missing=zero', 10, None) == 10
+    assert evaluate('A + B', 10, -2) is None
+    assert evaluate('A + B; negative=zero', 10, -2) == 10
+    assert evaluate('A + B; negative=keep', 10, -2) == 8
+    # A negative current is missing first, then counted as 0
+    assert evaluate('A + B; missing=zero', 10, -2) == 10
+
+
+def test_formulas_share_the_pivot(sos_db):
+    add_readings(sos_db, 'soseht', eht_readings({('1PLPM', '01:00'): 50.0, ('1PMKJ', '01:00'): 20.0,
+                                                 ('1PLPM', '02:00'): 60.0, ('1PMKJ', '02:00'): 10.0}))
+    # The codes appear in opposite order, so each formula's columns are remapped onto the shared pivot
+    result = get_load_peak_min(sos_db, ['01-06-2025'], {'in_out': '1PLPM - 1PMKJ', 'out_in': '1PMKJ - 1PLPM',
+                                                         'out': '1PMKJ'})['01-06-2025']
+    assert result['in_out'] == {'peak': 50.0, 'peak_time': '02:00', 'min': 30.0, 'min_time': '01:00'}
+    assert result['out_in'] == {'peak': -30.0, 'peak_time': '01:00', 'min': -50.0, 'min_time': '02:00'}
+    assert result['out'] == {'peak': 20.0, 'peak_time': '01:00', 'min': 10.0, 'min_time': '02:00'}
+
+
+def test_peak_min_ties_go_to_earliest_time(sos_db):
+    currents = {'01:00': 40.0, '02:00': 70.0, '03:00': 25.0, '04:00': 70.0, '05:00': 25.0}
+    add_readings(sos_db, 'soseht', eht_readings({('1PLPM', time): current for time, current in currents.items()}))
+
+    result = get_load_peak_min(sos_db, ['01-06-2025', '02-06-2025'], {'load': '1PLPM'})
+    assert result['01-06-2025']['load'] == {'peak': 70.0, 'peak_time': '02:00', 'min': 25.0, 'min_time': '03:00'}
+    assert result['02-06-2025']['load'] == {'peak': None, 'peak_time': None, 'min': None, 'min_time': None}
+
+
+def baseline_station_load(date_str, time_str, db_path, feeder_in='1PLPM', feeder_out='1PMKJ'):
+    """
+    get_station_load as it was before the formula engine.
+    """
+    conn = sqlite3.connect(db_path)
+    rows = dict(conn.execute("""
+        SELECT feedercode, current FROM soseht
+        WHERE dateobserved = ? AND timeobserved = ? AND feedercode IN (?, ?)
+    """, (date_str, time_str, feeder_in, feeder_out)).fetchall())
+    conn.close()
+    if feeder_in in rows and feeder_out in rows:
+        if rows[feeder_in] < 0:
+            return rows[feeder_out]
+        elif rows[feeder_out] < 0:
+            return rows[feeder_in]
+        return rows[feeder_in] - rows[feeder_out]
+    return None
+
+
+def test_station_load_matches_baseline(sos_db):
+    currents = {}
+    for i, time in enumerate(ALLOWED_TIMES):
+        currents[('1PLPM', time)] = 80.0 + i % 7 * 3.5
+        currents[('1PMKJ', time)] = 20.0 + i % 5 * 2.0
+    # A slot without the outgoing feeder's reading: missing in both
+    del currents[('1PMKJ', '10:00')]
+    add_readings(sos_db, 'soseht', eht_readings(currents))
+
+    for time in ALLOWED_TIMES:
+        assert get_station_load('01-06-2025', time, sos_db) == baseline_station_load('01-06-2025', time, sos_db)
+    assert get_station_load('01-06-2025', '10:00', sos_db) is None
+    assert len(get_load_series(sos_db, ['01-06-2025'], '1PLPM - 1PMKJ')) == len(ALLOWED_TIMES)
+
+
+def test_negative_current_makes_station_load_missing(sos_db):
+    add_readings(sos_db, 'soseht', eht_readings({('1PLPM', '01:00'): -1.0, ('1PMKJ', '01:00'): 20.0}))
+    # The old fallback returned the other feeder's current; the load now follows the daily peak/min rule
+    assert baseline_station_load('01-06-2025', '01:00', sos_db) == 20.0
+    assert get_station_load('01-06-2025', '01:00', sos_db) is None
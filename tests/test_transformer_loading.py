@@ -0,0 +1,50 @@
+import math
+
+from analysis.transformer_loading import get_transformer_loading
+from conftest import add_readings
+from utils.slot_calendar import ALLOWED_TIMES
+
+# TF1 is rated 12.5 MVA in the fixture
+CAPACITY_KVA = 12500.0
+
+
+def amps(loading, kv=11.0):
+    """
+    Current giving a loading (%) of TF1.
+    """
+    return loading / 100 * CAPACITY_KVA / (math.sqrt(3) * kv)
+
+
+def day_readings(code, date, loadings, voltage=11.0):
+    return [{'code': code, 'dateobserved': date, 'timeobserved': time, 'voltage': voltage,
+             'current': round(amps(loadings.get(time, 50.0)), 3)} for time in ALLOWED_TIMES]
+
+
+def test_loading_hours_and_overloads(sos_db):
+    # Overloaded from 23:00 to 01:00 across midnight, and again at 10:00
+    add_readings(sos_db, 'sostf', day_readings('TF1', '01-06-2025', {'23:00': 110.0, '24:00': 120.0, '18:30': 85.0}))
+    add_readings(sos_db, 'sostf', day_readings('TF1', '02-06-2025', {'01:00': 105.0, '10:00': 101.0, '11:00': 90.0}))
+
+    [tf] = get_transformer_loading(sos_db, '2025-06')['transformers']
+    assert (tf['code'], tf['capacity']) == ('TF1', 12.5)
+    assert (tf['peak'], tf['peak_date'], tf['peak_time']) == (120.0, '01-06-2025', '24:00')
+    assert tf['heatmap'][0][ALLOWED_TIMES.index('01:00')] == 50.0
+    assert tf['heatmap'][2] == [None] * len(ALLOWED_TIMES)
+    # Half-hourly 18:30 is in the heatmap but not counted in hours
+    assert tf['hours_above_threshold'] == 5
+    assert (tf['overload_hours'], tf['overload_events'], tf['longest_overload_hours']) == (4, 2, 3)
+
+
+def test_invalid_voltage_and_current(sos_db):
+    rows = day_readings('TF1', '01-06-2025', {})
+    rows[0]['voltage'] = 0.0
+    rows[1]['current'] = -5.0
+    # Not rated in tfmaster
+    rows += day_readings('TF9', '01-06-2025', {})
+    add_readings(sos_db, 'sostf', rows)
+
+    tf1, tf9 = get_transformer_loading(sos_db, '2025-06')['transformers']
+    # A reading without a voltage is taken at 11 kV; a negative current is left out
+    assert tf1['heatmap'][0][:2] == [50.0, None]
+    assert tf1['average'] == 50.0
+    assert (tf9['code'], tf9['capacity'], tf9['peak']) == ('TF9', None, None)
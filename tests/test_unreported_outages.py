@@ -0,0 +1,40 @@
+from analysis.unreported_outages import get_unreported_outages
+from conftest import add_interruptions, add_readings
+from utils.slot_calendar import ALLOWED_TIMES
+
+
+def day_readings(code, zero_times):
+    return [{'code': code, 'dateobserved': '01-06-2025', 'timeobserved': time,
+             'current': 0.0 if time in zero_times else 100.0} for time in ALLOWED_TIMES]
+
+
+def test_zero_runs_without_an_interruption(sos_db):
+    # F1: a recorded outage and a single zero reading; F2: two runs nobody recorded
+    add_readings(sos_db, 'sosht', day_readings('F1', ('10:00', '11:00', '18:00')))
+    add_readings(sos_db, 'sosht', day_readings('F2', ('01:00', '02:00', '14:00', '15:00', '16:00')))
+    add_interruptions(sos_db, [
+        {'feedercode': 'F1', 'fdrtype': 'HTs', 'started': '2025-06-01 09:30:00', 'ended': '2025-06-01 11:30:00',
+         'grpslno': 1, 'belongsto': 'Un Scheduled'},
+        # Another feeder's interruption does not explain F2's run
+        {'feedercode': 'F1', 'fdrtype': 'HTs', 'started': '2025-06-01 14:10:00', 'ended': '2025-06-01 14:50:00',
+         'grpslno': 2, 'belongsto': 'Un Scheduled'},
+    ])
+
+    result = get_unreported_outages(sos_db, '2025-06')
+    assert (result['runs'], result['recorded']) == (3, 1)
+    assert result['gaps'] == [
+        {'code': 'F2', 'first_date': '01-06-2025', 'first_time': '01:00', 'last_date': '01-06-2025', 'last_time': '02:00',
+         'readings': 2, 'after': None, 'before': '01-06-2025 03:00'},
+        {'code': 'F2', 'first_date': '01-06-2025', 'first_time': '14:00', 'last_date': '01-06-2025', 'last_time': '16:00',
+         'readings': 3, 'after': '01-06-2025 13:00', 'before': '01-06-2025 17:00'},
+    ]
+    assert result['codes'] == [{'code': 'F1', 'runs': 1, 'gaps': 0, 'zero_readings': 3},
+                               {'code': 'F2', 'runs': 2, 'gaps': 2, 'zero_readings': 5}]
+
+
+def test_single_readings_reported_on_request(sos_db):
+    add_readings(sos_db, 'sosht', day_readings('F1', ('18:00',)))
+
+    assert get_unreported_outages(sos_db, '2025-06')['runs'] == 0
+    [gap] = get_unreported_outages(sos_db, '2025-06', min_readings=1)['gaps']
+    assert (gap['first_time'], gap['after'], gap['before']) == ('18:00', '01-06-2025 17:00', '01-06-2025 18:30')
@@ -0,0 +1,17 @@
+import sqlite3
+
+from analysis.utils import get_db_version
+
+
+def test_db_version_follows_wal_commits(sos_db):
+    conn = sqlite3.connect(sos_db)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("INSERT INTO tfmaster VALUES ('TF2', 2, 12.5)")
+    conn.commit()
+    before = get_db_version(sos_db)
+
+    # Committed to the -wal file only: the database file is not checkpointed while conn is open
+    conn.execute("INSERT INTO tfmaster VALUES ('TF3', 3, 12.5)")
+    conn.commit()
+    assert get_db_version(sos_db) != before
+    conn.close()
@@ -0,0 +1,40 @@
+from analysis.voltage_stats import get_voltage_stats
+from conftest import add_readings
+from utils.slot_calendar import ALLOWED_TIMES
+
+DATES = ['01-06-2025', '02-06-2025']
+
+
+def voltage_readings(code, date, voltages):
+    return [{'code': code, 'dateobserved': date, 'timeobserved': time, 'current': 100.0,
+             'voltage': voltages.get(time, 11.0)} for time in ALLOWED_TIMES]
+
+
+def test_band_hours_and_extremes(sos_db):
+    # 10:00 below the band, 18:30 (half-hourly) and 05:00 above it, 02:00 without a valid voltage
+    add_readings(sos_db, 'sosht', voltage_readings('F1', DATES[0], {'10:00': 10.0, '18:30': 11.9}))
+    add_readings(sos_db, 'sosht', voltage_readings('F1', DATES[1], {'05:00': 11.8, '02:00': 0.0}))
+
+    result = get_voltage_stats(sos_db, DATES)
+    assert (result['nominal'], result['band_low'], result['band_high']) == (11.0, 10.34, 11.66)
+    [f1] = result['codes']
+    assert (f1['readings'], f1['hours']) == (2 * len(ALLOWED_TIMES) - 1, 47)
+    assert (f1['low_count'], f1['high_count'], f1['low_hours'], f1['high_hours']) == (1, 2, 1, 1)
+    assert f1['outside_percent'] == round(2 / 47 * 100, 2)
+    assert f1['mean'] == 11.01
+    assert (f1['min'], f1['min_date'], f1['min_time']) == (10.0, DATES[0], '10:00')
+    assert (f1['max'], f1['max_date'], f1['max_time']) == (11.9, DATES[0], '18:30')
+    assert (f1['worst_excursion'], f1['worst_date'], f1['worst_time']) == (-9.09, DATES[0], '10:00')
+    assert 11.0 <= f1['p50'] <= 11.06
+
+
+def test_ranges_merge_the_days(sos_db):
+    add_readings(sos_db, 'sosht', voltage_readings('F1', DATES[0], {'10:00': 10.0}))
+    add_readings(sos_db, 'sosht', voltage_readings('F1', DATES[1], {'10:00': 10.0}))
+
+    first = get_voltage_stats(sos_db, DATES[:1])['codes'][0]
+    both = get_voltage_stats(sos_db, DATES)['codes'][0]
+    assert both['readings'] == 2 * first['readings']
+    assert (both['low_hours'], both['min_date']) == (2, DATES[0])
+    # From the stored days
+    assert get_voltage_stats(sos_db, DATES)['codes'][0] == both
@@ -2,34 +2,26 @@
 Utility functions for date and time handling in the Substation Operating Review application.
 
 Includes:
-- Generating allowed time slots (hourly and half-hourly)
+- Allowed time slots (hourly and half-hourly, precomputed in utils.slot_calendar)
 - Finding the closest allowed time to a given time
 - Formatting dates for database queries
 """
 
+from bisect import bisect_right
 from datetime import datetime, timedelta
+from utils.slot_calendar import ALLOWED_TIMES, closest_slot_index, time_to_minutes
 
 def generate_allowed_times():
     """
-    Generates a sorted list of allowed time strings for selection.
+    Returns the sorted allowed time strings for selection.
     Includes hourly times from 01:00 to 24:00 and half-hourly times
     from 05:30 to 08:00 and 18:30 to 21:30.
+    The slot table is precomputed once; callers must not modify it.
 
     Returns:
-        list of str: Allowed times in 'HH:MM' format.
+        tuple of str: Allowed times in 'HH:MM' format.
     """
-    times = []
-    # 01:00 to 24:00 hourly
-    for h in range(1, 25):
-        times.append(f"{h:02d}:00")
-    # 05:30 to 08:00 half-hourly (removed 08:30)
-    for h in range(5, 8):
-        times.append(f"{h:02d}:30")
-    # 18:30 to 21:30 half-hourly
-    for h in range(18, 22):
-        times.append(f"{h:02d}:30")
-    times = sorted(times)
-    return times
+    return ALLOWED_TIMES
 
 def format_date(date_str):
     """
@@ -55,7 +47,7 @@ def get_previous_month():
     prev_month_last_day = first_of_this_month - timedelta(days=1)
     return prev_month_last_day.strftime("%Y-%m")
 
-def get_closest_allowed_datetime(allowed_times):
+def get_closest_allowed_datetime(allowed_times=ALLOWED_TIMES):
     """
     Returns the current date and the closest allowed time slot that is less than or equal to the current time.
     If the current time is before the earliest allowed time, returns "24:00" and previous date if present.
@@ -68,26 +60,22 @@ def get_closest_allowed_datetime(allowed_times):
     """
     now_dt = datetime.now()
     selected_date = now_dt.strftime("%Y-%m-%d")
-    now_time = now_dt.strftime("%H:%M")
-    current_minutes = int(now_time[:2]) * 60 + int(now_time[3:])
-    allowed_minutes = [(t, int(t[:2]) * 60 + int(t[3:])) for t in allowed_times]
-    closest = allowed_times[0]
-    for t, t_minutes in allowed_minutes:
-        if t_minutes <= current_minutes:
-            closest = t
-        else:
-            break
+    current_minutes = now_dt.hour * 60 + now_dt.minute
+
+    if allowed_times is ALLOWED_TIMES:
+        index = closest_slot_index(current_minutes)
+    else:
+        index = bisect_right([time_to_minutes(t) for t in allowed_times], current_minutes) - 1
+
+    if index is not None and index >= 0:
+        return selected_date, allowed_times[index]
 
     # If current_time is before the earliest allowed time, wrap to "24:00" and previous day if present
-    if current_minutes < allowed_minutes[0][1]:
-        for t, t_minutes in reversed(allowed_minutes):
-            if t == "24:00":
-                closest = t
-                # Set date to previous day
-                selected_date = (now_dt - timedelta(days=1)).strftime("%Y-%m-%d")
-                break
-
-    return selected_date, closest
+    if "24:00" in allowed_times:
+        selected_date = (now_dt - timedelta(days=1)).strftime("%Y-%m-%d")
+        return selected_date, "24:00"
+
+    return selected_date, allowed_times[0]
 
 def get_previous_date():
     """
@@ -0,0 +1,168 @@
+"""
+Slot calendar shared by the analysis modules and routes.
+
+Includes:
+- Precomputed allowed time slots (hourly and half-hourly) with integer indices
+- Integer day numbers for 'DD-MM-YYYY' date keys (parsed once and cached)
+- O(1) previous/next hourly slot lookup ("01:00" -> previous day "24:00")
+- Bisect-based nearest slot search
+"""
+
+from bisect import bisect_right
+from calendar import monthrange
+from datetime import date
+from functools import lru_cache
+
+
+def _build_allowed_times():
+    # 01:00 to 24:00 hourly
+    times = [f"{h:02d}:00" for h in range(1, 25)]
+    # 05:30 to 07:30 half-hourly (08:30 removed)
+    times += [f"{h:02d}:30" for h in range(5, 8)]
+    # 18:30 to 21:30 half-hourly
+    times += [f"{h:02d}:30" for h in range(18, 22)]
+    return tuple(sorted(times))
+
+
+def time_to_minutes(time_str):
+    """
+    Converts 'HH:MM' to minutes since midnight ('24:00' -> 1440).
+    """
+    return int(time_str[:2]) * 60 + int(time_str[3:5])
+
+
+# All selectable time slots of a day, sorted
+ALLOWED_TIMES = _build_allowed_times()
+# Slot index of each allowed time
+SLOT_INDEX = {time: i for i, time in enumerate(ALLOWED_TIMES)}
+# Minutes since midnight of each allowed time (sorted, for bisect)
+SLOT_MINUTES = tuple(time_to_minutes(time) for time in ALLOWED_TIMES)
+
+# Hourly slots of a day; the reading before 01:00 is the previous day's 24:00
+HOURLY_TIMES = tuple(f"{h:02d}:00" for h in range(1, 25))
+# Hour index (0..23) of each hourly time
+HOUR_INDEX = {time: i for i, time in enumerate(HOURLY_TIMES)}
+
+
+@lru_cache(maxsize=4096)
+def day_number(date_str):
+    """
+    Converts a 'DD-MM-YYYY' date key to an integer day number (proleptic ordinal).
+    """
+    return date(int(date_str[6:10]), int(date_str[3:5]), int(date_str[:2])).toordinal()
+
+
+@lru_cache(maxsize=4096)
+def date_from_day_number(number):
+    """
+    Converts an integer day number back to a 'DD-MM-YYYY' date key.
+    """
+    return date.fromordinal(number).strftime("%d-%m-%Y")
+
+
+def previous_date(date_str):
+    """
+    Returns the date before the given 'DD-MM-YYYY' date in the same format.
+    """
+    return date_from_day_number(day_number(date_str) - 1)
+
+
+def hourly_slot(date_str, time_str):
+    """
+    Returns a global integer slot number for an hourly reading, or None for
+    non-hourly times. Consecutive hours (across midnight) differ by one.
+    """
+    hour = HOUR_INDEX.get(time_str)
+    if hour is None:
+        return None
+    return day_number(date_str) * 24 + hour
+
+
+def slot_to_date_time(slot):
+    """
+    Converts a global hourly slot number back to ('DD-MM-YYYY', 'HH:MM').
+    """
+    number, hour = divmod(slot, 24)
+    return date_from_day_number(number), HOURLY_TIMES[hour]
+
+
+def previous_hourly_slot(date_str, time_str):
+    """
+    Returns (date, time) of the hourly reading before the given one, or (None, None)
+    for non-hourly times. '01:00' maps to the previous day's '24:00'.
+    """
+    slot = hourly_slot(date_str, time_str)
+    if slot is None:
+        return None, None
+    return slot_to_date_time(slot - 1)
+
+
+def next_hourly_slot(date_str, time_str):
+    """
+    Returns (date, time) of the hourly reading after the given one, or (None, None)
+    for non-hourly times. '24:00' maps to the next day's '01:00'.
+    """
+    slot = hourly_slot(date_str, time_str)
+    if slot is None:
+        return None, None
+    return slot_to_date_time(slot + 1)
+
+
+def adjacent_allowed_slot(date_str, time_str, step):
+    """
+    Returns (date, time) of the allowed slot `step` positions away from the given one,
+    wrapping across days. Returns (None, None) if time_str is not an allowed time.
+    """
+    index = SLOT_INDEX.get(time_str)
+    if index is None:
+        return None, None
+    day_offset, index = divmod(index + step, len(ALLOWED_TIMES))
+    return date_from_day_number(day_number(date_str) + day_offset), ALLOWED_TIMES[index]
+
+
+def closest_slot_index(minutes):
+    """
+    Returns the index of the latest allowed slot at or before the given minutes since
+    midnight, or None if the time is before the first slot of the day.
+    """
+    index = bisect_right(SLOT_MINUTES, minutes) - 1
+    return index if index >= 0 else None
+
+
+def month_dates(year_month):
+    """
+    Returns all dates of a 'YYYY-MM' month as 'DD-MM-YYYY' keys.
+    """
+    year, month = map(int, year_month.split('-'))
+    first = date(year, month, 1).toordinal()
+    return [date_from_day_number(first + i) for i in range(monthrange(year, month)[1])]
+
+
+def period_dates(period):
+    """
+    Returns the 'DD-MM-YYYY' dates of a 'YYYY-MM' month or a 'YYYY' year.
+    """
+    if len(period) == 4:
+        return [d for month in range(1, 13) for d in month_dates(f"{period}-{month:02d}")]
+    return month_dates(period)
+
+
+def month_boundary_dates(year_month):
+    """
+    Returns (previous month's last date, month's last date) as 'DD-MM-YYYY' keys.
+    Readings at 24:00 on these dates bound the month's energy.
+    """
+    year, month = map(int, year_month.split('-'))
+    first = date(year, month, 1).toordinal()
+    last = first + monthrange(year, month)[1] - 1
+    return date_from_day_number(first - 1), date_from_day_number(last)
+
+
+def period_boundary_dates(period):
+    """
+    Returns (last date before the period, period's last date) as 'DD-MM-YYYY' keys
+    for a 'YYYY-MM' month or a 'YYYY' year.
+    """
+    if len(period) == 4:
+        return f"31-12-{int(period) - 1}", f"31-12-{period}"
+    return month_boundary_dates(period)